@@ -0,0 +1,47 @@
+"""Size and decode time of stored keystroke payloads.
+
+Compares the legacy JSON list of {t, k} records with the binary
+delta-encoded format, for a simulated 10-minute session.
+
+    python -m benchmarks.keystroke_codec_bench
+"""
+
+import json
+import random
+import time
+
+from src.core.keystroke_log import KeystrokeLog
+from src.data.keystroke_codec import decode_keystrokes, encode_keystrokes
+
+
+def _session_log(keys: int = 3000) -> KeystrokeLog:
+    rng = random.Random(7)
+    log = KeystrokeLog()
+    t = 0.0
+    for _ in range(keys):
+        t += rng.uniform(0.08, 0.35)
+        log.append(t, rng.choice("abcdefghijklmnopqrstuvwxyz ,.;()\x7f"))
+    return log
+
+
+def _timed(fn, repeat: int = 50) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e3
+
+
+def main() -> None:
+    log = _session_log()
+    legacy = json.dumps(log.to_dicts())
+    raw = encode_keystrokes(log, compress=False)
+    packed = encode_keystrokes(log, compress=True)
+
+    print(f"{'format':<22}{'bytes':>10}{'decode ms':>12}")
+    print(f"{'JSON records':<22}{len(legacy):>10}{_timed(lambda: KeystrokeLog.from_records(json.loads(legacy))):>12.2f}")
+    print(f"{'binary':<22}{len(raw):>10}{_timed(lambda: decode_keystrokes(raw)):>12.2f}")
+    print(f"{'binary + zlib':<22}{len(packed):>10}{_timed(lambda: decode_keystrokes(packed)):>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
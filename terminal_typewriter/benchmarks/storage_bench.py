@@ -0,0 +1,87 @@
+"""Per-call latency of StorageManager save/fetch.
+
+Compares the previous connect-per-call pattern (a fresh sqlite3
+connection, default journal mode, for every call) against the
+persistent WAL connection used by StorageManager.
+
+Run from the terminal_typewriter directory:
+
+    python -m benchmarks.storage_bench [iterations]
+"""
+
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+from src.data.storage import StorageManager
+
+
+def _session(i: int) -> dict:
+    return {
+        "id": f"bench-{i}",
+        "timestamp": f"2024-01-01T00:{i // 60 % 60:02d}:{i % 60:02d}Z",
+        "mode": "beginner",
+        "duration": 60.0,
+        "text_length": 250,
+        "wpm": 40.0 + i % 30,
+        "accuracy": 90.0,
+        "errors": 3,
+        "keystrokes": [{"t": k * 0.2, "k": "a"} for k in range(200)],
+        "text": "hello world " * 20,
+    }
+
+
+def _legacy_save(db_path: str, session: dict) -> None:
+    conn = sqlite3.connect(db_path)
+    conn.execute(
+        "INSERT INTO sessions (id, timestamp, mode, duration, text_length, wpm, accuracy, errors, keystrokes_data, text) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (session["id"], session["timestamp"], session["mode"], session["duration"], session["text_length"],
+         session["wpm"], session["accuracy"], session["errors"], json.dumps(session["keystrokes"]), session["text"]),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _legacy_fetch(db_path: str) -> list:
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute(
+        "SELECT id, timestamp, mode, duration, text_length, wpm, accuracy, errors FROM sessions ORDER BY timestamp DESC LIMIT 100"
+    ).fetchall()
+    conn.close()
+    return rows
+
+
+def _timed(fn, iterations: int) -> float:
+    start = time.perf_counter()
+    for i in range(iterations):
+        fn(i)
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(iterations: int = 500) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        legacy_path = os.path.join(tmp, "legacy.db")
+        StorageManager(db_path=legacy_path).close()
+        conn = sqlite3.connect(legacy_path)
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+
+        storage = StorageManager(db_path=os.path.join(tmp, "current.db"))
+
+        results = [
+            ("save_session (connect per call)", _timed(lambda i: _legacy_save(legacy_path, _session(i)), iterations)),
+            ("save_session (persistent WAL)", _timed(lambda i: storage.save_session(_session(i)), iterations)),
+            ("fetch_recent_sessions(100) (connect per call)", _timed(lambda i: _legacy_fetch(legacy_path), iterations)),
+            ("fetch_recent_sessions(100) (persistent WAL)", _timed(lambda i: storage.fetch_recent_sessions(limit=100), iterations)),
+        ]
+        storage.close()
+
+    for name, micros in results:
+        print(f"{name:<48} {micros:>10.1f} us/call")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500)
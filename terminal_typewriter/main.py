@@ -1,6 +1,7 @@
+import argparse
 import sys
-import time
-from typing import Optional
+from datetime import datetime
+from typing import Any, Dict, List, Optional
 
 from src.core.text_manager import TextManager
 from src.core.engine import TypingEngine
@@ -8,15 +9,27 @@ from src.core.timer import CountdownTimer
 from src.ui.display import DisplayManager
 from src.ui.menu import MenuSystem
 from src.ui.input_handler import InputHandler
+from src.ui.session_loop import SessionLoop
 from src.ui.curses_display import CursesDisplay
 from src.data.storage import StorageManager
+from src.data.write_behind import WriteBehindQueue
+from src.data.models import SessionCursor, SessionFilter
+from src.data.texts import hash_text
+from src.data import transfer
+from src.data.retention import POLICIES, RetentionManager, format_space_report
 from src.utils.helpers import generate_session_id, now_utc_iso
 from src.utils.config import ConfigManager
-from src.features.reports import format_history_table
+from src.features.reports import format_history_table, format_timing_report
 from src.features.replay import ReplaySystem
-from src.features.analytics import Analytics
+from src.features.analytics import Analytics, format_rollup_report
 from src.features.achievements import AchievementSystem
+from src.features.report_cache import ReportCache
 from src.features.text_importer import TextImporter
+from src.utils.exceptions import StorageException
+
+
+def print_migration_progress(message: str, done: int, total: int) -> None:
+    print(f"\r{message}: {done}/{total}", end="\n" if done >= total else "", flush=True)
 
 
 def prompt_level(config: ConfigManager) -> str:
@@ -68,7 +81,22 @@ def prompt_duration(config: ConfigManager) -> int:
         print("Invalid choice. Please select a number between 1 and 5.")
 
 
-def run_test_flow(display: DisplayManager, text_manager: TextManager, storage: StorageManager, config: ConfigManager, achievements: AchievementSystem) -> None:
+def build_session_record(level: str, text: str, engine: TypingEngine, result) -> dict:
+    return {
+        "id": generate_session_id(),
+        "timestamp": now_utc_iso(),
+        "mode": level,
+        "duration": result.duration_seconds,
+        "text_length": result.text_length,
+        "wpm": result.wpm,
+        "accuracy": result.accuracy,
+        "errors": result.errors,
+        "keystrokes": engine.get_keystrokes(),
+        "text": text,
+    }
+
+
+def run_test_flow(display: DisplayManager, text_manager: TextManager, storage: StorageManager, writer: WriteBehindQueue, config: ConfigManager, achievements: AchievementSystem) -> None:
     level = prompt_level(config)
     duration = prompt_duration(config)
     text = text_manager.get_text(level, duration)
@@ -85,49 +113,45 @@ def run_test_flow(display: DisplayManager, text_manager: TextManager, storage: S
         duration_seconds=duration,
         on_tick=lambda r: None,
         on_complete=lambda: None,
+        clock=engine.clock,
     )
     timer.start()
 
-    last_render = 0.0
-    render_interval = 0.1
-
     display.clear()
     display.banner()
     print(text)
 
     with InputHandler() as ih:
-        while timer.remaining > 0:
-            key = ih.read_key()
-            if key is not None:
-                engine.process_keystroke(key)
-            now = time.time()
-            if now - last_render >= render_interval:
-                last_render = now
-                display.render_live(engine, timer.remaining)
+        loop = SessionLoop(
+            engine,
+            timer,
+            ih,
+            render=lambda: display.render_live(engine, timer.remaining),
+            render_interval=1.0 / display.max_fps,
+        )
+        loop.run()
+    display.end_live()
 
     result = engine.finalize_test()
 
-    session_id = generate_session_id()
-    storage.save_session({
-        "id": session_id,
-        "timestamp": now_utc_iso(),
-        "mode": level,
-        "duration": result.duration_seconds,
-        "text_length": result.text_length,
-        "wpm": result.wpm,
-        "accuracy": result.accuracy,
-        "errors": result.errors,
-        "keystrokes": engine.get_keystrokes(),
-        "text": text,
-    })
-
-    # Check for new achievements
-    sessions = storage.fetch_recent_sessions(limit=100)
-    new_achievements = achievements.check_achievements(sessions)
+    # Saved in the background so the results appear immediately
+    writer.submit(build_session_record(level, text, engine, result))
 
     display.clear()
     display.banner()
     display.show_results(result)
+
+    # Check for new achievements once the session is committed
+    try:
+        writer.await_durable()
+    except StorageException as exc:
+        print(f"\n⚠️  Could not save session: {exc}")
+        return
+    passage = storage.get_passage_totals(hash_text(text))
+    if passage["count"] > 1:
+        print(f"\n📖 This passage: {passage['count']} attempts, best {passage['best_wpm']} WPM, average {passage['avg_wpm']} WPM")
+    sessions = storage.fetch_recent_sessions(limit=100)
+    new_achievements = achievements.check_achievements(sessions)
     
     # Show new achievements
     if new_achievements:
@@ -139,7 +163,7 @@ def run_test_flow(display: DisplayManager, text_manager: TextManager, storage: S
         input()
 
 
-def run_test_flow_curses(text_manager: TextManager, storage: StorageManager, config: ConfigManager, achievements: AchievementSystem) -> None:
+def run_test_flow_curses(text_manager: TextManager, storage: StorageManager, writer: WriteBehindQueue, config: ConfigManager, achievements: AchievementSystem) -> None:
     level = prompt_level(config)
     duration = prompt_duration(config)
     text = text_manager.get_text(level, duration)
@@ -149,64 +173,105 @@ def run_test_flow_curses(text_manager: TextManager, storage: StorageManager, con
         ui = CursesDisplay(stdscr)
         ui.run_session(text=text, duration=duration, engine=engine)
         result = engine.finalize_test()
-        session_id = generate_session_id()
-        storage.save_session({
-            "id": session_id,
-            "timestamp": now_utc_iso(),
-            "mode": level,
-            "duration": result.duration_seconds,
-            "text_length": result.text_length,
-            "wpm": result.wpm,
-            "accuracy": result.accuracy,
-            "errors": result.errors,
-            "keystrokes": engine.get_keystrokes(),
-            "text": text,
-        })
+        writer.submit(build_session_record(level, text, engine, result))
 
     try:
         import curses
         curses.wrapper(_session)
     except Exception as exc:
         print("Curses mode failed, falling back to standard mode. Reason:", exc)
-        display = DisplayManager()
-        run_test_flow(display, text_manager, storage, config, achievements)
+        display = DisplayManager(max_fps=config.get("live_render_fps", 10))
+        run_test_flow(display, text_manager, storage, writer, config, achievements)
 
 
-def view_history_flow(display: DisplayManager, storage: StorageManager) -> None:
-    display.clear()
-    display.banner()
-    rows = storage.fetch_recent_sessions(limit=15)
-    print("\nRecent Sessions:\n")
-    print(format_history_table(rows))
-    print("\nPress Enter to return to menu...")
-    input()
+def prompt_history_filter() -> SessionFilter:
+    print("\nFilter sessions (leave blank to skip):")
+    mode = input("Mode (beginner/intermediate/advanced/expert): ").strip() or None
+    since = input("From date (YYYY-MM-DD): ").strip() or None
+    until = input("Until date, exclusive (YYYY-MM-DD): ").strip() or None
 
+    def _wpm(prompt: str) -> Optional[float]:
+        value = input(prompt).strip()
+        try:
+            return float(value) if value else None
+        except ValueError:
+            print("Invalid number, ignoring")
+            return None
 
-def analytics_flow(display: DisplayManager, storage: StorageManager) -> None:
+    return SessionFilter(mode=mode, since=since, until=until, min_wpm=_wpm("Min WPM: "), max_wpm=_wpm("Max WPM: "))
+
+
+def view_history_flow(display: DisplayManager, storage: StorageManager, page_size: int = 15) -> None:
+    filters = SessionFilter()
+    # Cursor each visited page started from, so "previous" can seek back
+    page_starts: List[Optional[SessionCursor]] = [None]
+    while True:
+        page = storage.fetch_sessions_page(limit=page_size, after=page_starts[-1], filters=filters)
+        display.clear()
+        display.banner()
+        title = "Sessions" if filters.is_empty() else "Sessions (filtered)"
+        print(f"\n{title} - page {len(page_starts)}:\n")
+        print(format_history_table(page.rows, start=(len(page_starts) - 1) * page_size + 1))
+
+        options = []
+        if page.has_more:
+            options.append("[n]ext")
+        if len(page_starts) > 1:
+            options.append("[p]revious")
+        options += ["[f]ilter", "[q]uit"]
+        choice = input(f"\n{'  '.join(options)}: ").strip().lower()
+        if choice == "n" and page.has_more:
+            page_starts.append(page.next_cursor)
+        elif choice == "p" and len(page_starts) > 1:
+            page_starts.pop()
+        elif choice == "f":
+            filters = prompt_history_filter()
+            page_starts = [None]
+        elif choice in ("q", ""):
+            return
+
+
+def analytics_flow(display: DisplayManager, storage: StorageManager, reports: ReportCache) -> None:
     display.clear()
     display.banner()
     
     print("\nAnalytics Options:")
     print("1. Standard Report")
     print("2. Enhanced Report with Charts")
-    print("3. Back to main menu")
+    print("3. Keystroke Timing (slowest keys and bigrams)")
+    print("4. Long-range Trends (daily, weekly or monthly)")
+    print("5. Back to main menu")
     
     while True:
-        choice = input("\nEnter your choice (1-3): ").strip()
+        choice = input("\nEnter your choice (1-5): ").strip()
         
         if choice == "1":
-            sessions = storage.fetch_recent_sessions(limit=100)
-            analytics = Analytics(sessions)
-            print("\n" + analytics.format_summary_report())
+            print("\n" + reports.get_or_build("summary", lambda: Analytics.from_aggregates(storage).format_summary_report()))
             break
             
         elif choice == "2":
-            sessions = storage.fetch_recent_sessions(limit=100)
-            analytics = Analytics(sessions)
-            print("\n" + analytics.format_summary_report_with_charts())
+            print("\n" + reports.get_or_build("summary_charts", lambda: Analytics.from_storage(storage).format_summary_report_with_charts()))
             break
             
         elif choice == "3":
+            print("\n" + reports.get_or_build("keystroke_timing", lambda: format_timing_report(
+                storage.get_keystroke_timing(kind="key", limit=10),
+                storage.get_keystroke_timing(kind="bigram", limit=20),
+                storage.get_interval_histogram(),
+            )))
+            break
+            
+        elif choice == "4":
+            period = {"d": "day", "w": "week", "m": "month"}.get(input("Group by (d)ay, (w)eek or (m)onth [w]: ").strip().lower()[:1], "week")
+            since = input("From date (YYYY-MM-DD, blank for all): ").strip() or None
+            until = input("Until date, exclusive (YYYY-MM-DD, blank for now): ").strip() or None
+            print("\n" + reports.get_or_build(
+                f"rollups:{period}:{since}:{until}",
+                lambda: format_rollup_report(storage.get_rollups(period, since=since, until=until), period),
+            ))
+            break
+            
+        elif choice == "5":
             return
             
         else:
@@ -216,21 +281,25 @@ def analytics_flow(display: DisplayManager, storage: StorageManager) -> None:
     input()
 
 
-def achievements_flow(display: DisplayManager, storage: StorageManager) -> None:
+def achievements_flow(display: DisplayManager, storage: StorageManager, reports: ReportCache) -> None:
     display.clear()
     display.banner()
     
-    sessions = storage.fetch_recent_sessions(limit=100)
-    achievements = AchievementSystem(storage)
+    def build() -> Dict[str, Any]:
+        sessions = storage.fetch_recent_sessions(limit=100)
+        achievements = AchievementSystem(storage)
+        # Check for new achievements
+        new_achievements = achievements.check_achievements(sessions)
+        return {"report": achievements.format_achievements_report(), "new": new_achievements}
     
-    # Check for new achievements
-    new_achievements = achievements.check_achievements(sessions)
+    # Streaks count back from today, so the date is part of the key
+    result = reports.get_or_build(f"achievements:{datetime.now().date().isoformat()}", build)
     
-    print("\n" + achievements.format_achievements_report())
+    print("\n" + result["report"])
     
-    if new_achievements:
+    if result["new"]:
         print("\n🎉 NEW ACHIEVEMENTS UNLOCKED! 🎉")
-        for achievement in new_achievements:
+        for achievement in result["new"]:
             print(f"  {achievement['icon']} {achievement['name']}")
             print(f"    {achievement['description']}")
     
@@ -382,7 +451,7 @@ def replay_last_flow(display: DisplayManager, storage: StorageManager, text_mana
         print(f"\rWPM: {stats.wpm:>5}  Acc: {stats.accuracy:>5}%  Chars: {stats.characters_typed}", end="", flush=True)
 
     try:
-        replayer = ReplaySystem(text=text, keystrokes=session.get("keystrokes", []))
+        replayer = ReplaySystem(text=text, keystrokes=session.keystroke_stream)
         replayer.run(speed=1.0, on_frame=on_frame)
     except KeyboardInterrupt:
         pass
@@ -391,7 +460,7 @@ def replay_last_flow(display: DisplayManager, storage: StorageManager, text_mana
         input()
 
 
-def settings_flow(display: DisplayManager, config: ConfigManager) -> None:
+def settings_flow(display: DisplayManager, config: ConfigManager, storage: StorageManager) -> None:
     display.clear()
     display.banner()
     
@@ -442,7 +511,8 @@ def settings_flow(display: DisplayManager, config: ConfigManager) -> None:
             new_name = input("Enter new name: ").strip()
             if new_name:
                 config.set("user_name", new_name)
-                print(f"Name set to: {new_name}")
+                storage.set_user(new_name)
+                print(f"Name set to: {new_name} (history and stats now show {new_name}'s sessions)")
                 
         elif choice == "5":
             print("\nCurrent Settings:")
@@ -467,12 +537,74 @@ def settings_flow(display: DisplayManager, config: ConfigManager) -> None:
     config.save_settings()
 
 
-def main() -> None:
-    display = DisplayManager()
-    text_manager = TextManager()
-    storage = StorageManager()
+def build_arg_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="main.py", description="Terminal Typewriter")
+    parser.add_argument("--user", help="Whose sessions to work on (default: the user_name setting)")
+    commands = parser.add_subparsers(dest="command")
+
+    export_cmd = commands.add_parser("export", help="Export all sessions to NDJSON or CSV")
+    export_cmd.add_argument("path", nargs="?", help="Output file (default: data/exports/sessions-<time>.<format>)")
+    export_cmd.add_argument("--format", choices=transfer.FORMATS, help="Output format (default: from the file extension, else ndjson)")
+
+    import_cmd = commands.add_parser("import", help="Import sessions from an NDJSON or CSV export")
+    import_cmd.add_argument("path", help="File produced by the export command")
+    import_cmd.add_argument("--format", choices=transfer.FORMATS, help="Input format (default: from the file extension)")
+    import_cmd.add_argument("--replace", action="store_true", help="Overwrite sessions whose id already exists instead of skipping them")
+
+    retention_cmd = commands.add_parser("retention", help="Report keystroke storage per year, retire old keystrokes, reclaim space")
+    retention_cmd.add_argument("action", choices=("report", "apply", "reclaim"))
+    retention_cmd.add_argument("--days", type=int, help="Retire keystrokes older than this many days (default: keystroke_retention_days setting)")
+    retention_cmd.add_argument("--policy", choices=POLICIES, help="Move keystrokes to the archive database or drop them (default: keystroke_retention_policy setting)")
+    return parser
+
+
+def run_retention_command(args: argparse.Namespace, storage: StorageManager, config: ConfigManager) -> None:
+    retention = RetentionManager(storage)
+    if args.action == "apply":
+        days = args.days if args.days is not None else config.get("keystroke_retention_days", 0)
+        if not days:
+            print("No retention age set; pass --days or set keystroke_retention_days")
+            return
+        policy = args.policy or config.get("keystroke_retention_policy", "archive")
+        count = retention.expire(days, policy)
+        print(f"Retired keystrokes of {count} sessions older than {days} days ({policy})")
+    if args.action in ("apply", "reclaim"):
+        if not retention.incremental_vacuum_enabled():
+            print("Rewriting the database once to enable incremental vacuum; this can take a while for a large history...", flush=True)
+            retention.enable_incremental_vacuum()
+        pages = retention.reclaim()
+        print(f"Reclaimed {pages} pages")
+    print(format_space_report(retention.space_report()))
+
+
+def run_command(args: argparse.Namespace) -> int:
     config = ConfigManager()
-    achievements = AchievementSystem(storage)
+    user_name = args.user or config.get("user_name", "Guest")
+    try:
+        with StorageManager(migration_progress=print_migration_progress, user_name=user_name) as storage:
+            if args.command == "export":
+                path = args.path or transfer.default_export_path(args.format or "ndjson")
+                count = transfer.export_sessions(storage, path, fmt=args.format)
+                print(f"Exported {count} sessions to {path}")
+            elif args.command == "import":
+                count = transfer.import_sessions(storage, args.path, fmt=args.format, replace=args.replace)
+                print(f"Imported {count} sessions from {args.path}")
+            elif args.command == "retention":
+                run_retention_command(args, storage, config)
+    except StorageException as exc:
+        print(f"❌ {args.command} failed: {exc}", file=sys.stderr)
+        return 1
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    args = build_arg_parser().parse_args(argv)
+    if args.command:
+        sys.exit(run_command(args))
+
+    config = ConfigManager()
+    display = DisplayManager(max_fps=config.get("live_render_fps", 10))
+    text_manager = TextManager()
     menu = MenuSystem()
 
     display.clear()
@@ -484,30 +616,50 @@ def main() -> None:
         name = input("Enter your name: ")
         config.set("user_name", name)
         config.save_settings()
+
+    # Sessions are stored per user, so open the store once the name is known
+    storage = StorageManager(migration_progress=print_migration_progress, user_name=name)
+    writer = WriteBehindQueue(storage)
+    retention = RetentionManager(storage)
+    achievements = AchievementSystem(storage)
+    reports = ReportCache(storage)
     
     print(f"\nHello, {name}! Test your typing speed in terminal\n")
 
     while True:
+        try:
+            # A bounded slice of retention work while the user is in the menu
+            retention.maintenance_step(config.get("keystroke_retention_days", 0), config.get("keystroke_retention_policy", "archive"))
+        except StorageException:
+            pass
         choice = menu.prompt()
+        if choice not in ("start", "start_curses"):
+            # Screens below read history; make sure queued sessions are visible
+            try:
+                writer.await_durable()
+            except StorageException as exc:
+                print(f"\n⚠️  Could not save session: {exc}")
         if choice == "start":
-            run_test_flow(display, text_manager, storage, config, achievements)
+            run_test_flow(display, text_manager, storage, writer, config, achievements)
         elif choice == "history":
             view_history_flow(display, storage)
         elif choice == "replay_last":
             replay_last_flow(display, storage, text_manager)
         elif choice == "start_curses":
-            run_test_flow_curses(text_manager, storage, config, achievements)
+            run_test_flow_curses(text_manager, storage, writer, config, achievements)
         elif choice == "analytics":
-            analytics_flow(display, storage)
+            analytics_flow(display, storage, reports)
         elif choice == "achievements":
-            achievements_flow(display, storage)
+            achievements_flow(display, storage, reports)
         elif choice == "text_import":
             text_import_flow(display, text_manager)
         elif choice == "settings":
-            settings_flow(display, config)
+            settings_flow(display, config, storage)
         else:
             break
 
+    writer.close()
+    storage.close()
     print("\n\nThank you for using Terminal Typewriter. Goodbye!")
 
 
@@ -0,0 +1,223 @@
+"""Streaming, mergeable statistics.
+
+RunningStats keeps count, mean, variance (Welford), min and max in O(1)
+space; QuantileDigest is a merging t-digest that answers quantiles to
+within a fraction of a percent in O(compression) space. Both can be fed
+one value at a time (e.g. from a DB cursor or per saved session),
+merged with another instance built from different data, and round-
+tripped through plain dicts for persistence.
+"""
+
+import math
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+DIGEST_COMPRESSION = 100
+
+
+@dataclass
+class RunningStats:
+    count: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    minimum: float = math.inf
+    maximum: float = -math.inf
+
+    def update(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+
+    def merge(self, other: "RunningStats") -> None:
+        """Fold in another accumulator (Chan et al. parallel update)."""
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2, self.minimum, self.maximum = other.count, other.mean, other.m2, other.minimum, other.maximum
+            return
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+
+    @property
+    def variance(self) -> float:
+        """Sample variance (n - 1 denominator), as statistics.variance."""
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stdev(self) -> float:
+        return math.sqrt(self.variance)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"count": self.count, "mean": self.mean, "m2": self.m2, "min": self.minimum if self.count else None, "max": self.maximum if self.count else None}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "RunningStats":
+        if not data.get("count"):
+            return cls()
+        return cls(data["count"], data["mean"], data["m2"], data["min"], data["max"])
+
+
+class QuantileDigest:
+    """Merging t-digest: sorted centroids sized by the k1 (arcsine) scale function.
+
+    Centroids near the tails stay small, so extreme quantiles are as
+    accurate as the median. New values are buffered and folded in when
+    the buffer fills or a quantile is asked for.
+    """
+
+    def __init__(self, compression: int = DIGEST_COMPRESSION) -> None:
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.minimum = math.inf
+        self.maximum = -math.inf
+        self._buffer: List[Tuple[float, float]] = []
+        self._buffer_limit = 5 * compression
+
+    @property
+    def count(self) -> float:
+        return sum(self.weights) + sum(w for _, w in self._buffer)
+
+    def update(self, value: float, weight: float = 1.0) -> None:
+        self._buffer.append((value, weight))
+        if value < self.minimum:
+            self.minimum = value
+        if value > self.maximum:
+            self.maximum = value
+        if len(self._buffer) >= self._buffer_limit:
+            self._compress()
+
+    def merge(self, other: "QuantileDigest") -> None:
+        self._buffer.extend(zip(other.means, other.weights))
+        self._buffer.extend(other._buffer)
+        self.minimum = min(self.minimum, other.minimum)
+        self.maximum = max(self.maximum, other.maximum)
+        self._compress()
+
+    def _k(self, q: float) -> float:
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
+
+    def _k_inverse(self, k: float) -> float:
+        return (math.sin(min(k * 2 * math.pi / self.compression, math.pi / 2)) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+        total = sum(w for _, w in points)
+        means: List[float] = []
+        weights: List[float] = []
+        done = 0.0
+        cur_mean, cur_weight = points[0]
+        q_limit = self._k_inverse(self._k(0.0) + 1)
+        for mean, weight in points[1:]:
+            if (done + cur_weight + weight) / total <= q_limit:
+                cur_weight += weight
+                cur_mean += (mean - cur_mean) * weight / cur_weight
+            else:
+                means.append(cur_mean)
+                weights.append(cur_weight)
+                done += cur_weight
+                q_limit = self._k_inverse(self._k(done / total) + 1)
+                cur_mean, cur_weight = mean, weight
+        means.append(cur_mean)
+        weights.append(cur_weight)
+        self.means, self.weights = means, weights
+
+    def quantile(self, q: float) -> float:
+        """Estimate the q-quantile (0 <= q <= 1); 0 when empty."""
+        self._compress()
+        if not self.weights:
+            return 0.0
+        if q <= 0:
+            return self.minimum
+        if q >= 1:
+            return self.maximum
+        means, weights = self.means, self.weights
+        if len(means) == 1:
+            return means[0]
+        index = q * sum(weights)
+        # Interpolate between centroid centres; the ends run out to min/max
+        if index < weights[0] / 2:
+            return self.minimum + (means[0] - self.minimum) * index / (weights[0] / 2)
+        cumulative = weights[0] / 2
+        for i in range(len(means) - 1):
+            step = (weights[i] + weights[i + 1]) / 2
+            if cumulative + step > index:
+                return means[i] + (means[i + 1] - means[i]) * (index - cumulative) / step
+            cumulative += step
+        tail = index - cumulative
+        return means[-1] + (self.maximum - means[-1]) * min(1.0, tail / (weights[-1] / 2))
+
+    def to_dict(self) -> Dict[str, Any]:
+        self._compress()
+        return {
+            "compression": self.compression,
+            "centroids": [[m, w] for m, w in zip(self.means, self.weights)],
+            "min": self.minimum if self.weights else None,
+            "max": self.maximum if self.weights else None,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "QuantileDigest":
+        digest = cls(data.get("compression", DIGEST_COMPRESSION))
+        centroids = data.get("centroids") or []
+        if centroids:
+            digest.means = [m for m, _ in centroids]
+            digest.weights = [w for _, w in centroids]
+            digest.minimum = data["min"]
+            digest.maximum = data["max"]
+        return digest
+
+
+class MetricAccumulator:
+    """RunningStats plus a QuantileDigest for one metric."""
+
+    def __init__(self, stats: Optional[RunningStats] = None, digest: Optional[QuantileDigest] = None) -> None:
+        self.stats = stats or RunningStats()
+        self.digest = digest or QuantileDigest()
+
+    @classmethod
+    def from_values(cls, values: Iterable[float]) -> "MetricAccumulator":
+        accumulator = cls()
+        for value in values:
+            accumulator.update(value)
+        return accumulator
+
+    def update(self, value: float) -> None:
+        self.stats.update(value)
+        self.digest.update(value)
+
+    def merge(self, other: "MetricAccumulator") -> None:
+        self.stats.merge(other.stats)
+        self.digest.merge(other.digest)
+
+    def summary(self) -> Dict[str, Any]:
+        count = self.stats.count
+        return {
+            "count": count,
+            "mean": round(self.stats.mean, 2) if count else 0,
+            "stdev": round(self.stats.stdev, 2),
+            "min": self.stats.minimum if count else 0,
+            "max": self.stats.maximum if count else 0,
+            "p50": round(self.digest.quantile(0.5), 2),
+            "p90": round(self.digest.quantile(0.9), 2),
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"stats": self.stats.to_dict(), "digest": self.digest.to_dict()}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MetricAccumulator":
+        return cls(RunningStats.from_dict(data.get("stats", {})), QuantileDigest.from_dict(data.get("digest", {})))
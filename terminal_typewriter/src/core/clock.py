@@ -0,0 +1,54 @@
+import threading
+import time
+
+
+NANOS_PER_SECOND = 1_000_000_000
+
+
+class Clock:
+    """Monotonic high-resolution time source shared by the core timing code."""
+
+    def now_ns(self) -> int:
+        return time.perf_counter_ns()
+
+    def now(self) -> float:
+        return self.now_ns() / NANOS_PER_SECOND
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """Manually advanced clock for deterministic tests, benchmarks and replays.
+
+    sleep() advances virtual time instantly instead of blocking, so code
+    driven by this clock runs at full CPU speed with reproducible timings.
+    """
+
+    def __init__(self, start_ns: int = 0) -> None:
+        self._now_ns = start_ns
+        self._lock = threading.Lock()
+
+    def now_ns(self) -> int:
+        return self._now_ns
+
+    def advance(self, seconds: float) -> None:
+        self.advance_ns(int(round(seconds * NANOS_PER_SECOND)))
+
+    def advance_ns(self, nanos: int) -> None:
+        if nanos < 0:
+            raise ValueError("VirtualClock cannot go backwards")
+        with self._lock:
+            self._now_ns += nanos
+
+    def sleep(self, seconds: float) -> None:
+        if seconds > 0:
+            self.advance(seconds)
+
+
+_default_clock = Clock()
+
+
+def get_default_clock() -> Clock:
+    return _default_clock
@@ -1,6 +1,8 @@
-import time
-from typing import Optional, List, Dict, Any
+from bisect import bisect_left
+from typing import Optional, List, Tuple
 
+from .clock import Clock, get_default_clock
+from .keystroke_log import KeystrokeLog, KeystrokeView
 from .stats import StatsTracker
 from ..data.models import RealtimeStats, TestResult
 
@@ -9,14 +11,18 @@ BACKSPACE = "\x7f"  # POSIX backspace
 ENTER = "\n"
 
 class TypingEngine:
-    def __init__(self, text: str) -> None:
+    def __init__(self, text: str, clock: Optional[Clock] = None) -> None:
         self.text = text
-        self.stats_tracker = StatsTracker(target_text=text, stats=RealtimeStats())
+        self.clock = clock or get_default_clock()
+        self.stats_tracker = StatsTracker(target_text=text, stats=RealtimeStats(), clock=self.clock)
         self._started = False
         self._completed = False
         self._result: Optional[TestResult] = None
-        self._buffer: str = ""
-        self._keystrokes: List[Dict[str, Any]] = []
+        self._chars: List[str] = []
+        # Indices of the newlines in _chars, ascending
+        self._newlines: List[int] = []
+        self._buffer: Optional[str] = ""
+        self._keystrokes = KeystrokeLog()
 
     def start_test(self) -> None:
         if self._started:
@@ -26,7 +32,7 @@ class TypingEngine:
 
     def _timestamp_since_start(self) -> float:
         st = self.stats_tracker.stats.start_time
-        now = time.time()
+        now = self.clock.now()
         if st is None:
             return 0.0
         return max(0.0, now - st)
@@ -35,26 +41,46 @@ class TypingEngine:
         if self._completed:
             return
         if key == BACKSPACE:
-            self._buffer = self._buffer[:-1]
-        elif key == ENTER:
-            self._buffer += " "
+            if self._chars:
+                if self._chars.pop() == "\n":
+                    self._newlines.pop()
+                self.stats_tracker.apply_delete()
         else:
-            self._buffer += key
-        self._keystrokes.append({"t": round(self._timestamp_since_start(), 3), "k": key})
-        self.stats_tracker.update_from_input(self._buffer)
+            typed = " " if key == ENTER else key
+            if "\n" in typed:
+                base = len(self._chars)
+                self._newlines.extend(base + i for i, ch in enumerate(typed) if ch == "\n")
+            self._chars.extend(typed)
+            self.stats_tracker.apply_append(typed)
+        self._buffer = None
+        self._keystrokes.append(self._timestamp_since_start(), key)
 
     def update_from_input_snapshot(self, user_input: str) -> None:
+        self._chars = list(user_input)
+        self._newlines = [i for i, ch in enumerate(user_input) if ch == "\n"]
         self._buffer = user_input
-        self.stats_tracker.update_from_input(self._buffer)
+        self.stats_tracker.update_from_input(user_input)
 
     def get_current_stats(self) -> RealtimeStats:
         return self.stats_tracker.stats
 
     def get_buffer(self) -> str:
+        if self._buffer is None:
+            self._buffer = "".join(self._chars)
         return self._buffer
 
-    def get_keystrokes(self) -> List[Dict[str, Any]]:
-        return list(self._keystrokes)
+    def get_buffer_tail(self, max_chars: int) -> Tuple[str, int]:
+        """Return the last max_chars typed characters and how many characters
+        of their first line precede them, without joining the whole buffer.
+        """
+        start = max(0, len(self._chars) - max_chars)
+        tail = "".join(self._chars[start:])
+        i = bisect_left(self._newlines, start)
+        line_offset = start - (self._newlines[i - 1] + 1) if i else start
+        return tail, line_offset
+
+    def get_keystrokes(self) -> KeystrokeView:
+        return self._keystrokes.view()
 
     def is_complete(self) -> bool:
         return self._completed
@@ -0,0 +1,109 @@
+import json
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Tuple, Union
+
+
+# Keystroke timestamps are stored as whole milliseconds since the test
+# started, and keys as Unicode code points, one entry per typed character.
+TIME_TYPECODE = "I"
+KEY_TYPECODE = "I"
+
+
+class KeystrokeView:
+    """Read-only view over a columnar keystroke log."""
+
+    def __init__(self, times_ms: array, codes: array) -> None:
+        self._times = times_ms
+        self._codes = codes
+
+    def __len__(self) -> int:
+        return len(self._codes)
+
+    def __getitem__(self, index: int) -> Tuple[float, str]:
+        return self._times[index] / 1000.0, chr(self._codes[index])
+
+    def __iter__(self) -> Iterator[Tuple[float, str]]:
+        for ms, code in zip(self._times, self._codes):
+            yield ms / 1000.0, chr(code)
+
+    def iter_raw(self) -> Iterator[Tuple[int, int]]:
+        """Yield (timestamp_ms, code_point) pairs."""
+        return zip(self._times, self._codes)
+
+    @property
+    def times_ms(self) -> array:
+        """Snapshot of the timestamps; use iter_raw() to walk the log without copying."""
+        return array(TIME_TYPECODE, self._times)
+
+    @property
+    def codes(self) -> array:
+        """Snapshot of the code points; use iter_raw() to walk the log without copying."""
+        return array(KEY_TYPECODE, self._codes)
+
+    def keys(self) -> str:
+        return "".join(map(chr, self._codes))
+
+    def duration_ms(self) -> int:
+        return self._times[-1] if self._times else 0
+
+    def to_columnar(self) -> Dict[str, Any]:
+        return {"t": self._times.tolist(), "k": self.keys()}
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        """Expand into the legacy list of {t, k} records."""
+        return [{"t": t, "k": k} for t, k in self]
+
+    def serialize(self) -> str:
+        return json.dumps(self.to_columnar(), separators=(",", ":"))
+
+    def copy(self) -> "KeystrokeLog":
+        return KeystrokeLog(array(TIME_TYPECODE, self._times), array(KEY_TYPECODE, self._codes))
+
+
+class KeystrokeLog(KeystrokeView):
+    """Append-only columnar keystroke log backed by typed arrays."""
+
+    def __init__(self, times_ms: Union[array, None] = None, codes: Union[array, None] = None) -> None:
+        super().__init__(
+            times_ms if times_ms is not None else array(TIME_TYPECODE),
+            codes if codes is not None else array(KEY_TYPECODE),
+        )
+
+    def append(self, t_seconds: float, key: str) -> None:
+        ms = max(0, int(round(t_seconds * 1000.0)))
+        for ch in key:
+            self._times.append(ms)
+            self._codes.append(ord(ch))
+
+    def view(self) -> KeystrokeView:
+        return KeystrokeView(self._times, self._codes)
+
+    @classmethod
+    def from_columnar(cls, data: Dict[str, Any]) -> "KeystrokeLog":
+        keys = data.get("k", "")
+        return cls(array(TIME_TYPECODE, data.get("t", [])), array(KEY_TYPECODE, map(ord, keys)))
+
+    @classmethod
+    def from_records(cls, records: Iterable[Dict[str, Any]]) -> "KeystrokeLog":
+        """Build a log from legacy {t: seconds, k: key} records."""
+        log = cls()
+        for rec in sorted(records, key=lambda x: x.get("t", 0)):
+            log.append(rec.get("t", 0), rec.get("k", ""))
+        return log
+
+    @classmethod
+    def deserialize(cls, payload: Union[str, bytes, None]) -> "KeystrokeLog":
+        if not payload:
+            return cls()
+        data = json.loads(payload)
+        if isinstance(data, dict):
+            return cls.from_columnar(data)
+        return cls.from_records(data)
+
+
+def as_keystroke_view(keystrokes: Union[KeystrokeView, Iterable[Dict[str, Any]], None]) -> KeystrokeView:
+    if keystrokes is None:
+        return KeystrokeLog()
+    if isinstance(keystrokes, KeystrokeView):
+        return keystrokes
+    return KeystrokeLog.from_records(keystrokes)
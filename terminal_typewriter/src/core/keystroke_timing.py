@@ -0,0 +1,174 @@
+"""Per-key and per-bigram timing from recorded keystroke logs.
+
+A session's keystroke stream is replayed against its target text in a
+single pass. Each keystroke is charged to the character it should have
+produced; its interval since the previous keystroke counts as that
+character's latency (and, with the character before it, the bigram's)
+only when the previous keystroke was itself correct, so corrections do
+not skew the figures. Everything is kept as additive counters plus
+fixed-width latency histograms, so profiles of different sessions can
+be summed (or subtracted) in the database and p90 stays answerable.
+"""
+
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .engine import BACKSPACE, ENTER
+
+BUCKET_MS = 25
+# The last bucket collects every interval of BUCKET_MS * (BUCKET_COUNT - 1) ms or more
+BUCKET_COUNT = 40
+
+KIND_KEY = "key"
+KIND_BIGRAM = "bigram"
+# All inter-key intervals of a session, stored under an empty item
+KIND_INTERVAL = "interval"
+
+_BACKSPACE_CODE = ord(BACKSPACE)
+_ENTER_CODE = ord(ENTER)
+_SPACE_CODE = ord(" ")
+
+# Counter positions in TimingProfile.items values
+_SAMPLES, _TOTAL_MS, _ATTEMPTS, _ERRORS, _HISTOGRAM = range(5)
+
+
+def histogram_quantile(histogram: Dict[int, int], q: float) -> float:
+    """Estimate the q-quantile latency (ms) from bucket counts, interpolating within a bucket."""
+    total = sum(histogram.values())
+    if total <= 0:
+        return 0.0
+    target = q * total
+    seen = 0
+    for bucket in sorted(histogram):
+        count = histogram[bucket]
+        if count > 0 and seen + count >= target:
+            return (bucket + (target - seen) / count) * BUCKET_MS
+        seen += count
+    return float(max(histogram) + 1) * BUCKET_MS
+
+
+@dataclass
+class TimingStat:
+    kind: str
+    item: str
+    samples: int = 0
+    total_ms: int = 0
+    attempts: int = 0
+    errors: int = 0
+    histogram: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def mean_ms(self) -> float:
+        return self.total_ms / self.samples if self.samples else 0.0
+
+    @property
+    def p90_ms(self) -> float:
+        return histogram_quantile(self.histogram, 0.9)
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.attempts if self.attempts else 0.0
+
+
+class TimingProfile:
+    """Additive timing counters for any number of sessions."""
+
+    def __init__(self) -> None:
+        self.items: Dict[Tuple[str, str], list] = {}
+
+    def _entry(self, kind: str, item: str) -> list:
+        entry = self.items.get((kind, item))
+        if entry is None:
+            entry = self.items[(kind, item)] = [0, 0, 0, 0, [0] * BUCKET_COUNT]
+        return entry
+
+    def add_session(self, text: str, events: Iterable[Tuple[int, int]]) -> None:
+        """Fold in one session: its target text and (timestamp_ms, code_point) keystrokes."""
+        items = self.items
+        entry_for = self._entry
+        intervals = entry_for(KIND_INTERVAL, "")[_HISTOGRAM]
+        length = len(text)
+        last_bucket = BUCKET_COUNT - 1
+        pos = 0
+        prev_ms: Optional[int] = None
+        prev_ok = False
+        for ms, code in events:
+            interval = None if prev_ms is None else ms - prev_ms
+            prev_ms = ms
+            bucket = 0
+            if interval is not None:
+                bucket = interval // BUCKET_MS
+                if bucket > last_bucket:
+                    bucket = last_bucket
+                intervals[bucket] += 1
+            if code == _BACKSPACE_CODE:
+                if pos:
+                    pos -= 1
+                prev_ok = False
+                continue
+            if pos >= length:
+                pos += 1
+                prev_ok = False
+                continue
+            expected = text[pos]
+            pos += 1
+            key = items.get((KIND_KEY, expected)) or entry_for(KIND_KEY, expected)
+            key[_ATTEMPTS] += 1
+            pair = None
+            if prev_ok:
+                bigram = text[pos - 2:pos]
+                pair = items.get((KIND_BIGRAM, bigram)) or entry_for(KIND_BIGRAM, bigram)
+                pair[_ATTEMPTS] += 1
+            if ord(expected) != (_SPACE_CODE if code == _ENTER_CODE else code):
+                key[_ERRORS] += 1
+                if pair is not None:
+                    pair[_ERRORS] += 1
+                prev_ok = False
+                continue
+            if prev_ok:
+                key[_SAMPLES] += 1
+                key[_TOTAL_MS] += interval
+                key[_HISTOGRAM][bucket] += 1
+                pair[_SAMPLES] += 1
+                pair[_TOTAL_MS] += interval
+                pair[_HISTOGRAM][bucket] += 1
+            prev_ok = True
+
+    def merge(self, other: "TimingProfile") -> None:
+        for (kind, item), theirs in other.items.items():
+            mine = self._entry(kind, item)
+            for i in range(_HISTOGRAM):
+                mine[i] += theirs[i]
+            mine[_HISTOGRAM] = [a + b for a, b in zip(mine[_HISTOGRAM], theirs[_HISTOGRAM])]
+
+    def stat(self, kind: str, item: str) -> Optional[TimingStat]:
+        entry = self.items.get((kind, item))
+        if entry is None:
+            return None
+        samples, total_ms, attempts, errors, histogram = entry
+        return TimingStat(kind, item, samples, total_ms, attempts, errors, {b: c for b, c in enumerate(histogram) if c})
+
+    def stats(self, kind: str) -> List[TimingStat]:
+        return [self.stat(k, item) for k, item in self.items if k == kind]
+
+    def counter_rows(self, sign: int = 1) -> List[Tuple[str, str, int, int, int, int]]:
+        """(kind, item, samples, total_ms, attempts, errors) rows, negated when sign is -1."""
+        return [
+            (kind, item, sign * e[_SAMPLES], sign * e[_TOTAL_MS], sign * e[_ATTEMPTS], sign * e[_ERRORS])
+            for (kind, item), e in self.items.items()
+        ]
+
+    def bucket_rows(self, sign: int = 1) -> List[Tuple[str, str, int, int]]:
+        """(kind, item, bucket, count) rows for every non-empty histogram bucket."""
+        return [
+            (kind, item, bucket, sign * count)
+            for (kind, item), e in self.items.items()
+            for bucket, count in enumerate(e[_HISTOGRAM])
+            if count
+        ]
+
+
+def analyze_session(text: str, events: Iterable[Tuple[int, int]]) -> TimingProfile:
+    profile = TimingProfile()
+    profile.add_session(text, events)
+    return profile
@@ -0,0 +1,136 @@
+"""Calendar buckets for time-bucketed session rollups.
+
+Bucket keys are strings that sort in time order within a period:
+"2024-05-17" (day), "2024-W20" (ISO week) and "2024-05" (month), so a
+date range maps to one contiguous key range.
+"""
+
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from .accumulators import QuantileDigest
+
+PERIOD_DAY = "day"
+PERIOD_WEEK = "week"
+PERIOD_MONTH = "month"
+PERIODS = (PERIOD_DAY, PERIOD_WEEK, PERIOD_MONTH)
+
+
+# Columns of a stored rollup row after (user_id, period, bucket)
+ROLLUP_COLUMNS = ("session_count", "sum_wpm", "max_wpm", "sum_accuracy", "max_accuracy", "wpm_digest")
+
+
+def _parse_date(value: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(value[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def bucket_key(day: date, period: str) -> str:
+    if period == PERIOD_DAY:
+        return day.isoformat()
+    if period == PERIOD_WEEK:
+        year, week, _ = day.isocalendar()
+        return f"{year}-W{week:02d}"
+    if period == PERIOD_MONTH:
+        return f"{day.year}-{day.month:02d}"
+    raise ValueError(f"Unknown rollup period '{period}'")
+
+
+def session_bucket(timestamp: Optional[str], period: str) -> Optional[str]:
+    """Bucket of a session timestamp (ISO 8601, UTC), or None if it has no usable date."""
+    day = _parse_date(timestamp) if timestamp else None
+    return bucket_key(day, period) if day else None
+
+
+def session_buckets(timestamp: Optional[str], cache: Optional[Dict[str, tuple]] = None) -> Tuple[Tuple[str, str], ...]:
+    """(period, bucket) pairs a session falls into, one per period; empty without a usable date.
+
+    Pass a dict as cache when bucketing many sessions; keys are per day.
+    """
+    day_text = (timestamp or "")[:10]
+    if cache is not None and day_text in cache:
+        return cache[day_text]
+    day = _parse_date(day_text)
+    buckets = tuple((period, bucket_key(day, period)) for period in PERIODS) if day else ()
+    if cache is not None:
+        cache[day_text] = buckets
+    return buckets
+
+
+def bucket_bounds(since: Optional[str], until: Optional[str], period: str) -> tuple:
+    """Inclusive (first, last) bucket keys covering dates in [since, until); None for open ends."""
+    first = session_bucket(since, period) if since else None
+    last_day = _parse_date(until) if until else None
+    last = bucket_key(last_day - timedelta(days=1), period) if last_day else None
+    return first, last
+
+
+def _next_start(day: date, period: str) -> date:
+    if period == PERIOD_DAY:
+        return day + timedelta(days=1)
+    if period == PERIOD_WEEK:
+        return day - timedelta(days=day.weekday()) + timedelta(weeks=1)
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def bucket_range(first: str, last: str, period: str) -> List[str]:
+    """Every bucket key from first to last inclusive, so gaps show up as empty buckets."""
+    if period == PERIOD_WEEK:
+        year, week = first.split("-W")
+        day = date.fromisocalendar(int(year), int(week), 1)
+    elif period == PERIOD_MONTH:
+        day = date.fromisoformat(first + "-01")
+    else:
+        day = date.fromisoformat(first)
+    keys = []
+    key = bucket_key(day, period)
+    while key <= last:
+        keys.append(key)
+        day = _next_start(day, period)
+        key = bucket_key(day, period)
+    return keys
+
+
+class RollupBucket:
+    """Count, mean, best and median (t-digest) of the sessions in one bucket."""
+
+    def __init__(self, count: int = 0, sum_wpm: float = 0.0, max_wpm: float = 0.0, sum_accuracy: float = 0.0, max_accuracy: float = 0.0, digest: Optional[QuantileDigest] = None) -> None:
+        self.count = count
+        self.sum_wpm = sum_wpm
+        self.max_wpm = max_wpm
+        self.sum_accuracy = sum_accuracy
+        self.max_accuracy = max_accuracy
+        self.digest = digest or QuantileDigest()
+
+    def update(self, wpm: float, accuracy: float) -> None:
+        self.count += 1
+        self.sum_wpm += wpm
+        self.sum_accuracy += accuracy
+        if wpm > self.max_wpm:
+            self.max_wpm = wpm
+        if accuracy > self.max_accuracy:
+            self.max_accuracy = accuracy
+        self.digest.update(wpm)
+
+    def to_row(self) -> tuple:
+        """Values for ROLLUP_COLUMNS."""
+        return (self.count, self.sum_wpm, self.max_wpm, self.sum_accuracy, self.max_accuracy, json.dumps(self.digest.to_dict()))
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "RollupBucket":
+        count, sum_wpm, max_wpm, sum_accuracy, max_accuracy, digest = row
+        return cls(count, sum_wpm, max_wpm, sum_accuracy, max_accuracy, QuantileDigest.from_dict(json.loads(digest)))
+
+    def summary(self) -> Dict[str, Any]:
+        count = self.count
+        return {
+            "count": count,
+            "avg_wpm": round(self.sum_wpm / count, 2) if count else 0,
+            "best_wpm": self.max_wpm,
+            "p50_wpm": round(self.digest.quantile(0.5), 2),
+            "avg_accuracy": round(self.sum_accuracy / count, 2) if count else 0,
+            "best_accuracy": self.max_accuracy,
+        }
@@ -1,7 +1,7 @@
-import time
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional
 
+from .clock import Clock, get_default_clock
 from ..data.models import RealtimeStats, TestResult
 
 
@@ -12,31 +12,67 @@ CHARACTERS_PER_WORD = 5.0
 class StatsTracker:
     target_text: str
     stats: RealtimeStats
+    clock: Clock = field(default_factory=get_default_clock, repr=False)
+    # One byte per typed position: 1 if it matches target_text, else 0.
+    # Kept in sync with the running counters so each keystroke is O(1).
+    _correct_bitmap: bytearray = field(default_factory=bytearray, init=False, repr=False)
 
     def start(self) -> None:
-        self.stats.start_time = time.time()
+        self.stats.start_time = self.clock.now()
         self.stats.elapsed_seconds = 0.0
         self.stats.characters_typed = 0
         self.stats.correct_characters = 0
         self.stats.errors = 0
         self.stats.wpm = 0.0
         self.stats.accuracy = 0.0
+        self._correct_bitmap = bytearray()
+
+    def apply_append(self, text: str) -> None:
+        """Score characters appended to the end of the input buffer."""
+        target = self.target_text
+        bitmap = self._correct_bitmap
+        correct = self.stats.correct_characters
+        for ch in text:
+            pos = len(bitmap)
+            hit = 1 if pos < len(target) and target[pos] == ch else 0
+            bitmap.append(hit)
+            correct += hit
+        self.stats.characters_typed = len(bitmap)
+        self.stats.correct_characters = correct
+        self._refresh_rates()
+
+    def apply_delete(self, count: int = 1) -> None:
+        """Unscore characters removed from the end of the input buffer."""
+        bitmap = self._correct_bitmap
+        correct = self.stats.correct_characters
+        for _ in range(min(count, len(bitmap))):
+            correct -= bitmap.pop()
+        self.stats.characters_typed = len(bitmap)
+        self.stats.correct_characters = correct
+        self._refresh_rates()
 
     def update_from_input(self, user_input: str) -> None:
-        now = time.time()
+        """Rescan the whole buffer; used for snapshot updates."""
+        target = self.target_text
+        bitmap = bytearray(
+            1 if i < len(target) and ch == target[i] else 0
+            for i, ch in enumerate(user_input)
+        )
+        self._correct_bitmap = bitmap
+        self.stats.characters_typed = len(bitmap)
+        self.stats.correct_characters = sum(bitmap)
+        self._refresh_rates()
+
+    def _refresh_rates(self, now: Optional[float] = None) -> None:
+        if now is None:
+            now = self.clock.now()
         if self.stats.start_time is None:
             self.stats.start_time = now
         self.stats.elapsed_seconds = max(0.0, now - self.stats.start_time)
 
-        typed_chars = len(user_input)
+        typed_chars = self.stats.characters_typed
+        correct = self.stats.correct_characters
         original_chars = len(self.target_text)
-        correct = 0
-        for i in range(min(typed_chars, original_chars)):
-            if user_input[i] == self.target_text[i]:
-                correct += 1
-
-        self.stats.characters_typed = typed_chars
-        self.stats.correct_characters = correct
         self.stats.errors = max(0, typed_chars - correct)
 
         minutes = self.stats.elapsed_seconds / 60.0 if self.stats.elapsed_seconds > 0 else 0
@@ -55,4 +91,4 @@ class StatsTracker:
             accuracy=self.stats.accuracy,
             errors=self.stats.errors,
         )
-        return result
\ No newline at end of file
+        return result
@@ -1,38 +1,111 @@
-import threading
-import time
+import math
 from typing import Callable, Optional
 
+from .clock import Clock, NANOS_PER_SECOND, get_default_clock
+
 
 class CountdownTimer:
-    def __init__(self, duration_seconds: int, on_tick: Optional[Callable[[int], None]] = None, on_complete: Optional[Callable[[], None]] = None) -> None:
+    """Deadline-based countdown driven by the caller's wait loop.
+
+    Ticks are scheduled against absolute offsets from the start time, so
+    they never drift, and no thread is involved: the input loop waits for
+    at most time_until_next_tick() and then calls poll() to fire callbacks.
+    """
+
+    def __init__(
+        self,
+        duration_seconds: float,
+        on_tick: Optional[Callable[[float], None]] = None,
+        on_complete: Optional[Callable[[], None]] = None,
+        clock: Optional[Clock] = None,
+        tick_interval: float = 1.0,
+    ) -> None:
+        if tick_interval <= 0:
+            raise ValueError("tick_interval must be positive")
         self.duration_seconds = duration_seconds
         self.on_tick = on_tick
         self.on_complete = on_complete
-        self._thread: Optional[threading.Thread] = None
-        self._stop_event = threading.Event()
-        self.remaining = duration_seconds
+        self.clock = clock or get_default_clock()
+        self.tick_interval = tick_interval
+        self._duration_ns = int(round(duration_seconds * NANOS_PER_SECOND))
+        self._tick_ns = int(round(tick_interval * NANOS_PER_SECOND))
+        self._start_ns: Optional[int] = None
+        self._deadline_ns: Optional[int] = None
+        self._next_tick_ns: Optional[int] = None
+        self._stopped_remaining_ns: Optional[int] = None
+        self._completed = False
 
     def start(self) -> None:
-        if self._thread and self._thread.is_alive():
+        if self._start_ns is not None and self._stopped_remaining_ns is None:
             return
-        self._stop_event.clear()
-        self._thread = threading.Thread(target=self._run, daemon=True)
-        self._thread.start()
-
-    def _run(self) -> None:
-        start = time.time()
-        while not self._stop_event.is_set():
-            elapsed = int(time.time() - start)
-            self.remaining = max(0, self.duration_seconds - elapsed)
-            if self.on_tick:
-                self.on_tick(self.remaining)
-            if self.remaining <= 0:
-                if self.on_complete:
-                    self.on_complete()
-                break
-            time.sleep(1)
+        now = self.clock.now_ns()
+        self._start_ns = now
+        self._deadline_ns = now + self._duration_ns
+        self._next_tick_ns = now + self._tick_ns
+        self._stopped_remaining_ns = None
+        self._completed = False
 
     def stop(self) -> None:
-        self._stop_event.set()
-        if self._thread and self._thread.is_alive():
-            self._thread.join(timeout=0.2)
\ No newline at end of file
+        if self._deadline_ns is not None and self._stopped_remaining_ns is None:
+            self._stopped_remaining_ns = self._remaining_ns(self.clock.now_ns())
+
+    def _remaining_ns(self, now_ns: int) -> int:
+        if self._stopped_remaining_ns is not None:
+            return self._stopped_remaining_ns
+        if self._deadline_ns is None:
+            return self._duration_ns
+        return max(0, self._deadline_ns - now_ns)
+
+    @property
+    def remaining_seconds(self) -> float:
+        return self._remaining_ns(self.clock.now_ns()) / NANOS_PER_SECOND
+
+    @property
+    def remaining(self) -> int:
+        """Whole seconds left, rounded up as a countdown display shows them."""
+        return math.ceil(self._remaining_ns(self.clock.now_ns()) / NANOS_PER_SECOND)
+
+    @property
+    def running(self) -> bool:
+        return self._deadline_ns is not None and self._stopped_remaining_ns is None and not self._completed
+
+    @property
+    def expired(self) -> bool:
+        return self._deadline_ns is not None and self._remaining_ns(self.clock.now_ns()) <= 0
+
+    def time_until_next_tick(self) -> float:
+        """Seconds until the next tick or the deadline, whichever is first."""
+        if not self.running:
+            return 0.0 if self.expired else math.inf
+        now = self.clock.now_ns()
+        next_event = min(self._next_tick_ns, self._deadline_ns)
+        return max(0, next_event - now) / NANOS_PER_SECOND
+
+    def poll(self) -> bool:
+        """Fire any due tick/completion callbacks. Returns True if one fired."""
+        if not self.running:
+            return False
+        now = self.clock.now_ns()
+        fired = False
+        if now >= self._next_tick_ns:
+            # Skip ticks that were missed entirely but stay on the original grid.
+            missed = (now - self._next_tick_ns) // self._tick_ns + 1
+            self._next_tick_ns += missed * self._tick_ns
+            if self.on_tick:
+                self.on_tick(self._remaining_ns(now) / NANOS_PER_SECOND)
+            fired = True
+        if now >= self._deadline_ns:
+            self._completed = True
+            if self.on_complete:
+                self.on_complete()
+            fired = True
+        return fired
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Sleep until the next timer event (or timeout) and poll."""
+        delay = self.time_until_next_tick()
+        if timeout is not None:
+            delay = min(delay, timeout)
+        if delay != math.inf:
+            self.clock.sleep(delay)
+        return self.poll()
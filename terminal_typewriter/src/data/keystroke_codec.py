@@ -0,0 +1,184 @@
+"""Compact binary encoding for keystroke logs stored in sessions.keystrokes_data.
+
+Layout::
+
+    byte 0    format version (FORMAT_VERSION)
+    byte 1    flags (FLAG_ZLIB: body is zlib-compressed)
+    body      varint count, then per keystroke:
+                zigzag varint of the millisecond delta from the previous key,
+                followed by the key as UTF-8
+
+Records are interleaved so a reader can decode them incrementally from a
+stream of chunks without knowing the total size up front.
+"""
+
+import zlib
+from array import array
+from typing import Iterable, Iterator, Tuple, Union
+
+from ..core.keystroke_log import KEY_TYPECODE, TIME_TYPECODE, KeystrokeLog, KeystrokeView
+
+
+FORMAT_VERSION = 1
+FLAG_ZLIB = 0x01
+HEADER_SIZE = 2
+
+# Bodies smaller than this are not worth the zlib header overhead
+COMPRESS_MIN_BYTES = 64
+
+
+def _write_varint(out: bytearray, value: int) -> None:
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _zigzag(value: int) -> int:
+    return (value << 1) if value >= 0 else ((-value << 1) - 1)
+
+
+def _unzigzag(value: int) -> int:
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1)
+
+
+def _utf8_length(lead: int) -> int:
+    if lead < 0x80:
+        return 1
+    if lead < 0xE0:
+        return 2
+    if lead < 0xF0:
+        return 3
+    return 4
+
+
+def is_binary_payload(payload: Union[str, bytes, None]) -> bool:
+    return isinstance(payload, (bytes, bytearray, memoryview))
+
+
+def encode_keystrokes(view: KeystrokeView, compress: bool = True) -> bytes:
+    body = bytearray()
+    _write_varint(body, len(view))
+    prev = 0
+    for ms, code in view.iter_raw():
+        _write_varint(body, _zigzag(ms - prev))
+        prev = ms
+        if code < 0x80:
+            body.append(code)
+        else:
+            body += chr(code).encode("utf-8")
+    flags = 0
+    if compress and len(body) >= COMPRESS_MIN_BYTES:
+        packed = zlib.compress(bytes(body), 6)
+        if len(packed) < len(body):
+            body = bytearray(packed)
+            flags |= FLAG_ZLIB
+    return bytes((FORMAT_VERSION, flags)) + bytes(body)
+
+
+def _decompressed_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Strip the header and yield the raw (decompressed) body incrementally."""
+    header = b""
+    inflater = None
+    for chunk in chunks:
+        if inflater is None:
+            header += chunk
+            if len(header) < HEADER_SIZE:
+                continue
+            version, flags = header[0], header[1]
+            if version != FORMAT_VERSION:
+                raise ValueError(f"Unsupported keystroke format version {version}")
+            inflater = zlib.decompressobj() if flags & FLAG_ZLIB else False
+            chunk = header[HEADER_SIZE:]
+        if inflater:
+            data = inflater.decompress(chunk)
+        else:
+            data = chunk
+        if data:
+            yield data
+    if inflater:
+        tail = inflater.flush()
+        if tail:
+            yield tail
+
+
+def iter_decode(chunks: Iterable[bytes]) -> Iterator[Tuple[int, int]]:
+    """Yield (timestamp_ms, code_point) pairs from a chunked binary payload."""
+    buf = b""
+    pos = 0
+    count = None
+    produced = 0
+    prev = 0
+    for data in _decompressed_chunks(chunks):
+        buf = buf[pos:] + data
+        pos = 0
+        size = len(buf)
+        while True:
+            # Parse one varint (and, after the count, one UTF-8 key); stop and
+            # wait for more data if the record is split across chunks.
+            value = 0
+            shift = 0
+            cursor = pos
+            while cursor < size:
+                byte = buf[cursor]
+                cursor += 1
+                value |= (byte & 0x7F) << shift
+                shift += 7
+                if not byte & 0x80:
+                    break
+            else:
+                break
+            if count is None:
+                count = value
+                pos = cursor
+                continue
+            if produced >= count or cursor >= size:
+                break
+            width = _utf8_length(buf[cursor])
+            if cursor + width > size:
+                break
+            code = ord(buf[cursor:cursor + width].decode("utf-8")) if width > 1 else buf[cursor]
+            prev += _unzigzag(value)
+            yield prev, code
+            produced += 1
+            pos = cursor + width
+
+
+def decode_keystrokes(payload: bytes) -> KeystrokeLog:
+    payload = bytes(payload)
+    if len(payload) < HEADER_SIZE or payload[0] != FORMAT_VERSION:
+        raise ValueError("Unsupported keystroke payload")
+    body = zlib.decompress(payload[HEADER_SIZE:]) if payload[1] & FLAG_ZLIB else payload[HEADER_SIZE:]
+    # Whole-payload fast path of iter_decode: one tight loop over the body
+    times = array(TIME_TYPECODE)
+    codes = array(KEY_TYPECODE)
+    size = len(body)
+    pos = 0
+    prev = 0
+    count = None
+    while pos < size:
+        value = 0
+        shift = 0
+        while True:
+            byte = body[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                break
+            shift += 7
+        if count is None:
+            count = value
+            continue
+        if len(codes) >= count:
+            break
+        prev += (value >> 1) if not value & 1 else -((value + 1) >> 1)
+        lead = body[pos]
+        if lead < 0x80:
+            codes.append(lead)
+            pos += 1
+        else:
+            width = _utf8_length(lead)
+            codes.append(ord(body[pos:pos + width].decode("utf-8")))
+            pos += width
+        times.append(prev)
+    return KeystrokeLog(times, codes)
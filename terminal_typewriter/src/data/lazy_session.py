@@ -0,0 +1,73 @@
+from collections.abc import Mapping
+from typing import TYPE_CHECKING, Any, Dict, Iterator, Optional, Tuple
+
+from ..core.keystroke_log import KeystrokeLog
+from .keystroke_codec import iter_decode
+
+if TYPE_CHECKING:
+    from .storage import StorageManager
+
+
+class LazyKeystrokes:
+    """Keystrokes of one stored session, read from the database on demand.
+
+    iter_raw() decodes the binary payload incrementally from blob chunks,
+    so replay can start before (or without) reading the whole log; load()
+    decodes everything once and caches the result.
+    """
+
+    def __init__(self, storage: "StorageManager", session_id: str, payload_type: Optional[str], size: int) -> None:
+        self.storage = storage
+        self.session_id = session_id
+        self.payload_type = payload_type
+        self.size = size
+        self._log: Optional[KeystrokeLog] = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._log is not None
+
+    def load(self) -> KeystrokeLog:
+        if self._log is None:
+            self._log = self.storage.load_keystrokes(self.session_id)
+        return self._log
+
+    def iter_raw(self) -> Iterator[Tuple[int, int]]:
+        """Yield (timestamp_ms, code_point) pairs."""
+        if self._log is not None:
+            return self._log.iter_raw()
+        if self.payload_type != "blob" or not self.size:
+            # Empty, or a legacy JSON payload that has to be parsed whole
+            return self.load().iter_raw()
+        return iter_decode(self.storage.iter_keystroke_chunks(self.session_id))
+
+    def __iter__(self) -> Iterator[Tuple[float, str]]:
+        for ms, code in self.iter_raw():
+            yield ms / 1000.0, chr(code)
+
+
+class LazySession(Mapping):
+    """Session record whose summary fields are loaded up front.
+
+    Reading session["keystrokes"] decodes the full log on first access;
+    use keystroke_stream to consume it incrementally instead.
+    """
+
+    def __init__(self, summary: Dict[str, Any], keystroke_stream: LazyKeystrokes) -> None:
+        self._summary = summary
+        self.keystroke_stream = keystroke_stream
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "keystrokes":
+            return self.keystroke_stream.load()
+        return self._summary[key]
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._summary
+        yield "keystrokes"
+
+    def __len__(self) -> int:
+        return len(self._summary) + 1
+
+    def __repr__(self) -> str:
+        return f"LazySession({self._summary!r})"
@@ -1,5 +1,753 @@
-from .storage import StorageManager
+"""Versioned schema migrations for the session database.
 
+The schema version lives in ``PRAGMA user_version``. Each Migration in
+MIGRATIONS is applied once, in order, and bumps the version when it
+completes. A database that is already current costs a single PRAGMA read
+at startup.
 
-def run_migrations(db_path: str | None = None) -> None:
-    StorageManager(db_path=db_path)  # initialization ensures schema
\ No newline at end of file
+Schema changes run in one transaction together with the version bump.
+Backfills over large tables are marked ``transactional=False``: they
+commit in bounded batches, report progress, and are written to be
+idempotent so an interrupted run simply resumes on the next start.
+Backfills that add into running totals cannot be repeated, so they keep
+a high-water mark in the backfills table instead (see run_backfill).
+"""
+
+import json
+import sqlite3
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .keystroke_codec import encode_keystrokes, is_binary_payload, iter_decode
+from .texts import hash_text
+from ..core.accumulators import MetricAccumulator
+from ..core.keystroke_log import KeystrokeLog
+from ..core.keystroke_timing import TimingProfile
+from ..core.rollups import ROLLUP_COLUMNS, RollupBucket, session_buckets
+
+
+ProgressCallback = Callable[[str, int, int], None]
+
+BATCH_SIZE = 500
+DEFAULT_USER = "Guest"
+# Session metrics with a persisted MetricAccumulator per user
+ACCUMULATED_METRICS = ("wpm", "accuracy")
+# PRAGMA auto_vacuum value for INCREMENTAL
+AUTO_VACUUM_INCREMENTAL = 2
+# Databases up to this many pages are rewritten for incremental vacuum at
+# startup; larger ones wait for `retention reclaim` (see RetentionManager)
+STARTUP_VACUUM_MAX_PAGES = 1024
+
+
+@dataclass
+class MigrationContext:
+    progress: Optional[ProgressCallback] = None
+    batch_size: int = BATCH_SIZE
+    compress_keystrokes: bool = True
+    # Owner of sessions recorded before the store was partitioned by user
+    default_user: str = DEFAULT_USER
+
+    def report(self, message: str, done: int, total: int) -> None:
+        if self.progress:
+            self.progress(message, done, total)
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: int
+    description: str
+    apply: Callable[[sqlite3.Connection, MigrationContext], None]
+    transactional: bool = True
+
+
+def _table_columns(conn: sqlite3.Connection, table: str) -> List[str]:
+    return [r[1] for r in conn.execute(f"PRAGMA table_info({table})")]
+
+
+# Revisions start at a random value, so a recreated database never repeats
+# the revisions (and so the cached reports) of the one it replaced
+_RANDOM_REVISION = "abs(random()) % 9007199254740992"
+
+
+def find_user(conn: sqlite3.Connection, name: str) -> Optional[int]:
+    """Id of the named user, or None if there is no such user."""
+    row = conn.execute("SELECT id FROM users WHERE name = ?", (name,)).fetchone()
+    return int(row[0]) if row else None
+
+
+def ensure_user(conn: sqlite3.Connection, name: str) -> int:
+    """Id of the named user, creating the row on first use.
+
+    Expects the fully migrated schema.
+    """
+    conn.execute(f"INSERT INTO users (name, revision) VALUES (?, {_RANDOM_REVISION}) ON CONFLICT (name) DO NOTHING", (name,))
+    return find_user(conn, name)
+
+
+def rebuild_aggregate_tables(conn: sqlite3.Connection, user_id: Optional[int] = None) -> None:
+    """Recompute session_totals and mode_totals from the sessions table.
+
+    Rebuilds every user, or only user_id when given.
+    """
+    where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    conn.execute(f"DELETE FROM session_totals {where}", params)
+    conn.execute(f"DELETE FROM mode_totals {where}", params)
+    conn.execute(
+        f"""
+        INSERT INTO session_totals (user_id, session_count, total_time, total_errors, sum_wpm, max_wpm, sum_accuracy, max_accuracy)
+        SELECT user_id, COUNT(1), TOTAL(duration), TOTAL(errors), TOTAL(wpm), COALESCE(MAX(wpm), 0), TOTAL(accuracy), COALESCE(MAX(accuracy), 0)
+        FROM sessions
+        {where}
+        GROUP BY user_id
+        """,
+        params,
+    )
+    conn.execute(
+        f"""
+        INSERT INTO mode_totals (user_id, mode, session_count, total_time, total_errors, sum_wpm, max_wpm, sum_accuracy, max_accuracy)
+        SELECT user_id, COALESCE(mode, 'unknown'), COUNT(1), TOTAL(duration), TOTAL(errors), TOTAL(wpm), COALESCE(MAX(wpm), 0), TOTAL(accuracy), COALESCE(MAX(accuracy), 0)
+        FROM sessions
+        {where}
+        GROUP BY user_id, COALESCE(mode, 'unknown')
+        """,
+        params,
+    )
+
+
+def rebuild_metric_accumulators(conn: sqlite3.Connection, user_id: Optional[int] = None) -> None:
+    """Recompute metric_accumulators by streaming the sessions table once.
+
+    Rebuilds every user, or only user_id when given.
+    """
+    where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    conn.execute(f"DELETE FROM metric_accumulators {where}", params)
+    accumulators: Dict[int, List[MetricAccumulator]] = {}
+    for row in conn.execute(f"SELECT user_id, {', '.join(ACCUMULATED_METRICS)} FROM sessions {where}", params):
+        per_metric = accumulators.get(row[0])
+        if per_metric is None:
+            per_metric = accumulators[row[0]] = [MetricAccumulator() for _ in ACCUMULATED_METRICS]
+        for accumulator, value in zip(per_metric, row[1:]):
+            accumulator.update(value or 0)
+    conn.executemany(
+        "INSERT INTO metric_accumulators (user_id, metric, state) VALUES (?, ?, ?)",
+        [
+            (owner, metric, json.dumps(accumulator.to_dict()))
+            for owner, per_metric in accumulators.items()
+            for metric, accumulator in zip(ACCUMULATED_METRICS, per_metric)
+        ],
+    )
+
+
+def _load_accumulators(conn: sqlite3.Connection, user_id: int) -> Dict[str, MetricAccumulator]:
+    rows = conn.execute("SELECT metric, state FROM metric_accumulators WHERE user_id = ?", (user_id,)).fetchall()
+    loaded = {metric: MetricAccumulator.from_dict(json.loads(state)) for metric, state in rows}
+    return {metric: loaded.get(metric) or MetricAccumulator() for metric in ACCUMULATED_METRICS}
+
+
+def add_to_metric_accumulators(conn: sqlite3.Connection, rows: Iterable[tuple]) -> None:
+    """Feed (user_id, *ACCUMULATED_METRICS values) session rows into the persisted accumulators."""
+    by_user: Dict[int, List[tuple]] = {}
+    for row in rows:
+        by_user.setdefault(row[0], []).append(row[1:])
+    for user_id, values in by_user.items():
+        accumulators = _load_accumulators(conn, user_id)
+        for index, metric in enumerate(ACCUMULATED_METRICS):
+            for value in values:
+                accumulators[metric].update(value[index] or 0)
+        conn.executemany(
+            "INSERT INTO metric_accumulators (user_id, metric, state) VALUES (?, ?, ?) "
+            "ON CONFLICT (user_id, metric) DO UPDATE SET state = excluded.state",
+            [(user_id, metric, json.dumps(accumulator.to_dict())) for metric, accumulator in accumulators.items()],
+        )
+
+
+def add_timing_profile(conn: sqlite3.Connection, user_id: int, profile: TimingProfile, sign: int = 1) -> None:
+    """Add (or, with sign=-1, subtract) a profile to the user's keystroke timing tables."""
+    conn.executemany(
+        """
+        INSERT INTO keystroke_timing (user_id, kind, item, samples, total_ms, attempts, errors) VALUES (?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, kind, item) DO UPDATE SET
+            samples = samples + excluded.samples,
+            total_ms = total_ms + excluded.total_ms,
+            attempts = attempts + excluded.attempts,
+            errors = errors + excluded.errors
+        """,
+        [(user_id,) + row for row in profile.counter_rows(sign)],
+    )
+    conn.executemany(
+        """
+        INSERT INTO keystroke_latency_buckets (user_id, kind, item, bucket, count) VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (user_id, kind, item, bucket) DO UPDATE SET count = count + excluded.count
+        """,
+        [(user_id,) + row for row in profile.bucket_rows(sign)],
+    )
+
+
+def iter_payload_events(payload) -> Iterator[Tuple[int, int]]:
+    """(timestamp_ms, code_point) pairs of a stored keystroke payload."""
+    if is_binary_payload(payload):
+        return iter_decode([bytes(payload)])
+    return KeystrokeLog.deserialize(payload).iter_raw()
+
+
+def rebuild_keystroke_timing(conn: sqlite3.Connection, user_id: Optional[int] = None) -> None:
+    """Recompute keystroke timing from the keystroke payloads still held inline.
+
+    Sessions whose payloads were archived or dropped by retention no
+    longer contribute, so this is for backfills, not routine upkeep.
+    """
+    where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    conn.execute(f"DELETE FROM keystroke_timing {where}", params)
+    conn.execute(f"DELETE FROM keystroke_latency_buckets {where}", params)
+    rows = conn.execute(
+        f"""
+        SELECT s.user_id, t.content, s.keystrokes_data
+        FROM sessions s
+        JOIN texts t ON t.hash = s.text_hash
+        WHERE s.keystrokes_data IS NOT NULL {"AND s.user_id = ?" if user_id is not None else ""}
+        """,
+        params,
+    )
+    add_session_timing(conn, rows)
+
+
+def add_session_timing(conn: sqlite3.Connection, rows: Iterable[tuple]) -> None:
+    """Add the keystroke timing of (user_id, text, payload) session rows, skipping those missing either."""
+    profiles: Dict[int, TimingProfile] = {}
+    for owner, text, payload in rows:
+        if text and payload is not None:
+            profiles.setdefault(owner, TimingProfile()).add_session(text, iter_payload_events(payload))
+    for owner, profile in profiles.items():
+        add_timing_profile(conn, owner, profile)
+
+
+def write_rollups(conn: sqlite3.Connection, buckets: Dict[tuple, RollupBucket]) -> None:
+    """Store RollupBuckets keyed on (user_id, period, bucket), replacing existing rows."""
+    conn.executemany(
+        f"INSERT OR REPLACE INTO session_rollups (user_id, period, bucket, {', '.join(ROLLUP_COLUMNS)}) "
+        f"VALUES (?, ?, ?, {', '.join('?' for _ in ROLLUP_COLUMNS)})",
+        [key + rollup.to_row() for key, rollup in buckets.items()],
+    )
+
+
+def add_to_rollups(conn: sqlite3.Connection, rows: Iterable[tuple]) -> None:
+    """Fold (user_id, timestamp, wpm, accuracy) session rows into their day, week and month rollups."""
+    buckets: Dict[tuple, RollupBucket] = {}
+    days: Dict[str, tuple] = {}
+    for owner, timestamp, wpm, accuracy in rows:
+        for period, bucket in session_buckets(timestamp, days):
+            key = (owner, period, bucket)
+            rollup = buckets.get(key)
+            if rollup is None:
+                row = conn.execute(
+                    f"SELECT {', '.join(ROLLUP_COLUMNS)} FROM session_rollups WHERE user_id = ? AND period = ? AND bucket = ?",
+                    key,
+                ).fetchone()
+                rollup = buckets[key] = RollupBucket.from_row(row) if row else RollupBucket()
+            rollup.update(wpm or 0, accuracy or 0)
+    write_rollups(conn, buckets)
+
+
+def rebuild_rollups(conn: sqlite3.Connection, user_id: Optional[int] = None) -> None:
+    """Recompute session_rollups by streaming the sessions table once.
+
+    Rebuilds every user, or only user_id when given.
+    """
+    where, params = ("WHERE user_id = ?", (user_id,)) if user_id is not None else ("", ())
+    conn.execute(f"DELETE FROM session_rollups {where}", params)
+    buckets: Dict[tuple, RollupBucket] = {}
+    days: Dict[str, tuple] = {}
+    for owner, timestamp, wpm, accuracy in conn.execute(f"SELECT user_id, timestamp, wpm, accuracy FROM sessions {where}", params):
+        for period, bucket in session_buckets(timestamp, days):
+            rollup = buckets.get((owner, period, bucket))
+            if rollup is None:
+                rollup = buckets[(owner, period, bucket)] = RollupBucket()
+            rollup.update(wpm or 0, accuracy or 0)
+    write_rollups(conn, buckets)
+
+
+def schedule_backfill(conn: sqlite3.Connection, name: str) -> None:
+    """Queue the batched backfill called name for run_backfill, starting from the first session."""
+    conn.execute("CREATE TABLE IF NOT EXISTS backfills (name TEXT PRIMARY KEY, last_rowid INTEGER NOT NULL DEFAULT 0)")
+    conn.execute("INSERT OR REPLACE INTO backfills (name, last_rowid) VALUES (?, 0)", (name,))
+
+
+def run_backfill(conn: sqlite3.Connection, ctx: MigrationContext, name: str, message: str, select: str, apply: Callable[[List[tuple]], None]) -> int:
+    """Run a scheduled backfill over the sessions table, one committed batch at a time.
+
+    select must take (last_rowid, limit) and return rows led by the
+    session rowid, in rowid order. Each batch is applied and the
+    high-water mark advanced in the same write transaction, so an
+    interrupted run (or a second process migrating the same file) resumes
+    after the last committed batch without counting a session twice. The
+    backfill is forgotten once it runs out of sessions; one that was never
+    scheduled does nothing. Returns the number of sessions processed.
+    """
+    if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'backfills'").fetchone():
+        return 0
+    row = conn.execute("SELECT last_rowid FROM backfills WHERE name = ?", (name,)).fetchone()
+    if row is None:
+        return 0
+    (total,) = conn.execute("SELECT COUNT(1) FROM sessions WHERE rowid > ?", row).fetchone()
+    processed = 0
+    while True:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT last_rowid FROM backfills WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            conn.rollback()
+            return processed
+        rows = conn.execute(select, (row[0], ctx.batch_size)).fetchall()
+        if rows:
+            apply(rows)
+            conn.execute("UPDATE backfills SET last_rowid = ? WHERE name = ?", (rows[-1][0], name))
+        else:
+            conn.execute("DELETE FROM backfills WHERE name = ?", (name,))
+        conn.commit()
+        if not rows:
+            return processed
+        processed += len(rows)
+        ctx.report(message, processed, total)
+
+
+def _encode_legacy_keystrokes(payload: str, compress: bool) -> Optional[bytes]:
+    """The binary form of a legacy JSON payload, or None if it cannot be read."""
+    try:
+        return encode_keystrokes(KeystrokeLog.deserialize(payload), compress=compress)
+    except (ValueError, TypeError, KeyError, AttributeError):
+        return None
+
+
+def convert_keystrokes_to_binary(conn: sqlite3.Connection, batch_size: int = BATCH_SIZE, progress: Optional[ProgressCallback] = None, compress: bool = True) -> int:
+    """Re-encode legacy JSON keystroke rows into the binary format.
+
+    Works through the table in rowid order, one committed batch at a time,
+    so it can be interrupted and resumed. A payload that does not parse
+    (e.g. truncated) is cleared to NULL, like a session recorded without
+    keystrokes, and the number cleared is reported at the end. Returns the
+    number of rows converted.
+    """
+    (total,) = conn.execute("SELECT COUNT(1) FROM sessions WHERE typeof(keystrokes_data) = 'text'").fetchone()
+    processed = 0
+    cleared = 0
+    last_rowid = 0
+    while processed < total:
+        rows = conn.execute(
+            """
+            SELECT rowid, keystrokes_data FROM sessions
+            WHERE rowid > ? AND typeof(keystrokes_data) = 'text'
+            ORDER BY rowid
+            LIMIT ?
+            """,
+            (last_rowid, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        updates = [(_encode_legacy_keystrokes(payload, compress), rowid) for rowid, payload in rows]
+        cleared += sum(1 for encoded, _ in updates if encoded is None)
+        conn.executemany("UPDATE sessions SET keystrokes_data = ? WHERE rowid = ?", updates)
+        conn.commit()
+        last_rowid = rows[-1][0]
+        processed += len(rows)
+        if progress:
+            progress("Converting keystrokes to binary format", processed, total)
+    if cleared and progress:
+        progress("Cleared unreadable keystroke logs", cleared, cleared)
+    return processed - cleared
+
+
+def move_texts_to_store(conn: sqlite3.Connection, batch_size: int = BATCH_SIZE, progress: Optional[ProgressCallback] = None) -> int:
+    """Replace inline sessions.text values with references into texts.
+
+    Each batch stores the distinct passages once, points the rows at them
+    by hash and clears the inline copy, then commits; rerunning continues
+    where an interrupted run stopped. Returns the number of rows moved.
+    """
+    (total,) = conn.execute("SELECT COUNT(1) FROM sessions WHERE text IS NOT NULL").fetchone()
+    moved = 0
+    last_rowid = 0
+    while moved < total:
+        rows = conn.execute(
+            """
+            SELECT rowid, text FROM sessions
+            WHERE rowid > ? AND text IS NOT NULL
+            ORDER BY rowid
+            LIMIT ?
+            """,
+            (last_rowid, batch_size),
+        ).fetchall()
+        if not rows:
+            break
+        hashed = [(rowid, hash_text(text), text) for rowid, text in rows]
+        conn.executemany(
+            "INSERT INTO texts (hash, content) VALUES (?, ?) ON CONFLICT (hash) DO NOTHING",
+            {(digest, text) for _, digest, text in hashed},
+        )
+        conn.executemany(
+            "UPDATE sessions SET text_hash = ?, text = NULL WHERE rowid = ?",
+            [(digest, rowid) for rowid, digest, _ in hashed],
+        )
+        conn.commit()
+        last_rowid = rows[-1][0]
+        moved += len(rows)
+        if progress:
+            progress("Moving session texts to the text store", moved, total)
+    return moved
+
+
+def _create_sessions(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS sessions (
+            id TEXT PRIMARY KEY,
+            timestamp TEXT,
+            mode TEXT,
+            duration REAL,
+            text_length INTEGER,
+            wpm REAL,
+            accuracy REAL,
+            errors INTEGER,
+            keystrokes_data TEXT
+        )
+        """
+    )
+    # Databases from before versioning may predate the 'text' column
+    if "text" not in _table_columns(conn, "sessions"):
+        conn.execute("ALTER TABLE sessions ADD COLUMN text TEXT")
+
+
+def _create_history_indexes(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # History queries all read newest-first, optionally within one mode
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_timestamp ON sessions (timestamp)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_mode_timestamp ON sessions (mode, timestamp)")
+
+
+_AGGREGATE_COLUMNS = """
+    session_count INTEGER NOT NULL DEFAULT 0,
+    total_time REAL NOT NULL DEFAULT 0,
+    total_errors INTEGER NOT NULL DEFAULT 0,
+    sum_wpm REAL NOT NULL DEFAULT 0,
+    max_wpm REAL NOT NULL DEFAULT 0,
+    sum_accuracy REAL NOT NULL DEFAULT 0,
+    max_accuracy REAL NOT NULL DEFAULT 0
+"""
+
+
+def _create_aggregates(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # Aggregates over the whole history, maintained by save_session. They
+    # are re-keyed per user and filled by migration 12.
+    conn.execute(f"CREATE TABLE IF NOT EXISTS session_totals (id INTEGER PRIMARY KEY CHECK (id = 1), {_AGGREGATE_COLUMNS})")
+    conn.execute(f"CREATE TABLE IF NOT EXISTS mode_totals (mode TEXT PRIMARY KEY, {_AGGREGATE_COLUMNS})")
+
+
+def _binary_keystrokes(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    convert_keystrokes_to_binary(conn, ctx.batch_size, ctx.progress, ctx.compress_keystrokes)
+
+
+def _keyset_history_indexes(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # Extend the history indexes with id so (timestamp, id) keyset cursors
+    # are fully indexed and ties on timestamp page deterministically
+    conn.execute("DROP INDEX IF EXISTS idx_sessions_timestamp")
+    conn.execute("DROP INDEX IF EXISTS idx_sessions_mode_timestamp")
+    conn.execute("CREATE INDEX idx_sessions_timestamp ON sessions (timestamp, id)")
+    conn.execute("CREATE INDEX idx_sessions_mode_timestamp ON sessions (mode, timestamp, id)")
+
+
+def _create_text_store(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # Passages are stored once, keyed by content hash; sessions.text is
+    # kept only as the legacy inline column and is always NULL afterwards
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS texts (
+            hash TEXT PRIMARY KEY,
+            content TEXT NOT NULL
+        )
+        """
+    )
+    if "text_hash" not in _table_columns(conn, "sessions"):
+        conn.execute("ALTER TABLE sessions ADD COLUMN text_hash TEXT REFERENCES texts (hash)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_text_hash ON sessions (text_hash, timestamp, id)")
+
+
+def _move_texts(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    move_texts_to_store(conn, ctx.batch_size, ctx.progress)
+
+
+def _keystroke_location(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # NULL while keystrokes are inline; 'archive' or 'dropped' once retention
+    # has moved them out, so replay can tell an emptied row from an empty one
+    if "keystrokes_location" not in _table_columns(conn, "sessions"):
+        conn.execute("ALTER TABLE sessions ADD COLUMN keystrokes_location TEXT")
+
+
+def enable_incremental_vacuum(conn: sqlite3.Connection) -> bool:
+    """Switch the file to incremental auto-vacuum; returns False if it already was.
+
+    The mode of an existing file only changes on a full VACUUM, which
+    rewrites the whole database. Afterwards freed pages can be returned in
+    small incremental_vacuum steps.
+    """
+    (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+    if mode == AUTO_VACUUM_INCREMENTAL:
+        return False
+    conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+    conn.execute("VACUUM")
+    return True
+
+
+def _incremental_auto_vacuum(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # Only new and small databases are rewritten here; a large history would
+    # stall startup, so it keeps its mode until the user runs retention
+    (pages,) = conn.execute("PRAGMA page_count").fetchone()
+    if pages <= STARTUP_VACUUM_MAX_PAGES:
+        enable_incremental_vacuum(conn)
+
+
+def _create_users(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE
+        )
+        """
+    )
+    if "user_id" not in _table_columns(conn, "sessions"):
+        conn.execute("ALTER TABLE sessions ADD COLUMN user_id INTEGER REFERENCES users (id)")
+    # users has no revision column yet; migration 15 adds it
+    conn.execute("INSERT INTO users (name) VALUES (?) ON CONFLICT (name) DO NOTHING", (ctx.default_user,))
+
+
+def _assign_sessions_to_default_user(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    (user_id,) = conn.execute("SELECT id FROM users WHERE name = ?", (ctx.default_user,)).fetchone()
+    (total,) = conn.execute("SELECT COUNT(1) FROM sessions WHERE user_id IS NULL").fetchone()
+    done = 0
+    while done < total:
+        cur = conn.execute(
+            "UPDATE sessions SET user_id = ? WHERE rowid IN (SELECT rowid FROM sessions WHERE user_id IS NULL LIMIT ?)",
+            (user_id, ctx.batch_size),
+        )
+        conn.commit()
+        if not cur.rowcount:
+            break
+        done += cur.rowcount
+        ctx.report(f"Assigning existing sessions to {ctx.default_user}", done, total)
+
+
+def _partition_by_user(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # Per-user indexes lead with user_id and carry every summary column, so
+    # history pages and passage comparisons are answered from the index alone.
+    # idx_sessions_timestamp stays for whole-database work such as retention.
+    conn.execute("DROP INDEX IF EXISTS idx_sessions_mode_timestamp")
+    conn.execute("DROP INDEX IF EXISTS idx_sessions_text_hash")
+    conn.execute(
+        "CREATE INDEX idx_sessions_user_timestamp ON sessions "
+        "(user_id, timestamp, id, mode, duration, text_length, wpm, accuracy, errors, text_hash)"
+    )
+    conn.execute(
+        "CREATE INDEX idx_sessions_user_mode_timestamp ON sessions "
+        "(user_id, mode, timestamp, id, duration, text_length, wpm, accuracy, errors, text_hash)"
+    )
+    conn.execute(
+        "CREATE INDEX idx_sessions_user_text_hash ON sessions "
+        "(user_id, text_hash, timestamp, id, mode, duration, text_length, wpm, accuracy, errors)"
+    )
+    conn.execute("DROP TABLE session_totals")
+    conn.execute("DROP TABLE mode_totals")
+    conn.execute(f"CREATE TABLE session_totals (user_id INTEGER PRIMARY KEY REFERENCES users (id), {_AGGREGATE_COLUMNS})")
+    conn.execute(
+        f"CREATE TABLE mode_totals (user_id INTEGER NOT NULL REFERENCES users (id), mode TEXT NOT NULL, {_AGGREGATE_COLUMNS}, "
+        "PRIMARY KEY (user_id, mode))"
+    )
+    rebuild_aggregate_tables(conn)
+
+
+def _create_metric_accumulators(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    conn.execute(
+        """
+        CREATE TABLE metric_accumulators (
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            metric TEXT NOT NULL,
+            state TEXT NOT NULL,
+            PRIMARY KEY (user_id, metric)
+        )
+        """
+    )
+    schedule_backfill(conn, "metric_accumulators")
+
+
+def _create_keystroke_timing(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    conn.execute(
+        """
+        CREATE TABLE keystroke_timing (
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            kind TEXT NOT NULL,
+            item TEXT NOT NULL,
+            samples INTEGER NOT NULL DEFAULT 0,
+            total_ms INTEGER NOT NULL DEFAULT 0,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            errors INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, kind, item)
+        ) WITHOUT ROWID
+        """
+    )
+    conn.execute(
+        """
+        CREATE TABLE keystroke_latency_buckets (
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            kind TEXT NOT NULL,
+            item TEXT NOT NULL,
+            bucket INTEGER NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user_id, kind, item, bucket)
+        ) WITHOUT ROWID
+        """
+    )
+    schedule_backfill(conn, "keystroke_timing")
+
+
+def _user_revisions(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # Bumped by every write that changes a user's sessions; cached reports
+    # are keyed on it
+    conn.execute("ALTER TABLE users ADD COLUMN revision INTEGER NOT NULL DEFAULT 0")
+    conn.execute(f"UPDATE users SET revision = {_RANDOM_REVISION}")
+
+
+def _create_rollups(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    conn.execute(
+        """
+        CREATE TABLE session_rollups (
+            user_id INTEGER NOT NULL REFERENCES users (id),
+            period TEXT NOT NULL,
+            bucket TEXT NOT NULL,
+            session_count INTEGER NOT NULL DEFAULT 0,
+            sum_wpm REAL NOT NULL DEFAULT 0,
+            max_wpm REAL NOT NULL DEFAULT 0,
+            sum_accuracy REAL NOT NULL DEFAULT 0,
+            max_accuracy REAL NOT NULL DEFAULT 0,
+            wpm_digest TEXT NOT NULL,
+            PRIMARY KEY (user_id, period, bucket)
+        ) WITHOUT ROWID
+        """
+    )
+    schedule_backfill(conn, "session_rollups")
+
+
+def _index_inline_keystrokes(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # Retention looks for the oldest payloads still held inline; a partial
+    # index skips the rows it has already retired instead of rescanning them
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_sessions_inline_keystrokes ON sessions (timestamp) WHERE keystrokes_data IS NOT NULL")
+
+
+def _backfill_metric_accumulators(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    run_backfill(
+        conn,
+        ctx,
+        "metric_accumulators",
+        "Backfilling metric accumulators",
+        f"SELECT rowid, user_id, {', '.join(ACCUMULATED_METRICS)} FROM sessions WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        lambda rows: add_to_metric_accumulators(conn, [row[1:] for row in rows]),
+    )
+
+
+def _backfill_keystroke_timing(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    # Only payloads still held inline contribute; archived and dropped ones are skipped
+    run_backfill(
+        conn,
+        ctx,
+        "keystroke_timing",
+        "Backfilling keystroke timing",
+        """
+        SELECT s.rowid, s.user_id, t.content, s.keystrokes_data
+        FROM sessions s
+        LEFT JOIN texts t ON t.hash = s.text_hash
+        WHERE s.rowid > ?
+        ORDER BY s.rowid
+        LIMIT ?
+        """,
+        lambda rows: add_session_timing(conn, [row[1:] for row in rows]),
+    )
+
+
+def _backfill_rollups(conn: sqlite3.Connection, ctx: MigrationContext) -> None:
+    run_backfill(
+        conn,
+        ctx,
+        "session_rollups",
+        "Backfilling session rollups",
+        "SELECT rowid, user_id, timestamp, wpm, accuracy FROM sessions WHERE rowid > ? ORDER BY rowid LIMIT ?",
+        lambda rows: add_to_rollups(conn, [row[1:] for row in rows]),
+    )
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Create sessions table", _create_sessions),
+    Migration(2, "Index session history by timestamp and mode", _create_history_indexes),
+    Migration(3, "Create aggregate tables", _create_aggregates),
+    Migration(4, "Convert keystrokes to binary format", _binary_keystrokes, transactional=False),
+    Migration(5, "Index session history by (timestamp, id) for keyset paging", _keyset_history_indexes),
+    Migration(6, "Create content-addressed text store", _create_text_store),
+    Migration(7, "Move session texts to the text store", _move_texts, transactional=False),
+    Migration(8, "Track where retained keystrokes live", _keystroke_location),
+    Migration(9, "Enable incremental auto-vacuum", _incremental_auto_vacuum, transactional=False),
+    Migration(10, "Create users table", _create_users),
+    Migration(11, "Assign existing sessions to the default user", _assign_sessions_to_default_user, transactional=False),
+    Migration(12, "Partition indexes and aggregates by user", _partition_by_user),
+    Migration(13, "Create streaming metric accumulators", _create_metric_accumulators),
+    Migration(14, "Aggregate per-key and bigram keystroke timing", _create_keystroke_timing),
+    Migration(15, "Track a change revision per user", _user_revisions),
+    Migration(16, "Roll sessions up by day, week and month", _create_rollups),
+    Migration(17, "Index sessions whose keystrokes are still inline", _index_inline_keystrokes),
+    Migration(18, "Backfill metric accumulators", _backfill_metric_accumulators, transactional=False),
+    Migration(19, "Backfill keystroke timing", _backfill_keystroke_timing, transactional=False),
+    Migration(20, "Backfill session rollups", _backfill_rollups, transactional=False),
+]
+
+
+class MigrationRunner:
+    def __init__(self, conn: sqlite3.Connection, migrations: Optional[List[Migration]] = None, context: Optional[MigrationContext] = None) -> None:
+        self.conn = conn
+        self.migrations = sorted(migrations if migrations is not None else MIGRATIONS, key=lambda m: m.version)
+        self.context = context or MigrationContext()
+
+    @property
+    def latest_version(self) -> int:
+        return self.migrations[-1].version if self.migrations else 0
+
+    def current_version(self) -> int:
+        (version,) = self.conn.execute("PRAGMA user_version").fetchone()
+        return int(version)
+
+    def pending(self) -> List[Migration]:
+        version = self.current_version()
+        return [m for m in self.migrations if m.version > version]
+
+    def run(self) -> int:
+        """Apply all pending migrations; returns how many were applied.
+
+        Another process may be migrating the same file, so the version is
+        re-read under the write lock (BEGIN IMMEDIATE) and a migration it
+        has already applied is skipped. Non-transactional migrations are
+        idempotent and may run twice; only the version bump is guarded.
+        """
+        if self.current_version() >= self.latest_version:
+            return 0
+        applied = 0
+        for migration in self.pending():
+            if not migration.transactional and self.current_version() < migration.version:
+                migration.apply(self.conn, self.context)
+            self.conn.execute("BEGIN IMMEDIATE")
+            if self.current_version() >= migration.version:
+                self.conn.rollback()
+                continue
+            if migration.transactional:
+                migration.apply(self.conn, self.context)
+            self.conn.execute(f"PRAGMA user_version = {int(migration.version)}")
+            self.conn.commit()
+            applied += 1
+        return applied
+
+
+def run_migrations(db_path: str | None = None, progress: Optional[ProgressCallback] = None) -> None:
+    from .storage import StorageManager
+
+    StorageManager(db_path=db_path, migration_progress=progress).close()  # initialization applies pending migrations
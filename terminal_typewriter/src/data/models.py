@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Tuple
 from datetime import datetime
 
 
@@ -39,4 +39,30 @@ class UserSettings:
     name: str = "Guest"
     difficulty: str = "beginner"
     duration_seconds: int = 60
-    theme: str = "default"
\ No newline at end of file
+    theme: str = "default"
+
+# Position in newest-first history: the (timestamp, id) of the last row seen
+SessionCursor = Tuple[str, str]
+
+
+@dataclass
+class SessionFilter:
+    mode: Optional[str] = None
+    since: Optional[str] = None        # inclusive, ISO date or timestamp
+    until: Optional[str] = None        # exclusive, ISO date or timestamp
+    min_wpm: Optional[float] = None
+    max_wpm: Optional[float] = None
+    text_hash: Optional[str] = None    # only sessions typed on this passage
+
+    def is_empty(self) -> bool:
+        return all(v is None for v in (self.mode, self.since, self.until, self.min_wpm, self.max_wpm, self.text_hash))
+
+
+@dataclass
+class SessionPage:
+    rows: List[Dict[str, Any]]
+    next_cursor: Optional[SessionCursor] = None
+
+    @property
+    def has_more(self) -> bool:
+        return self.next_cursor is not None
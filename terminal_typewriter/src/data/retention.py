@@ -0,0 +1,264 @@
+"""Retention for old keystroke payloads.
+
+Summary rows are kept forever; only sessions.keystrokes_data ages out.
+Payloads older than the retention age are either moved to a separate,
+always-compressed archive database or dropped, in bounded batches.
+Freed pages are then returned to the filesystem with incremental_vacuum,
+a few hundred pages at a time, so no single step blocks for long.
+"""
+
+import os
+import sqlite3
+from datetime import datetime, timedelta
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from ..core.keystroke_log import KeystrokeLog
+from ..utils.exceptions import StorageException
+from .keystroke_codec import FLAG_ZLIB, decode_keystrokes, encode_keystrokes, is_binary_payload
+from .migrations import AUTO_VACUUM_INCREMENTAL, enable_incremental_vacuum
+
+if TYPE_CHECKING:
+    from .storage import StorageManager
+
+
+RETENTION_BATCH_SIZE = 200
+VACUUM_STEP_PAGES = 256
+
+LOCATION_ARCHIVE = "archive"
+LOCATION_DROPPED = "dropped"
+POLICIES = (LOCATION_ARCHIVE, LOCATION_DROPPED)
+
+
+def default_archive_path(db_path: str) -> str:
+    root, ext = os.path.splitext(db_path)
+    return f"{root}-archive{ext or '.db'}"
+
+
+def retention_cutoff(days: int, now: Optional[datetime] = None) -> str:
+    """Timestamp (in the sessions.timestamp format) before which payloads age out."""
+    now = now or datetime.utcnow()
+    return (now - timedelta(days=days)).isoformat(timespec="seconds") + "Z"
+
+
+def _open_archive(path: str, busy_timeout_ms: int) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, timeout=busy_timeout_ms / 1000.0)
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS archived_keystrokes (
+            id TEXT PRIMARY KEY,
+            timestamp TEXT,
+            keystrokes_data BLOB NOT NULL
+        )
+        """
+    )
+    return conn
+
+
+def read_archived_keystrokes(archive_path: str, session_id: str) -> Optional[bytes]:
+    return read_archived_keystrokes_many(archive_path, [session_id]).get(session_id)
+
+
+def read_archived_keystrokes_many(archive_path: str, session_ids: List[str]) -> Dict[str, bytes]:
+    """Archived payloads of the given sessions, by id; sessions without one are left out.
+
+    Binds one parameter per id, so callers pass at most a few hundred ids
+    at a time.
+    """
+    if not session_ids or not os.path.exists(archive_path):
+        return {}
+    conn = sqlite3.connect(f"file:{archive_path}?mode=ro", uri=True)
+    try:
+        return dict(
+            conn.execute(
+                f"SELECT id, keystrokes_data FROM archived_keystrokes WHERE id IN ({', '.join('?' for _ in session_ids)})",
+                list(session_ids),
+            )
+        )
+    except sqlite3.Error as exc:
+        raise StorageException(str(exc))
+    finally:
+        conn.close()
+
+
+def _compressed(payload: Any) -> bytes:
+    """The payload in the binary format with zlib applied, re-encoding if needed."""
+    if not is_binary_payload(payload):
+        return encode_keystrokes(KeystrokeLog.deserialize(payload), compress=True)
+    payload = bytes(payload)
+    if payload[1] & FLAG_ZLIB:
+        return payload
+    return encode_keystrokes(decode_keystrokes(payload), compress=True)
+
+
+class RetentionManager:
+    def __init__(self, storage: "StorageManager", archive_path: Optional[str] = None, batch_size: int = RETENTION_BATCH_SIZE, vacuum_step_pages: int = VACUUM_STEP_PAGES) -> None:
+        self.storage = storage
+        self.archive_path = archive_path or storage.archive_path
+        self.batch_size = batch_size
+        self.vacuum_step_pages = vacuum_step_pages
+
+    def expire_batch(self, cutoff: str, policy: str = LOCATION_ARCHIVE) -> int:
+        """Archive or drop one batch of payloads older than cutoff; returns rows handled.
+
+        The batch is selected and cleared inside one write transaction, so
+        a payload replaced in the meantime (e.g. by an import) cannot be
+        cleared unseen. Archived payloads are committed to the archive
+        before the main database commits, so an interruption between the
+        two leaves a duplicate (repaired on the next run), never a loss.
+        """
+        if policy not in POLICIES:
+            raise StorageException(f"Unknown retention policy '{policy}'")
+
+        def expire(conn: sqlite3.Connection) -> int:
+            # Answered from idx_sessions_inline_keystrokes, which only holds unretired rows
+            rows = conn.execute(
+                """
+                SELECT id, timestamp, keystrokes_data FROM sessions
+                WHERE timestamp < ? AND keystrokes_data IS NOT NULL
+                ORDER BY timestamp
+                LIMIT ?
+                """,
+                (cutoff, self.batch_size),
+            ).fetchall()
+            if not rows:
+                return 0
+            if policy == LOCATION_ARCHIVE:
+                archive = _open_archive(self.archive_path, self.storage.busy_timeout_ms)
+                try:
+                    archive.executemany(
+                        """
+                        INSERT INTO archived_keystrokes (id, timestamp, keystrokes_data) VALUES (?, ?, ?)
+                        ON CONFLICT (id) DO UPDATE SET timestamp = excluded.timestamp, keystrokes_data = excluded.keystrokes_data
+                        """,
+                        [(session_id, timestamp, _compressed(payload)) for session_id, timestamp, payload in rows],
+                    )
+                    archive.commit()
+                except sqlite3.Error as exc:
+                    raise StorageException(str(exc))
+                finally:
+                    archive.close()
+            conn.executemany(
+                "UPDATE sessions SET keystrokes_data = NULL, keystrokes_location = ? WHERE id = ?",
+                [(policy, session_id) for session_id, _, _ in rows],
+            )
+            return len(rows)
+
+        return self.storage._write(expire)
+
+    def expire(self, days: int, policy: str = LOCATION_ARCHIVE, max_batches: Optional[int] = None, now: Optional[datetime] = None) -> int:
+        """Expire every payload older than `days` (or at most max_batches batches)."""
+        cutoff = retention_cutoff(days, now)
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            handled = self.expire_batch(cutoff, policy)
+            if not handled:
+                break
+            total += handled
+            batches += 1
+        return total
+
+    def incremental_vacuum_enabled(self) -> bool:
+        with self.storage._connect() as conn:
+            (mode,) = conn.execute("PRAGMA auto_vacuum").fetchone()
+        return mode == AUTO_VACUUM_INCREMENTAL
+
+    def enable_incremental_vacuum(self) -> bool:
+        """Rewrite the database once so vacuum steps can work; returns False if not needed.
+
+        Runs a full VACUUM, which takes time proportional to the database
+        size, so it is only done on request (the retention command), never
+        from maintenance_step().
+        """
+        with self.storage._connect() as conn:
+            return enable_incremental_vacuum(conn)
+
+    def free_pages(self) -> int:
+        with self.storage._connect() as conn:
+            (free,) = conn.execute("PRAGMA freelist_count").fetchone()
+        return int(free)
+
+    def vacuum_step(self, pages: Optional[int] = None) -> int:
+        """Return up to `pages` free pages to the filesystem; returns pages still free."""
+        with self.storage._connect() as conn:
+            # The pragma frees one page per sqlite3_step and returns no rows, so
+            # execute() would stop after the first page; executescript steps to completion
+            conn.executescript(f"PRAGMA incremental_vacuum({int(pages or self.vacuum_step_pages)});")
+        return self.free_pages()
+
+    def reclaim(self, max_steps: Optional[int] = None) -> int:
+        """Run vacuum steps until no free pages remain; returns pages released."""
+        released = 0
+        steps = 0
+        free = self.free_pages()
+        while free and (max_steps is None or steps < max_steps):
+            remaining = self.vacuum_step()
+            released += free - remaining
+            if remaining >= free:
+                break
+            free = remaining
+            steps += 1
+        return released
+
+    def maintenance_step(self, days: Optional[int], policy: str = LOCATION_ARCHIVE) -> None:
+        """One bounded unit of background upkeep, cheap enough to run between screens."""
+        if days:
+            self.expire_batch(retention_cutoff(days), policy)
+        if self.free_pages() and self.incremental_vacuum_enabled():
+            self.vacuum_step()
+
+    def space_report(self) -> Dict[str, Any]:
+        with self.storage._connect() as conn:
+            years: List[Dict[str, Any]] = [
+                {
+                    "year": year or "unknown",
+                    "sessions": sessions,
+                    "keystroke_sessions": inline,
+                    "keystroke_bytes": int(size),
+                    "archived": archived,
+                    "dropped": dropped,
+                }
+                for year, sessions, inline, size, archived, dropped in conn.execute(
+                    """
+                    SELECT substr(timestamp, 1, 4) AS year,
+                           COUNT(1),
+                           COUNT(keystrokes_data),
+                           TOTAL(length(keystrokes_data)),
+                           SUM(keystrokes_location = 'archive'),
+                           SUM(keystrokes_location = 'dropped')
+                    FROM sessions
+                    GROUP BY year
+                    ORDER BY year
+                    """
+                )
+            ]
+            (page_size,) = conn.execute("PRAGMA page_size").fetchone()
+            (page_count,) = conn.execute("PRAGMA page_count").fetchone()
+            (free,) = conn.execute("PRAGMA freelist_count").fetchone()
+        return {
+            "years": years,
+            "db_bytes": page_size * page_count,
+            "free_bytes": page_size * free,
+            "archive_bytes": os.path.getsize(self.archive_path) if os.path.exists(self.archive_path) else 0,
+        }
+
+
+def format_space_report(report: Dict[str, Any]) -> str:
+    def _size(n: float) -> str:
+        if n < 1024:
+            return f"{int(n)} B"
+        for unit in ("KiB", "MiB", "GiB"):
+            n /= 1024
+            if n < 1024 or unit == "GiB":
+                break
+        return f"{n:.1f} {unit}"
+
+    lines = ["Year | Sessions | With keystrokes | Keystroke data | Archived | Dropped", "-" * 72]
+    for y in report["years"]:
+        lines.append(
+            f"{y['year']} | {y['sessions']} | {y['keystroke_sessions']} | {_size(y['keystroke_bytes'])} | {y['archived'] or 0} | {y['dropped'] or 0}"
+        )
+    lines.append("")
+    lines.append(f"Database: {_size(report['db_bytes'])} ({_size(report['free_bytes'])} reclaimable)")
+    lines.append(f"Archive:  {_size(report['archive_bytes'])}")
+    return "\n".join(lines)
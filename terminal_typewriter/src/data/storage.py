@@ -1,167 +1,854 @@
 import json
 import os
+import random
 import sqlite3
+import threading
+import time
 from contextlib import contextmanager
-from typing import Any, Dict, Optional, List
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional, List, TypeVar
 
+from ..core.accumulators import MetricAccumulator
+from ..core.keystroke_log import KeystrokeLog, KeystrokeView, as_keystroke_view
+from ..core.keystroke_timing import BUCKET_COUNT, KIND_BIGRAM, KIND_INTERVAL, TimingProfile, TimingStat
+from ..core.rollups import PERIOD_DAY, PERIODS, ROLLUP_COLUMNS, RollupBucket, bucket_bounds, bucket_range
 from ..utils.exceptions import StorageException
+from .keystroke_codec import decode_keystrokes, encode_keystrokes, is_binary_payload
+from .lazy_session import LazyKeystrokes, LazySession
+from .models import SessionCursor, SessionFilter, SessionPage
+from .retention import LOCATION_ARCHIVE, POLICIES, default_archive_path, read_archived_keystrokes, read_archived_keystrokes_many
+from .texts import hash_text
+from .migrations import (
+    ACCUMULATED_METRICS,
+    DEFAULT_USER,
+    MigrationContext,
+    MigrationRunner,
+    ProgressCallback,
+    add_timing_profile,
+    add_to_metric_accumulators,
+    add_to_rollups,
+    ensure_user,
+    find_user,
+    iter_payload_events,
+    rebuild_aggregate_tables,
+    rebuild_metric_accumulators,
+    rebuild_rollups,
+)
 
 
 DB_RELATIVE_PATH = os.path.join("terminal_typewriter", "data", "database", "typewriter.db")
 
+BUSY_TIMEOUT_MS = 5000
+# Retries after the busy timeout has already expired, with capped
+# exponential backoff and full jitter so contending writers spread out
+WRITE_ATTEMPTS = 6
+RETRY_BASE_DELAY = 0.02
+RETRY_MAX_DELAY = 1.0
+CACHE_SIZE_KIB = 8192
+STATEMENT_CACHE_SIZE = 128
+TRANSFER_BATCH_SIZE = 2000
+# Ids bound per IN (...) lookup; SQLite before 3.32 allows at most 999 parameters
+LOOKUP_CHUNK_SIZE = 500
+BLOB_CHUNK_SIZE = 16 * 1024
+# Keys and bigrams need this many timed keystrokes before they are ranked
+MIN_TIMING_SAMPLES = 5
+
+# Columns written for a session; its text goes to the texts table
+SESSION_COLUMNS = ("id", "timestamp", "mode", "duration", "text_length", "wpm", "accuracy", "errors", "keystrokes_data", "text_hash", "user_id")
+SUMMARY_COLUMNS = ("id", "timestamp", "mode", "duration", "text_length", "wpm", "accuracy", "errors", "text", "text_hash")
+# Columns streamed to whole-history analytics; all covered by idx_sessions_user_timestamp
+METRIC_COLUMNS = ("timestamp", "mode", "wpm", "accuracy", "duration", "errors")
+
+# Session rows with their passage resolved from the text store
+_SESSION_SELECT = """
+    SELECT s.id, s.timestamp, s.mode, s.duration, s.text_length, s.wpm, s.accuracy, s.errors,
+           s.keystrokes_data, t.content, s.text_hash, s.keystrokes_location
+    FROM sessions s
+    LEFT JOIN texts t ON t.hash = s.text_hash
+"""
+
+
+T = TypeVar("T")
+
+
+def is_busy_error(exc: Optional[BaseException]) -> bool:
+    """True for SQLITE_BUSY / SQLITE_LOCKED, i.e. another connection holds the lock."""
+    if not isinstance(exc, sqlite3.OperationalError):
+        return False
+    code = getattr(exc, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    message = str(exc)
+    return "database is locked" in message or "database table is locked" in message
+
 
 def ensure_directory(path: str) -> None:
-    os.makedirs(os.path.dirname(path), exist_ok=True)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+
+def serialize_keystrokes(keystrokes: Any, compress: bool = True) -> bytes:
+    if not isinstance(keystrokes, KeystrokeView):
+        keystrokes = KeystrokeLog.from_records(keystrokes or [])
+    return encode_keystrokes(keystrokes, compress=compress)
+
+
+def deserialize_keystrokes(payload: Any) -> KeystrokeLog:
+    """Decode a stored payload: binary format, or legacy JSON text."""
+    if is_binary_payload(payload):
+        return decode_keystrokes(payload)
+    return KeystrokeLog.deserialize(payload)
+
+
+def _row_to_session(row: tuple, payload: Any = None) -> Dict[str, Any]:
+    """A _SESSION_SELECT row as a session dict; payload stands in for a retired keystroke column."""
+    return {
+        "id": row[0],
+        "timestamp": row[1],
+        "mode": row[2],
+        "duration": row[3],
+        "text_length": row[4],
+        "wpm": row[5],
+        "accuracy": row[6],
+        "errors": row[7],
+        "keystrokes": deserialize_keystrokes(row[8] if row[8] is not None else payload),
+        "text": row[9],
+        "text_hash": row[10],
+    }
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    chunk: List[Any] = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
 
 
 class StorageManager:
-    def __init__(self, db_path: Optional[str] = None) -> None:
+    def __init__(self, db_path: Optional[str] = None, busy_timeout_ms: int = BUSY_TIMEOUT_MS, cache_size_kib: int = CACHE_SIZE_KIB, compress_keystrokes: bool = True, migration_progress: Optional[ProgressCallback] = None, archive_path: Optional[str] = None, user_name: str = DEFAULT_USER, write_attempts: int = WRITE_ATTEMPTS) -> None:
         self.db_path = db_path or os.path.join(os.getcwd(), DB_RELATIVE_PATH)
+        # Keystrokes moved out by retention live here (see data/retention.py)
+        self.archive_path = archive_path or default_archive_path(self.db_path)
+        self.compress_keystrokes = compress_keystrokes
+        self.migration_progress = migration_progress
+        self.busy_timeout_ms = busy_timeout_ms
+        self.cache_size_kib = cache_size_kib
+        self.write_attempts = max(1, write_attempts)
+        self._conn: Optional[sqlite3.Connection] = None
+        self._conn_pid: Optional[int] = None
+        # One long-lived connection shared by all callers; the lock serializes
+        # access so it can also be used from background threads.
+        self._lock = threading.RLock()
         ensure_directory(self.db_path)
-        self._init_db()
+        self._init_db(user_name)
+        # Every read and write is scoped to this user; see set_user()
+        self.user_name = user_name
+        self.user_id = self._ensure_user(user_name)
+
+    def _open_connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.busy_timeout_ms / 1000.0,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.execute(f"PRAGMA busy_timeout = {int(self.busy_timeout_ms)}")
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.execute(f"PRAGMA cache_size = -{int(self.cache_size_kib)}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+        return conn
 
     @contextmanager
     def _connect(self):
-        try:
-            conn = sqlite3.connect(self.db_path)
-            yield conn
-            conn.close()
-        except Exception as exc:
-            raise StorageException(str(exc))
+        with self._lock:
+            conn = None
+            try:
+                # Reopen after fork: a connection must not cross process boundaries
+                if self._conn is None or self._conn_pid != os.getpid():
+                    self._conn = self._open_connection()
+                    self._conn_pid = os.getpid()
+                conn = self._conn
+                yield conn
+            except Exception as exc:
+                if conn is not None and conn.in_transaction:
+                    conn.rollback()
+                if isinstance(exc, StorageException):
+                    raise
+                raise StorageException(str(exc)) from exc
+
+    def _with_retry(self, operation: Callable[[], T]) -> T:
+        """Run operation, retrying it when another process holds the database lock.
+
+        The lock is not held between attempts, so other threads of this
+        process keep making progress while one backs off.
+        """
+        for attempt in range(1, self.write_attempts + 1):
+            try:
+                return operation()
+            except StorageException as exc:
+                if attempt == self.write_attempts or not is_busy_error(exc.__cause__):
+                    raise
+            time.sleep(random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** attempt)))
+        raise AssertionError("unreachable")
+
+    def _write(self, work: Callable[[sqlite3.Connection], T]) -> T:
+        """Run work(conn) in its own write transaction and commit, retrying on lock contention.
+
+        BEGIN IMMEDIATE takes the write lock up front, so a busy database
+        is detected (and waited on) before any work is done rather than
+        when a read transaction tries to upgrade.
+        """
+        def attempt() -> T:
+            with self._connect() as conn:
+                conn.execute("BEGIN IMMEDIATE")
+                result = work(conn)
+                conn.commit()
+                return result
+
+        return self._with_retry(attempt)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None and self._conn_pid == os.getpid():
+                try:
+                    # Let SQLite refresh planner statistics for the indexes it used
+                    self._conn.execute("PRAGMA optimize")
+                except sqlite3.OperationalError as exc:
+                    # Advisory only; another process holding the lock must not fail close()
+                    if not is_busy_error(exc):
+                        raise
+                finally:
+                    self._conn.close()
+            self._conn = None
+            self._conn_pid = None
+
+    def __enter__(self) -> "StorageManager":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def _init_db(self, user_name: str) -> None:
+        def migrate() -> None:
+            with self._connect() as conn:
+                runner = MigrationRunner(
+                    conn,
+                    context=MigrationContext(progress=self.migration_progress, compress_keystrokes=self.compress_keystrokes, default_user=user_name),
+                )
+                runner.run()
+
+        # Several processes may open a fresh database at once; the runner
+        # re-checks the version under the write lock, so a retry is safe
+        self._with_retry(migrate)
 
-    def _init_db(self) -> None:
+    def _ensure_user(self, name: str) -> int:
+        # Almost always the user exists already; only take the write lock to create it
         with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
+            user_id = find_user(conn, name)
+        if user_id is not None:
+            return user_id
+        return self._write(lambda conn: ensure_user(conn, name))
+
+    def set_user(self, name: str) -> None:
+        """Switch the user that subsequent queries and saves belong to."""
+        self.user_id = self._ensure_user(name)
+        self.user_name = name
+
+    def get_revision(self) -> int:
+        """Change counter of the current user's sessions; any save or import moves it."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT revision FROM users WHERE id = ?", (self.user_id,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _bump_revisions(self, cur: sqlite3.Cursor, user_ids: Iterable[int]) -> None:
+        cur.executemany("UPDATE users SET revision = revision + 1 WHERE id = ?", [(user_id,) for user_id in set(user_ids)])
+
+    def list_users(self) -> List[Dict[str, Any]]:
+        with self._connect() as conn:
+            rows = conn.execute(
                 """
-                CREATE TABLE IF NOT EXISTS sessions (
-                    id TEXT PRIMARY KEY,
-                    timestamp TEXT,
-                    mode TEXT,
-                    duration REAL,
-                    text_length INTEGER,
-                    wpm REAL,
-                    accuracy REAL,
-                    errors INTEGER,
-                    keystrokes_data TEXT
-                )
+                SELECT u.id, u.name, COALESCE(t.session_count, 0)
+                FROM users u
+                LEFT JOIN session_totals t ON t.user_id = u.id
+                ORDER BY u.name
                 """
-            )
-            # Migration: ensure 'text' column exists to store exact session text
-            cur.execute("PRAGMA table_info(sessions)")
-            cols = [r[1] for r in cur.fetchall()]
-            if "text" not in cols:
-                cur.execute("ALTER TABLE sessions ADD COLUMN text TEXT")
-            conn.commit()
+            ).fetchall()
+        return [{"id": user_id, "name": name, "sessions": count} for user_id, name, count in rows]
+
+    def rebuild_aggregates(self) -> None:
+        """Recompute every user's aggregate tables and metric accumulators from the sessions table."""
+        def rebuild(conn: sqlite3.Connection) -> None:
+            rebuild_aggregate_tables(conn)
+            rebuild_metric_accumulators(conn)
+            rebuild_rollups(conn)
+
+        self._write(rebuild)
+
+    def _update_aggregates(self, cur: sqlite3.Cursor, session: Dict[str, Any]) -> None:
+        user_id = session.get("user_id", self.user_id)
+        values = (
+            session.get("duration") or 0,
+            session.get("errors") or 0,
+            session.get("wpm") or 0,
+            session.get("wpm") or 0,
+            session.get("accuracy") or 0,
+            session.get("accuracy") or 0,
+        )
+        cur.execute(
+            """
+            INSERT INTO session_totals (user_id, session_count, total_time, total_errors, sum_wpm, max_wpm, sum_accuracy, max_accuracy)
+            VALUES (?, 1, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id) DO UPDATE SET
+                session_count = session_count + 1,
+                total_time = total_time + excluded.total_time,
+                total_errors = total_errors + excluded.total_errors,
+                sum_wpm = sum_wpm + excluded.sum_wpm,
+                max_wpm = MAX(max_wpm, excluded.max_wpm),
+                sum_accuracy = sum_accuracy + excluded.sum_accuracy,
+                max_accuracy = MAX(max_accuracy, excluded.max_accuracy)
+            """,
+            (user_id,) + values,
+        )
+        cur.execute(
+            """
+            INSERT INTO mode_totals (user_id, mode, session_count, total_time, total_errors, sum_wpm, max_wpm, sum_accuracy, max_accuracy)
+            VALUES (?, ?, 1, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (user_id, mode) DO UPDATE SET
+                session_count = session_count + 1,
+                total_time = total_time + excluded.total_time,
+                total_errors = total_errors + excluded.total_errors,
+                sum_wpm = sum_wpm + excluded.sum_wpm,
+                max_wpm = MAX(max_wpm, excluded.max_wpm),
+                sum_accuracy = sum_accuracy + excluded.sum_accuracy,
+                max_accuracy = MAX(max_accuracy, excluded.max_accuracy)
+            """,
+            (user_id, session.get("mode") or "unknown") + values,
+        )
+
+    def _update_accumulators(self, cur: sqlite3.Cursor, sessions: List[Dict[str, Any]]) -> None:
+        """Feed newly saved sessions into their users' persisted metric accumulators."""
+        add_to_metric_accumulators(
+            cur.connection,
+            [(session.get("user_id", self.user_id),) + tuple(session.get(metric) for metric in ACCUMULATED_METRICS) for session in sessions],
+        )
+
+    def _update_rollups(self, cur: sqlite3.Cursor, sessions: List[Dict[str, Any]]) -> None:
+        """Fold newly saved sessions into their day, week and month rollup rows."""
+        add_to_rollups(
+            cur.connection,
+            [(session.get("user_id", self.user_id), session.get("timestamp"), session.get("wpm"), session.get("accuracy")) for session in sessions],
+        )
+
+    def _timing_profiles(self, sessions: Iterable[Dict[str, Any]]) -> Dict[int, TimingProfile]:
+        """Keystroke timing of the sessions that carry both keystrokes and text, per user."""
+        profiles: Dict[int, TimingProfile] = {}
+        for session in sessions:
+            text = session.get("text")
+            keystrokes = session.get("keystrokes")
+            if not text or not keystrokes:
+                continue
+            owner = session.get("user_id", self.user_id)
+            profiles.setdefault(owner, TimingProfile()).add_session(text, as_keystroke_view(keystrokes).iter_raw())
+        return profiles
+
+    def _update_keystroke_timing(self, cur: sqlite3.Cursor, sessions: Iterable[Dict[str, Any]], sign: int = 1) -> None:
+        for owner, profile in self._timing_profiles(sessions).items():
+            add_timing_profile(cur.connection, owner, profile, sign)
+
+    def _session_params(self, session: Dict[str, Any]) -> tuple:
+        return (
+            session["id"],
+            session.get("timestamp"),
+            session.get("mode"),
+            session.get("duration"),
+            session.get("text_length"),
+            session.get("wpm"),
+            session.get("accuracy"),
+            session.get("errors"),
+            serialize_keystrokes(session.get("keystrokes"), self.compress_keystrokes),
+            hash_text(session.get("text")),
+            session.get("user_id", self.user_id),
+        )
+
+    def _store_texts(self, cur: sqlite3.Cursor, texts: Iterable[Optional[str]]) -> None:
+        cur.executemany(
+            "INSERT INTO texts (hash, content) VALUES (?, ?) ON CONFLICT (hash) DO NOTHING",
+            [(hash_text(text), text) for text in set(texts) if text is not None],
+        )
+
+    def _insert_session(self, cur: sqlite3.Cursor, session: Dict[str, Any]) -> None:
+        self._store_texts(cur, [session.get("text")])
+        cur.execute(
+            f"INSERT INTO sessions ({', '.join(SESSION_COLUMNS)}) VALUES ({', '.join('?' for _ in SESSION_COLUMNS)})",
+            self._session_params(session),
+        )
+        self._update_aggregates(cur, session)
 
     def save_session(self, session: Dict[str, Any]) -> None:
-        with self._connect() as conn:
+        self.save_sessions([session])
+
+    def save_sessions(self, sessions: List[Dict[str, Any]]) -> None:
+        """Insert several sessions in one transaction; all or none are saved."""
+        def insert(conn: sqlite3.Connection) -> None:
             cur = conn.cursor()
-            cur.execute(
-                """
-                INSERT INTO sessions (id, timestamp, mode, duration, text_length, wpm, accuracy, errors, keystrokes_data, text)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                (
-                    session["id"],
-                    session.get("timestamp"),
-                    session.get("mode"),
-                    session.get("duration"),
-                    session.get("text_length"),
-                    session.get("wpm"),
-                    session.get("accuracy"),
-                    session.get("errors"),
-                    json.dumps(session.get("keystrokes", [])),
-                    session.get("text"),
-                ),
+            for session in sessions:
+                self._insert_session(cur, session)
+            self._update_accumulators(cur, sessions)
+            self._update_keystroke_timing(cur, sessions)
+            self._update_rollups(cur, sessions)
+            self._bump_revisions(cur, (session.get("user_id", self.user_id) for session in sessions))
+
+        self._write(insert)
+
+    def iter_sessions(self, batch_size: int = TRANSFER_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """Stream every session of the current user, keystrokes included, oldest first.
+
+        Rows are read from a dedicated connection inside one read
+        transaction, batch_size rows at a time, so memory stays bounded and
+        the export sees a consistent snapshot without blocking writers.
+        Payloads retention moved to the archive are read back from it, as
+        load_keystrokes() does.
+        """
+        for rows in self._snapshot_batches(_SESSION_SELECT + " WHERE s.user_id = ? ORDER BY s.timestamp, s.id", (self.user_id,), batch_size):
+            archived: Dict[str, bytes] = {}
+            retired = [row[0] for row in rows if row[8] is None and row[11] == LOCATION_ARCHIVE]
+            for ids in _chunks(retired, LOOKUP_CHUNK_SIZE):
+                archived.update(read_archived_keystrokes_many(self.archive_path, ids))
+            for row in rows:
+                yield _row_to_session(row, archived.get(row[0]))
+
+    def iter_metric_batches(self, batch_size: int = TRANSFER_BATCH_SIZE) -> Iterator[List[tuple]]:
+        """Stream METRIC_COLUMNS tuples of the current user's sessions, oldest first, in batches.
+
+        The query is answered from idx_sessions_user_timestamp alone, so
+        neither texts nor keystroke payloads are read.
+        """
+        sql = f"SELECT {', '.join(METRIC_COLUMNS)} FROM sessions WHERE user_id = ? ORDER BY timestamp, id"
+        return self._snapshot_batches(sql, (self.user_id,), batch_size)
+
+    def _snapshot_batches(self, sql: str, params: tuple, batch_size: int) -> Iterator[List[tuple]]:
+        """Run a read query on a dedicated connection inside one read transaction."""
+        try:
+            conn = self._open_connection()
+        except sqlite3.Error as exc:
+            raise StorageException(str(exc))
+        try:
+            conn.execute("PRAGMA query_only = ON")
+            conn.execute("BEGIN")
+            cur = conn.execute(sql, params)
+            while True:
+                rows = cur.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield rows
+        except sqlite3.Error as exc:
+            raise StorageException(str(exc))
+        finally:
+            conn.close()
+
+    def import_sessions(self, sessions: Iterable[Dict[str, Any]], replace: bool = False, batch_size: int = TRANSFER_BATCH_SIZE) -> int:
+        """Bulk-insert sessions for the current user with executemany, committing every batch_size rows.
+
+        Sessions whose id already exists are skipped, or overwritten when
+        replace is True (only if they belong to the current user); an id
+        repeated in the input is handled the same way. The user's
+        aggregates are rebuilt once at the end rather than updated per row.
+        Keystroke timing keeps the old contribution of a replaced session
+        whose payload retention dropped, since it cannot be subtracted.
+        Returns the number of rows written.
+        """
+        conflict = (
+            "DO UPDATE SET " + ", ".join(f"{col} = excluded.{col}" for col in SESSION_COLUMNS[1:])
+            + ", keystrokes_location = NULL WHERE sessions.user_id = excluded.user_id"
+            if replace
+            else "DO NOTHING"
+        )
+        sql = (
+            f"INSERT INTO sessions ({', '.join(SESSION_COLUMNS)}) "
+            f"VALUES ({', '.join('?' for _ in SESSION_COLUMNS)}) "
+            f"ON CONFLICT (id) {conflict}"
+        )
+        user_id = self.user_id
+
+        def insert_batch(conn: sqlite3.Connection, batch: List[Dict[str, Any]]) -> int:
+            cur = conn.cursor()
+            # The first occurrence of an id wins, or the last one when replacing
+            unique: Dict[str, Dict[str, Any]] = {}
+            for session in batch:
+                if replace or session["id"] not in unique:
+                    unique[session["id"]] = session
+            batch = list(unique.values())
+            # Keystroke timing is kept incrementally: count the sessions this
+            # batch adds, and take back what replaced sessions contributed
+            existing: Dict[str, tuple] = {}
+            for ids in _chunks(unique, LOOKUP_CHUNK_SIZE):
+                existing.update(
+                    (row[0], row[1:])
+                    for row in cur.execute(
+                        f"""
+                        SELECT s.id, s.user_id, t.content, s.keystrokes_data, s.keystrokes_location
+                        FROM sessions s
+                        LEFT JOIN texts t ON t.hash = s.text_hash
+                        WHERE s.id IN ({', '.join('?' for _ in ids)})
+                        """,
+                        ids,
+                    )
+                )
+            written_sessions = [
+                session for session in batch
+                if session["id"] not in existing or (replace and existing[session["id"]][0] == user_id)
+            ]
+            replaced: Dict[str, tuple] = {}
+            unrecoverable: set = set()
+            if replace:
+                replaced = {
+                    session_id: (text, payload)
+                    for session_id, (owner, text, payload, location) in existing.items()
+                    if owner == user_id and text and (payload is not None or location in POLICIES)
+                }
+                archived = [session_id for session_id, (_, payload) in replaced.items() if payload is None and existing[session_id][3] == LOCATION_ARCHIVE]
+                for ids in _chunks(archived, LOOKUP_CHUNK_SIZE):
+                    for session_id, payload in read_archived_keystrokes_many(self.archive_path, ids).items():
+                        replaced[session_id] = (replaced[session_id][0], payload)
+                # A payload retention dropped (or one missing from the archive) can't be
+                # subtracted, so its old timing stays and the replacement's is not added
+                unrecoverable = {session_id for session_id, (_, payload) in replaced.items() if payload is None}
+            self._store_texts(cur, (session.get("text") for session in batch))
+            before = conn.total_changes
+            cur.executemany(sql, [self._session_params(dict(session, user_id=user_id)) for session in batch])
+            written = conn.total_changes - before
+            if replaced:
+                profile = TimingProfile()
+                for text, payload in replaced.values():
+                    if payload is not None:
+                        profile.add_session(text, iter_payload_events(payload))
+                add_timing_profile(conn, user_id, profile, sign=-1)
+            self._update_keystroke_timing(
+                cur, (dict(session, user_id=user_id) for session in written_sessions if session["id"] not in unrecoverable)
             )
-            conn.commit()
+            if written:
+                self._bump_revisions(cur, [user_id])
+            return written
+
+        def rebuild(conn: sqlite3.Connection) -> None:
+            rebuild_aggregate_tables(conn, user_id)
+            rebuild_metric_accumulators(conn, user_id)
+            rebuild_rollups(conn, user_id)
+
+        written = 0
+        try:
+            for batch in _chunks(sessions, batch_size):
+                written += self._write(lambda conn: insert_batch(conn, batch))
+        except BaseException:
+            # Committed batches stay; bring the aggregates in line with them,
+            # but let the original error through even if that fails too
+            if written:
+                try:
+                    self._write(rebuild)
+                except StorageException:
+                    pass
+            raise
+        if written:
+            self._write(rebuild)
+        return written
+
+    def fetch_sessions_page(self, limit: int = 15, after: Optional[SessionCursor] = None, filters: Optional[SessionFilter] = None) -> SessionPage:
+        """One page of session summaries, newest first.
 
-    def fetch_recent_sessions(self, limit: int = 10) -> List[Dict[str, Any]]:
+        Pass the previous page's next_cursor as `after` to continue. Paging
+        seeks on the (timestamp, id) index instead of using OFFSET, so every
+        page costs the same however deep into the history it is.
+        """
+        filters = filters or SessionFilter()
+        clauses: List[str] = ["user_id = ?"]
+        params: List[Any] = [self.user_id]
+        if after is not None:
+            clauses.append("(timestamp, id) < (?, ?)")
+            params.extend(after)
+        if filters.mode is not None:
+            clauses.append("mode = ?")
+            params.append(filters.mode)
+        if filters.text_hash is not None:
+            clauses.append("text_hash = ?")
+            params.append(filters.text_hash)
+        if filters.since is not None:
+            clauses.append("timestamp >= ?")
+            params.append(filters.since)
+        if filters.until is not None:
+            clauses.append("timestamp < ?")
+            params.append(filters.until)
+        if filters.min_wpm is not None:
+            clauses.append("wpm >= ?")
+            params.append(filters.min_wpm)
+        if filters.max_wpm is not None:
+            clauses.append("wpm <= ?")
+            params.append(filters.max_wpm)
+        where = f"WHERE {' AND '.join(clauses)}"
         with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT id, timestamp, mode, duration, text_length, wpm, accuracy, errors
+            # One extra row tells us whether another page follows
+            rows = conn.execute(
+                f"""
+                SELECT id, timestamp, mode, duration, text_length, wpm, accuracy, errors, text_hash
                 FROM sessions
-                ORDER BY timestamp DESC
+                {where}
+                ORDER BY timestamp DESC, id DESC
                 LIMIT ?
                 """,
-                (limit,),
-            )
-            rows = cur.fetchall()
-            return [
-                {
-                    "id": r[0],
-                    "timestamp": r[1],
-                    "mode": r[2],
-                    "duration": r[3],
-                    "text_length": r[4],
-                    "wpm": r[5],
-                    "accuracy": r[6],
-                    "errors": r[7],
-                }
-                for r in rows
-            ]
+                params + [limit + 1],
+            ).fetchall()
+        page = [
+            {
+                "id": r[0],
+                "timestamp": r[1],
+                "mode": r[2],
+                "duration": r[3],
+                "text_length": r[4],
+                "wpm": r[5],
+                "accuracy": r[6],
+                "errors": r[7],
+                "text_hash": r[8],
+            }
+            for r in rows[:limit]
+        ]
+        next_cursor = (page[-1]["timestamp"], page[-1]["id"]) if len(rows) > limit else None
+        return SessionPage(rows=page, next_cursor=next_cursor)
 
-    def count_sessions(self) -> int:
-        with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute("SELECT COUNT(1) FROM sessions")
-            (count,) = cur.fetchone()
-            return int(count)
+    def fetch_recent_sessions(self, limit: int = 10, mode: Optional[str] = None) -> List[Dict[str, Any]]:
+        return self.fetch_sessions_page(limit, filters=SessionFilter(mode=mode)).rows
 
-    def fetch_latest_session_with_keystrokes(self) -> Optional[Dict[str, Any]]:
+    def get_totals(self) -> Dict[str, Any]:
+        """Summary statistics over the user's entire history, read from session_totals."""
         with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
+            row = conn.execute(
                 """
-                SELECT id, timestamp, mode, duration, text_length, wpm, accuracy, errors, keystrokes_data, text
-                FROM sessions
-                ORDER BY timestamp DESC
-                LIMIT 1
+                SELECT session_count, total_time, total_errors, sum_wpm, max_wpm, sum_accuracy, max_accuracy
+                FROM session_totals
+                WHERE user_id = ?
+                """,
+                (self.user_id,),
+            ).fetchone()
+        count, total_time, total_errors, sum_wpm, max_wpm, sum_accuracy, max_accuracy = row or (0, 0, 0, 0, 0, 0, 0)
+        return {
+            "total_sessions": count,
+            "total_time": total_time,
+            "total_errors": int(total_errors),
+            "best_wpm": max_wpm,
+            "avg_wpm": round(sum_wpm / count, 2) if count else 0,
+            "best_accuracy": max_accuracy,
+            "avg_accuracy": round(sum_accuracy / count, 2) if count else 0,
+        }
+
+    def get_mode_totals(self) -> Dict[str, Dict[str, Any]]:
+        """Per-mode statistics over the user's entire history, read from mode_totals."""
+        with self._connect() as conn:
+            rows = conn.execute(
                 """
-            )
-            row = cur.fetchone()
-            if not row:
-                return None
-            return {
-                "id": row[0],
-                "timestamp": row[1],
-                "mode": row[2],
-                "duration": row[3],
-                "text_length": row[4],
-                "wpm": row[5],
-                "accuracy": row[6],
-                "errors": row[7],
-                "keystrokes": json.loads(row[8] or "[]"),
-                "text": row[9],
+                SELECT mode, session_count, total_time, total_errors, sum_wpm, max_wpm, sum_accuracy, max_accuracy
+                FROM mode_totals
+                WHERE user_id = ?
+                ORDER BY mode
+                """,
+                (self.user_id,),
+            ).fetchall()
+        return {
+            mode: {
+                "count": count,
+                "total_time": total_time,
+                "total_errors": int(total_errors),
+                "avg_wpm": round(sum_wpm / count, 2) if count else 0,
+                "best_wpm": max_wpm,
+                "avg_accuracy": round(sum_accuracy / count, 2) if count else 0,
+                "best_accuracy": max_accuracy,
             }
+            for mode, count, total_time, total_errors, sum_wpm, max_wpm, sum_accuracy, max_accuracy in rows
+        }
+
+    def get_metric_accumulator(self, metric: str = "wpm", all_users: bool = False) -> MetricAccumulator:
+        """Streaming statistics (mean, stdev, quantiles) of one metric over the full history.
 
-    def fetch_session_by_id(self, session_id: str) -> Optional[Dict[str, Any]]:
+        Read from metric_accumulators, so the cost does not grow with the
+        number of sessions. With all_users, every user's accumulator is
+        merged into one.
+        """
+        if metric not in ACCUMULATED_METRICS:
+            raise StorageException(f"No accumulator for metric '{metric}'")
+        sql = "SELECT state FROM metric_accumulators WHERE metric = ?"
+        params: tuple = (metric,)
+        if not all_users:
+            sql += " AND user_id = ?"
+            params += (self.user_id,)
         with self._connect() as conn:
-            cur = conn.cursor()
-            cur.execute(
+            rows = conn.execute(sql, params).fetchall()
+        accumulator = MetricAccumulator()
+        for (state,) in rows:
+            accumulator.merge(MetricAccumulator.from_dict(json.loads(state)))
+        return accumulator
+
+    def get_keystroke_timing(self, kind: str = KIND_BIGRAM, limit: int = 20, min_samples: int = MIN_TIMING_SAMPLES, by: str = "latency") -> List[TimingStat]:
+        """The user's slowest (by="latency") or most error-prone (by="errors") keys or bigrams.
+
+        Ranked from the keystroke_timing table, so the cost depends on the
+        number of distinct keys/bigrams, not on how many sessions were typed.
+        """
+        order = {
+            "latency": "CAST(total_ms AS REAL) / samples DESC",
+            "errors": "CAST(errors AS REAL) / attempts DESC",
+        }.get(by)
+        if order is None:
+            raise StorageException(f"Unknown timing order '{by}'")
+        count_column = "samples" if by == "latency" else "attempts"
+        with self._connect() as conn:
+            rows = conn.execute(
+                f"""
+                SELECT item, samples, total_ms, attempts, errors
+                FROM keystroke_timing
+                WHERE user_id = ? AND kind = ? AND {count_column} >= ?
+                ORDER BY {order}, item
+                LIMIT ?
+                """,
+                (self.user_id, kind, max(1, min_samples), limit),
+            ).fetchall()
+            stats = {item: TimingStat(kind, item, samples, total_ms, attempts, errors) for item, samples, total_ms, attempts, errors in rows}
+            if stats:
+                for item, bucket, count in conn.execute(
+                    f"""
+                    SELECT item, bucket, count FROM keystroke_latency_buckets
+                    WHERE user_id = ? AND kind = ? AND item IN ({', '.join('?' for _ in stats)})
+                    """,
+                    (self.user_id, kind, *stats),
+                ):
+                    if count:
+                        stats[item].histogram[bucket] = count
+        return list(stats.values())
+
+    def get_interval_histogram(self) -> TimingStat:
+        """Histogram of every inter-key interval the user has typed."""
+        stat = TimingStat(KIND_INTERVAL, "")
+        with self._connect() as conn:
+            for bucket, count in conn.execute(
+                "SELECT bucket, count FROM keystroke_latency_buckets WHERE user_id = ? AND kind = ? AND item = ''",
+                (self.user_id, KIND_INTERVAL),
+            ):
+                if count and 0 <= bucket < BUCKET_COUNT:
+                    stat.histogram[bucket] = count
+        return stat
+
+    def get_rollups(self, period: str = PERIOD_DAY, since: Optional[str] = None, until: Optional[str] = None, fill_gaps: bool = True) -> List[Dict[str, Any]]:
+        """Per-bucket count, mean, best and median over [since, until), oldest first.
+
+        Read from session_rollups by primary-key range, so the cost depends
+        on the number of buckets, not sessions. Weeks and months that the
+        range only partly covers are included whole. With fill_gaps,
+        buckets without sessions appear with a count of 0.
+        """
+        if period not in PERIODS:
+            raise StorageException(f"Unknown rollup period '{period}'")
+        first, last = bucket_bounds(since, until, period)
+        sql = f"SELECT bucket, {', '.join(ROLLUP_COLUMNS)} FROM session_rollups WHERE user_id = ? AND period = ?"
+        params: list = [self.user_id, period]
+        if first is not None:
+            sql += " AND bucket >= ?"
+            params.append(first)
+        if last is not None:
+            sql += " AND bucket <= ?"
+            params.append(last)
+        with self._connect() as conn:
+            rows = conn.execute(sql + " ORDER BY bucket", params).fetchall()
+        found = {row[0]: dict(bucket=row[0], **RollupBucket.from_row(row[1:]).summary()) for row in rows}
+        if not fill_gaps or not found:
+            return list(found.values())
+        keys = bucket_range(first or rows[0][0], last or rows[-1][0], period)
+        return [found.get(key) or dict(bucket=key, **RollupBucket().summary()) for key in keys]
+
+    def get_passage_totals(self, text_hash: str) -> Dict[str, Any]:
+        """Statistics over every session the user typed on one passage."""
+        with self._connect() as conn:
+            row = conn.execute(
                 """
-                SELECT id, timestamp, mode, duration, text_length, wpm, accuracy, errors, keystrokes_data, text
+                SELECT COUNT(1), AVG(wpm), MAX(wpm), AVG(accuracy), MAX(accuracy), MIN(timestamp), MAX(timestamp)
                 FROM sessions
-                WHERE id = ?
-                LIMIT 1
+                WHERE user_id = ? AND text_hash = ?
                 """,
-                (session_id,),
-            )
-            row = cur.fetchone()
-            if not row:
-                return None
-            return {
-                "id": row[0],
-                "timestamp": row[1],
-                "mode": row[2],
-                "duration": row[3],
-                "text_length": row[4],
-                "wpm": row[5],
-                "accuracy": row[6],
-                "errors": row[7],
-                "keystrokes": json.loads(row[8] or "[]"),
-                "text": row[9],
-            }
\ No newline at end of file
+                (self.user_id, text_hash),
+            ).fetchone()
+        count, avg_wpm, best_wpm, avg_accuracy, best_accuracy, first, last = row
+        return {
+            "count": count,
+            "avg_wpm": round(avg_wpm, 2) if count else 0,
+            "best_wpm": best_wpm or 0,
+            "avg_accuracy": round(avg_accuracy, 2) if count else 0,
+            "best_accuracy": best_accuracy or 0,
+            "first_timestamp": first,
+            "last_timestamp": last,
+        }
+
+    def count_sessions(self) -> int:
+        with self._connect() as conn:
+            row = conn.execute("SELECT session_count FROM session_totals WHERE user_id = ?", (self.user_id,)).fetchone()
+        return int(row[0]) if row else 0
+
+    def _lazy_session(self, row: Optional[tuple]) -> Optional[LazySession]:
+        if not row:
+            return None
+        summary = dict(zip(SUMMARY_COLUMNS, row))
+        return LazySession(summary, LazyKeystrokes(self, summary["id"], row[-2], row[-1] or 0))
+
+    # typeof() and length() are answered from the record header, so the
+    # summary query never reads the keystroke payload itself.
+    _LAZY_SELECT = """
+        SELECT s.id, s.timestamp, s.mode, s.duration, s.text_length, s.wpm, s.accuracy, s.errors,
+               t.content, s.text_hash, typeof(s.keystrokes_data), length(s.keystrokes_data)
+        FROM sessions s
+        LEFT JOIN texts t ON t.hash = s.text_hash
+    """
+
+    def fetch_latest_session_with_keystrokes(self) -> Optional[LazySession]:
+        with self._connect() as conn:
+            row = conn.execute(self._LAZY_SELECT + " WHERE s.user_id = ? ORDER BY s.timestamp DESC, s.id DESC LIMIT 1", (self.user_id,)).fetchone()
+            return self._lazy_session(row)
+
+    def fetch_session_by_id(self, session_id: str) -> Optional[LazySession]:
+        with self._connect() as conn:
+            row = conn.execute(self._LAZY_SELECT + " WHERE s.id = ? AND s.user_id = ? LIMIT 1", (session_id, self.user_id)).fetchone()
+            return self._lazy_session(row)
+
+    def load_keystrokes(self, session_id: str) -> KeystrokeLog:
+        """Decode one session's whole keystroke log, from the archive if it was retired."""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT keystrokes_data, keystrokes_location FROM sessions WHERE id = ? AND user_id = ?",
+                (session_id, self.user_id),
+            ).fetchone()
+        if row is None:
+            raise StorageException(f"Session '{session_id}' not found")
+        payload, location = row
+        if payload is None and location == LOCATION_ARCHIVE:
+            payload = read_archived_keystrokes(self.archive_path, session_id)
+        return deserialize_keystrokes(payload)
+
+    def iter_keystroke_chunks(self, session_id: str, chunk_size: int = BLOB_CHUNK_SIZE) -> Iterator[bytes]:
+        """Read a session's keystroke blob incrementally, chunk_size bytes at a time.
+
+        The blob is reopened for every chunk so the shared connection (and
+        its lock) is only held for the read itself, not between chunks.
+        """
+        with self._connect() as conn:
+            row = conn.execute("SELECT rowid FROM sessions WHERE id = ? AND user_id = ?", (session_id, self.user_id)).fetchone()
+        if row is None:
+            raise StorageException(f"Session '{session_id}' not found")
+        (rowid,) = row
+        offset = 0
+        while True:
+            with self._connect() as conn:
+                with conn.blobopen("sessions", "keystrokes_data", rowid, readonly=True) as blob:
+                    blob.seek(offset)
+                    chunk = blob.read(chunk_size)
+            if not chunk:
+                return
+            offset += len(chunk)
+            yield chunk
@@ -0,0 +1,14 @@
+import hashlib
+from typing import Optional
+
+
+# 128-bit BLAKE2b digests: collisions are not a practical concern for a
+# pool of typing passages, and the hex key stays short in every session row
+TEXT_HASH_BYTES = 16
+
+
+def hash_text(text: Optional[str]) -> Optional[str]:
+    """Content address of a passage, or None for a session without text."""
+    if text is None:
+        return None
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=TEXT_HASH_BYTES).hexdigest()
@@ -0,0 +1,145 @@
+"""Streaming export/import of the sessions table as NDJSON or CSV.
+
+Both directions work one session at a time: export pulls rows from
+StorageManager.iter_sessions and writes each line as it goes, import parses
+the file lazily and hands a generator to StorageManager.import_sessions.
+Keystrokes are written in the portable columnar form ({"t": [...], "k": "..."}),
+not the on-disk binary encoding.
+"""
+
+import csv
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, Iterator, Optional
+
+from ..core.keystroke_log import KeystrokeLog
+from ..utils.exceptions import StorageException
+from .storage import StorageManager, TRANSFER_BATCH_SIZE
+
+
+EXPORTS_RELATIVE_PATH = os.path.join("terminal_typewriter", "data", "exports")
+
+FORMATS = ("ndjson", "csv")
+EXPORT_FIELDS = ("id", "timestamp", "mode", "duration", "text_length", "wpm", "accuracy", "errors", "text", "keystrokes")
+
+_FLOAT_FIELDS = ("duration", "wpm", "accuracy")
+_INT_FIELDS = ("text_length", "errors")
+
+# Keystroke columns of long sessions exceed csv's default 128 KiB field limit
+CSV_FIELD_SIZE_LIMIT = 2**31 - 1
+
+
+def detect_format(path: str, fmt: Optional[str] = None) -> str:
+    if fmt is None:
+        ext = os.path.splitext(path)[1].lower()
+        fmt = {".ndjson": "ndjson", ".jsonl": "ndjson", ".csv": "csv"}.get(ext)
+        if fmt is None:
+            raise StorageException(f"Cannot infer export format from '{path}'; use .ndjson or .csv")
+    if fmt not in FORMATS:
+        raise StorageException(f"Unsupported format '{fmt}'")
+    return fmt
+
+
+def default_export_path(fmt: str = "ndjson", exports_dir: Optional[str] = None) -> str:
+    exports_dir = exports_dir or os.path.join(os.getcwd(), EXPORTS_RELATIVE_PATH)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    return os.path.join(exports_dir, f"sessions-{stamp}.{fmt}")
+
+
+def _to_record(session: Dict[str, Any]) -> Dict[str, Any]:
+    record = {field: session.get(field) for field in EXPORT_FIELDS}
+    record["keystrokes"] = session["keystrokes"].to_columnar()
+    return record
+
+
+def _from_record(record: Dict[str, Any]) -> Dict[str, Any]:
+    if not record.get("id"):
+        raise StorageException("Imported session is missing an id")
+    session = dict(record)
+    keystrokes = record.get("keystrokes")
+    if isinstance(keystrokes, dict):
+        session["keystrokes"] = KeystrokeLog.from_columnar(keystrokes)
+    elif isinstance(keystrokes, str):
+        session["keystrokes"] = KeystrokeLog.deserialize(keystrokes)
+    return session
+
+
+def _csv_value(field: str, value: str) -> Any:
+    if value == "":
+        return None
+    if field in _FLOAT_FIELDS:
+        return float(value)
+    if field in _INT_FIELDS:
+        return int(value)
+    return value
+
+
+def export_sessions(storage: StorageManager, path: str, fmt: Optional[str] = None, batch_size: int = TRANSFER_BATCH_SIZE) -> int:
+    """Write every session to path; returns the number exported.
+
+    The file is written under a temporary name and moved into place when
+    complete, so an interrupted export never leaves a truncated file behind.
+    """
+    fmt = detect_format(path, fmt)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + ".part"
+    count = 0
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="") as f:
+            if fmt == "csv":
+                writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+                writer.writeheader()
+            for session in storage.iter_sessions(batch_size=batch_size):
+                record = _to_record(session)
+                if fmt == "csv":
+                    record["keystrokes"] = json.dumps(record["keystrokes"], separators=(",", ":"))
+                    writer.writerow(record)
+                else:
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+                    f.write("\n")
+                count += 1
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        raise StorageException(str(exc))
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return count
+
+
+def read_sessions(path: str, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Lazily parse an export file into session dicts ready for import."""
+    fmt = detect_format(path, fmt)
+    try:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            if fmt == "csv":
+                reader = csv.DictReader(f)
+                while True:
+                    # The limit is process-wide, so it is only raised while a row is parsed
+                    previous = csv.field_size_limit(CSV_FIELD_SIZE_LIMIT)
+                    try:
+                        row = next(reader, None)
+                    finally:
+                        csv.field_size_limit(previous)
+                    if row is None:
+                        break
+                    yield _from_record({k: _csv_value(k, v) for k, v in row.items()})
+            else:
+                for line_no, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError as exc:
+                        raise StorageException(f"{path}:{line_no}: {exc}")
+                    yield _from_record(record)
+    except (OSError, ValueError) as exc:
+        raise StorageException(str(exc))
+
+
+def import_sessions(storage: StorageManager, path: str, fmt: Optional[str] = None, replace: bool = False, batch_size: int = TRANSFER_BATCH_SIZE) -> int:
+    """Load an export file into storage; returns the number of rows written."""
+    return storage.import_sessions(read_sessions(path, fmt), replace=replace, batch_size=batch_size)
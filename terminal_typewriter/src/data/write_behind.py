@@ -0,0 +1,112 @@
+import atexit
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+from ..utils.exceptions import StorageException
+from .storage import StorageManager
+
+
+MAX_PENDING = 256
+BATCH_SIZE = 64
+
+_STOP = object()
+
+
+class WriteBehindQueue:
+    """Persist sessions on a background thread so the UI never waits on SQLite.
+
+    submit() enqueues a session and returns immediately (blocking only when
+    max_pending sessions are already waiting). The writer thread groups
+    whatever is queued into one transaction of up to batch_size sessions.
+    await_durable() blocks until everything submitted so far is committed,
+    and close() - also registered with atexit - flushes the queue on exit.
+    """
+
+    def __init__(self, storage: StorageManager, max_pending: int = MAX_PENDING, batch_size: int = BATCH_SIZE) -> None:
+        self.storage = storage
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._cond = threading.Condition()
+        # Orders submit() against close() so nothing is queued behind the stop marker
+        self._submit_lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._errors: List[StorageException] = []
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="session-writer", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, session: Dict[str, Any]) -> None:
+        with self._submit_lock:
+            if self._closed:
+                raise StorageException("Session writer is closed")
+            with self._cond:
+                self._submitted += 1
+            # Pin the owner now: the storage's current user may change before the write
+            self._queue.put(dict(session, user_id=session.get("user_id", self.storage.user_id)))
+
+    def _run(self) -> None:
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            batch = [item]
+            while len(batch) < self.batch_size:
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._write(batch)
+
+    def _write(self, batch: List[Dict[str, Any]]) -> None:
+        errors: List[StorageException] = []
+        try:
+            self.storage.save_sessions(batch)
+        except StorageException:
+            # The grouped transaction rolled back; retry one by one so a single
+            # bad session does not take the rest of the batch with it
+            for session in batch:
+                try:
+                    self.storage.save_session(session)
+                except StorageException as exc:
+                    errors.append(StorageException(f"Failed to save session {session.get('id')}: {exc}"))
+        with self._cond:
+            self._errors.extend(errors)
+            self._completed += len(batch)
+            self._cond.notify_all()
+
+    @property
+    def pending(self) -> int:
+        with self._cond:
+            return self._submitted - self._completed
+
+    def await_durable(self, timeout: Optional[float] = None) -> None:
+        """Block until every session submitted so far has been committed.
+
+        Raises StorageException if that takes longer than `timeout`, or if
+        any of those sessions failed to save.
+        """
+        with self._cond:
+            target = self._submitted
+            if not self._cond.wait_for(lambda: self._completed >= target, timeout):
+                raise StorageException("Timed out waiting for sessions to be saved")
+            errors, self._errors = self._errors, []
+        if errors:
+            raise StorageException("; ".join(str(e) for e in errors))
+
+    def close(self, timeout: Optional[float] = None) -> None:
+        """Flush queued sessions and stop the writer thread."""
+        with self._submit_lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._thread.join(timeout)
+        atexit.unregister(self.close)
@@ -7,6 +7,11 @@ from ..data.storage import StorageManager
 from ..utils.helpers import now_utc_iso
 
 
+# Modes that count toward "all difficulties"; legacy rows backfilled as
+# 'unknown' and custom texts are not difficulty levels
+DIFFICULTIES = frozenset({"beginner", "intermediate", "advanced", "expert"})
+
+
 class AchievementSystem:
     def __init__(self, storage: StorageManager, config_dir: str = None) -> None:
         self.storage = storage
@@ -168,12 +173,12 @@ class AchievementSystem:
         wpm_values = [s.get('wpm', 0) for s in sessions]
         accuracy_values = [s.get('accuracy', 0) for s in sessions]
         durations = [s.get('duration', 0) for s in sessions]
-        difficulties = set(s.get('mode', '') for s in sessions)
+        difficulties = set(s.get('mode', '') for s in sessions) & DIFFICULTIES
         
         # Calculate streak (consecutive days with sessions)
         streak = self._calculate_streak(sessions)
         
-        return {
+        stats = {
             "sessions": len(sessions),
             "max_wpm": max(wpm_values) if wpm_values else 0,
             "max_accuracy": max(accuracy_values) if accuracy_values else 0,
@@ -181,6 +186,18 @@ class AchievementSystem:
             "difficulties_completed": difficulties,
             "streak": streak
         }
+        
+        # Counts, bests and total time come from the stored aggregates so they
+        # cover the whole history, not just the sessions passed in
+        totals = self.storage.get_totals()
+        if totals["total_sessions"]:
+            stats["sessions"] = max(stats["sessions"], totals["total_sessions"])
+            stats["max_wpm"] = max(stats["max_wpm"], totals["best_wpm"])
+            stats["max_accuracy"] = max(stats["max_accuracy"], totals["best_accuracy"])
+            stats["total_time"] = max(stats["total_time"], totals["total_time"])
+            stats["difficulties_completed"] = difficulties | (set(self.storage.get_mode_totals()) & DIFFICULTIES)
+        
+        return stats
 
     def _calculate_streak(self, sessions: List[Dict[str, Any]]) -> int:
         """Calculate current streak of consecutive days with sessions."""
@@ -216,8 +233,7 @@ class AchievementSystem:
     def _evaluate_condition(self, condition: str, stats: Dict[str, Any], sessions: List[Dict[str, Any]]) -> bool:
         """Evaluate achievement condition."""
         if condition == "all_difficulties_completed":
-            required_difficulties = {"beginner", "intermediate", "advanced", "expert"}
-            return required_difficulties.issubset(stats["difficulties_completed"])
+            return DIFFICULTIES.issubset(stats["difficulties_completed"])
         
         # Simple condition evaluation (can be expanded)
         try:
@@ -1,51 +1,116 @@
-from typing import List, Dict, Any, Tuple
-from statistics import mean, median
+from typing import List, Dict, Any, Optional, Tuple
 
 from ..utils.charts import ASCIIChart
+from .columnar import SessionColumns
+
+TREND_CHART_SESSIONS = 20
+ROLLUP_TABLE_ROWS = 20
+_PERIOD_TITLES = {'day': 'DAILY', 'week': 'WEEKLY', 'month': 'MONTHLY'}
+
+
+def rollup_trend(rollups: List[Dict[str, Any]], metric: str = 'avg_wpm') -> Dict[str, Any]:
+    """Least-squares slope of a rollup metric across the buckets that have sessions."""
+    points = [(i, r[metric]) for i, r in enumerate(rollups) if r['count']]
+    if len(points) < 2:
+        return {'trend': 'insufficient_data', 'message': 'Need at least 2 periods with sessions to show trends'}
+    n = len(points)
+    mean_x = sum(x for x, _ in points) / n
+    mean_y = sum(y for _, y in points) / n
+    spread = sum((x - mean_x) ** 2 for x, _ in points)
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in points) / spread
+    return {
+        'trend': 'improving' if slope > 0 else 'declining' if slope < 0 else 'stable',
+        'change_per_period': round(slope, 2),
+        'change': round(points[-1][1] - points[0][1], 2),
+        'periods_analyzed': n,
+    }
+
+
+def format_rollup_report(rollups: List[Dict[str, Any]], period: str, charts: Optional[ASCIIChart] = None) -> str:
+    """Charts, trend and per-bucket table for rollups from StorageManager.get_rollups()."""
+    charts = charts or ASCIIChart()
+    active = [r for r in rollups if r['count']]
+    if not active:
+        return "No sessions in this range."
+    
+    report = []
+    report.append(f"📅 {_PERIOD_TITLES.get(period, period.upper())} TRENDS ({rollups[0]['bucket']} to {rollups[-1]['bucket']})")
+    report.append("=" * 50)
+    report.append("")
+    report.append(charts.generate_rollup_chart(rollups, 'avg_wpm', f"Average WPM per {period}"))
+    report.append("")
+    report.append(charts.generate_rollup_chart(rollups, 'avg_accuracy', f"Average Accuracy per {period}"))
+    report.append("")
+    
+    trend = rollup_trend(rollups)
+    if trend['trend'] != 'insufficient_data':
+        report.append("📈 Long-range Trend:")
+        report.append(f"  WPM Trend: {trend['trend']} ({trend['change_per_period']:+.2f} per {period})")
+        report.append(f"  Periods with sessions: {trend['periods_analyzed']}")
+        report.append("")
+    
+    report.append(f"Most recent {min(len(active), ROLLUP_TABLE_ROWS)} periods:")
+    report.append(" | ".join(["Period", "Sessions", "Avg WPM", "Median WPM", "Best WPM", "Avg Acc(%)"]))
+    report.append("-" * 64)
+    for r in active[-ROLLUP_TABLE_ROWS:]:
+        report.append(" | ".join([r['bucket'], str(r['count']), f"{r['avg_wpm']:.1f}", f"{r['p50_wpm']:.1f}", f"{r['best_wpm']:.1f}", f"{r['avg_accuracy']:.1f}"]))
+    
+    return "\n".join(report)
 
 
 class Analytics:
-    def __init__(self, sessions: List[Dict[str, Any]]) -> None:
+    def __init__(self, sessions: List[Dict[str, Any]], totals: Optional[Dict[str, Any]] = None, mode_totals: Optional[Dict[str, Dict[str, Any]]] = None, columns: Optional[SessionColumns] = None, distributions: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        # sessions are newest first; every statistic is computed from the
+        # columnar form, built from them unless given directly
         self.sessions = sessions
+        self.columns = columns if columns is not None else SessionColumns.from_sessions(sessions)
+        # Whole-history aggregates; when given they replace the values
+        # recomputed from the (recent) sessions list.
+        self.totals = totals
+        self.mode_totals = mode_totals
+        # Per-metric MetricAccumulator summaries; when given they supply
+        # the whole-history median and p90.
+        self.distributions = distributions
         self.charts = ASCIIChart()
 
+    @classmethod
+    def from_storage(cls, storage) -> "Analytics":
+        """Build analytics over the user's entire history in one streamed pass."""
+        return cls([], columns=SessionColumns.from_storage(storage))
+
+    @classmethod
+    def from_aggregates(cls, storage, recent_limit: int = 10) -> "Analytics":
+        """Build analytics from stored aggregates and accumulators plus the latest sessions.
+
+        Nothing here grows with the history, so it suits reports that
+        need no charts.
+        """
+        return cls(
+            storage.fetch_recent_sessions(limit=recent_limit),
+            totals=storage.get_totals(),
+            mode_totals=storage.get_mode_totals(),
+            distributions={metric: storage.get_metric_accumulator(metric).summary() for metric in ("wpm", "accuracy")},
+        )
+
     def get_summary_stats(self) -> Dict[str, Any]:
         """Get overall summary statistics."""
-        if not self.sessions:
-            return {
-                'total_sessions': 0,
-                'total_time': 0,
-                'best_wpm': 0,
-                'avg_wpm': 0,
-                'best_accuracy': 0,
-                'avg_accuracy': 0,
-                'total_errors': 0
-            }
-        
-        wpm_values = [s.get('wpm', 0) for s in self.sessions]
-        accuracy_values = [s.get('accuracy', 0) for s in self.sessions]
-        durations = [s.get('duration', 0) for s in self.sessions]
-        
-        return {
-            'total_sessions': len(self.sessions),
-            'total_time': sum(durations),
-            'best_wpm': max(wpm_values) if wpm_values else 0,
-            'avg_wpm': round(mean(wpm_values), 2) if wpm_values else 0,
-            'median_wpm': round(median(wpm_values), 2) if wpm_values else 0,
-            'best_accuracy': max(accuracy_values) if accuracy_values else 0,
-            'avg_accuracy': round(mean(accuracy_values), 2) if accuracy_values else 0,
-            'median_accuracy': round(median(accuracy_values), 2) if accuracy_values else 0,
-            'total_errors': sum(s.get('errors', 0) for s in self.sessions)
-        }
+        summary = self.columns.summary()
+        if self.totals:
+            summary.update(self.totals)
+        for metric, distribution in (self.distributions or {}).items():
+            summary[f'median_{metric}'] = distribution['p50']
+            summary[f'p90_{metric}'] = distribution['p90']
+        return summary
 
     def get_progress_trends(self, sessions_limit: int = 10) -> Dict[str, Any]:
         """Get recent progress trends."""
-        recent_sessions = self.sessions[:sessions_limit]  # Most recent sessions
-        if len(recent_sessions) < 2:
+        recent_wpm = self.columns.series("wpm", last=sessions_limit)
+        if len(recent_wpm) < 2:
             return {'trend': 'insufficient_data', 'message': 'Need at least 2 sessions to show trends'}
         
-        recent_wpm = [s.get('wpm', 0) for s in recent_sessions]
-        recent_accuracy = [s.get('accuracy', 0) for s in recent_sessions]
+        # Most recent first
+        recent_wpm.reverse()
+        recent_accuracy = self.columns.series("accuracy", last=sessions_limit)[::-1]
         
         # Calculate trends (simple linear trend)
         wpm_trend = "improving" if recent_wpm[0] > recent_wpm[-1] else "declining" if recent_wpm[0] < recent_wpm[-1] else "stable"
@@ -59,40 +124,15 @@ class Analytics:
             'accuracy_trend': accuracy_trend,
             'wpm_change': round(wpm_change, 2),
             'accuracy_change': round(accuracy_change, 2),
-            'sessions_analyzed': len(recent_sessions)
+            'sessions_analyzed': len(recent_wpm)
         }
 
     def get_difficulty_stats(self) -> Dict[str, Dict[str, float]]:
         """Get statistics by difficulty level."""
-        difficulty_stats = {}
-        
-        for session in self.sessions:
-            mode = session.get('mode', 'unknown')
-            if mode not in difficulty_stats:
-                difficulty_stats[mode] = {'wpm': [], 'accuracy': [], 'count': 0}
-            
-            difficulty_stats[mode]['wpm'].append(session.get('wpm', 0))
-            difficulty_stats[mode]['accuracy'].append(session.get('accuracy', 0))
-            difficulty_stats[mode]['count'] += 1
-        
-        # Calculate averages for each difficulty
-        for mode, stats in difficulty_stats.items():
-            if stats['wpm']:
-                stats['avg_wpm'] = round(mean(stats['wpm']), 2)
-                stats['avg_accuracy'] = round(mean(stats['accuracy']), 2)
-                stats['best_wpm'] = max(stats['wpm'])
-                stats['best_accuracy'] = max(stats['accuracy'])
-            else:
-                stats['avg_wpm'] = 0
-                stats['avg_accuracy'] = 0
-                stats['best_wpm'] = 0
-                stats['best_accuracy'] = 0
-            
-            # Remove raw data, keep only summaries
-            del stats['wpm']
-            del stats['accuracy']
-        
-        return difficulty_stats
+        if self.mode_totals is not None:
+            return {mode: dict(stats) for mode, stats in self.mode_totals.items()}
+
+        return self.columns.mode_stats()
 
     def format_summary_report(self) -> str:
         """Format a human-readable summary report."""
@@ -111,6 +151,7 @@ class Analytics:
         report.append(f"  Total Time: {summary['total_time']:.1f} seconds")
         report.append(f"  Best WPM: {summary['best_wpm']}")
         report.append(f"  Average WPM: {summary['avg_wpm']}")
+        report.append(f"  Median WPM: {summary['median_wpm']} (90th percentile: {summary['p90_wpm']})")
         report.append(f"  Best Accuracy: {summary['best_accuracy']:.1f}%")
         report.append(f"  Average Accuracy: {summary['avg_accuracy']:.1f}%")
         report.append(f"  Total Errors: {summary['total_errors']}")
@@ -155,24 +196,28 @@ class Analytics:
         report.append(f"  Total Time: {summary['total_time']:.1f} seconds")
         report.append(f"  Best WPM: {summary['best_wpm']}")
         report.append(f"  Average WPM: {summary['avg_wpm']}")
+        report.append(f"  Median WPM: {summary['median_wpm']} (90th percentile: {summary['p90_wpm']})")
         report.append(f"  Best Accuracy: {summary['best_accuracy']:.1f}%")
         report.append(f"  Average Accuracy: {summary['avg_accuracy']:.1f}%")
         report.append(f"  Total Errors: {summary['total_errors']}")
         report.append("")
         
         # WPM Trend Chart
-        if len(self.sessions) > 1:
-            report.append(self.charts.generate_wpm_trend_chart(self.sessions))
+        if len(self.columns) > 1:
+            report.append(self.charts.generate_trend_chart(self.columns.series("wpm", last=TREND_CHART_SESSIONS), "WPM Trend"))
             report.append("")
         
         # Accuracy Trend Chart
-        if len(self.sessions) > 1:
-            report.append(self.charts.generate_accuracy_trend_chart(self.sessions))
+        if len(self.columns) > 1:
+            report.append(self.charts.generate_trend_chart(self.columns.series("accuracy", last=TREND_CHART_SESSIONS), "Accuracy Trend"))
             report.append("")
         
         # Difficulty Performance Chart
         if difficulty_stats:
-            report.append(self.charts.generate_difficulty_performance_chart(self.sessions))
+            report.append(self.charts.generate_bar_chart(
+                {mode: stats['avg_wpm'] for mode, stats in difficulty_stats.items()},
+                "Performance by Difficulty",
+            ))
             report.append("")
         
         # Trends
@@ -0,0 +1,171 @@
+"""Columnar session metrics for whole-history analytics.
+
+Sessions are loaded once into typed arrays (one per metric, oldest
+first) while overall and per-mode running totals are accumulated in the
+same loop, so every summary, breakdown and chart series comes from a
+single pass over the history. NumPy is used for the order statistics
+when it is installed; the standard library covers everything otherwise.
+"""
+
+from array import array
+from statistics import median
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # optional fast path
+    np = None
+
+
+# Per-mode running totals: count, total_time, total_errors, sum_wpm, max_wpm, sum_accuracy, max_accuracy
+_COUNT, _TIME, _ERRORS, _SUM_WPM, _MAX_WPM, _SUM_ACC, _MAX_ACC = range(7)
+
+
+def _quantile(values: array, q: float) -> float:
+    """Linearly interpolated q-quantile (NumPy's default method)."""
+    if not values:
+        return 0
+    if np is not None:
+        return float(np.quantile(np.frombuffer(values, dtype=np.float64), q))
+    if q == 0.5:
+        return median(values)
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * q
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class SessionColumns:
+    """Summary metrics of a user's sessions held column by column, oldest first."""
+
+    def __init__(self) -> None:
+        self.timestamps: List[str] = []
+        self.mode_names: List[str] = []
+        self.modes = array("H")
+        self.wpm = array("d")
+        self.accuracy = array("d")
+        self.duration = array("d")
+        self.errors = array("q")
+        self._mode_codes: Dict[str, int] = {}
+        self._mode_totals: List[List[float]] = []
+
+    @classmethod
+    def from_rows(cls, rows: Iterable[Sequence[Any]]) -> "SessionColumns":
+        """Build from (timestamp, mode, wpm, accuracy, duration, errors) rows, oldest first."""
+        columns = cls()
+        columns.extend(rows)
+        return columns
+
+    @classmethod
+    def from_sessions(cls, sessions: Iterable[Dict[str, Any]], newest_first: bool = True) -> "SessionColumns":
+        """Build from session dicts, e.g. fetch_recent_sessions() output (newest first)."""
+        sessions = list(sessions)
+        if newest_first:
+            sessions.reverse()
+        return cls.from_rows(
+            (s.get("timestamp"), s.get("mode"), s.get("wpm"), s.get("accuracy"), s.get("duration"), s.get("errors"))
+            for s in sessions
+        )
+
+    @classmethod
+    def from_storage(cls, storage) -> "SessionColumns":
+        """Stream the current user's entire history from storage."""
+        columns = cls()
+        for batch in storage.iter_metric_batches():
+            columns.extend(batch)
+        return columns
+
+    def extend(self, rows: Iterable[Sequence[Any]]) -> None:
+        timestamps, modes, wpm, accuracy, duration, errors = (
+            self.timestamps, self.modes, self.wpm, self.accuracy, self.duration, self.errors,
+        )
+        codes = self._mode_codes
+        totals = self._mode_totals
+        for ts, mode, w, a, d, e in rows:
+            w = w or 0.0
+            a = a or 0.0
+            d = d or 0.0
+            e = e or 0
+            mode = mode or "unknown"
+            code = codes.get(mode)
+            if code is None:
+                code = codes[mode] = len(self.mode_names)
+                self.mode_names.append(mode)
+                totals.append([0, 0.0, 0, 0.0, 0.0, 0.0, 0.0])
+            t = totals[code]
+            t[_COUNT] += 1
+            t[_TIME] += d
+            t[_ERRORS] += e
+            t[_SUM_WPM] += w
+            t[_SUM_ACC] += a
+            if w > t[_MAX_WPM]:
+                t[_MAX_WPM] = w
+            if a > t[_MAX_ACC]:
+                t[_MAX_ACC] = a
+            timestamps.append(ts)
+            modes.append(code)
+            wpm.append(w)
+            accuracy.append(a)
+            duration.append(d)
+            errors.append(e)
+
+    def __len__(self) -> int:
+        return len(self.wpm)
+
+    def column(self, name: str):
+        """A metric column as a NumPy array when available, else the typed array itself."""
+        values = getattr(self, name)
+        if np is not None and isinstance(values, array):
+            return np.frombuffer(values, dtype=np.float64 if values.typecode == "d" else np.int64)
+        return values
+
+    def summary(self) -> Dict[str, Any]:
+        """Overall statistics, in the shape of Analytics.get_summary_stats()."""
+        count = len(self)
+        if not count:
+            return {
+                "total_sessions": 0,
+                "total_time": 0,
+                "best_wpm": 0,
+                "avg_wpm": 0,
+                "median_wpm": 0,
+                "p90_wpm": 0,
+                "best_accuracy": 0,
+                "avg_accuracy": 0,
+                "median_accuracy": 0,
+                "total_errors": 0,
+            }
+        totals = self._mode_totals
+        return {
+            "total_sessions": count,
+            "total_time": sum(t[_TIME] for t in totals),
+            "best_wpm": max(t[_MAX_WPM] for t in totals),
+            "avg_wpm": round(sum(t[_SUM_WPM] for t in totals) / count, 2),
+            "median_wpm": round(_quantile(self.wpm, 0.5), 2),
+            "p90_wpm": round(_quantile(self.wpm, 0.9), 2),
+            "best_accuracy": max(t[_MAX_ACC] for t in totals),
+            "avg_accuracy": round(sum(t[_SUM_ACC] for t in totals) / count, 2),
+            "median_accuracy": round(_quantile(self.accuracy, 0.5), 2),
+            "total_errors": int(sum(t[_ERRORS] for t in totals)),
+        }
+
+    def mode_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-mode statistics, in the shape of StorageManager.get_mode_totals()."""
+        return {
+            mode: {
+                "count": t[_COUNT],
+                "total_time": t[_TIME],
+                "total_errors": int(t[_ERRORS]),
+                "avg_wpm": round(t[_SUM_WPM] / t[_COUNT], 2),
+                "best_wpm": t[_MAX_WPM],
+                "avg_accuracy": round(t[_SUM_ACC] / t[_COUNT], 2),
+                "best_accuracy": t[_MAX_ACC],
+            }
+            for mode, t in sorted(zip(self.mode_names, self._mode_totals))
+        }
+
+    def series(self, name: str, last: Optional[int] = None) -> List[float]:
+        """Values of one metric in chronological order, optionally only the last `last`."""
+        values = getattr(self, name)
+        return list(values[-last:] if last else values)
@@ -1,31 +1,40 @@
-import time
-from typing import List, Dict, Any
+from typing import Any, Dict, Iterable, Optional, Union
 
+from ..core.clock import Clock, get_default_clock
 from ..core.engine import TypingEngine, BACKSPACE, ENTER
+from ..core.keystroke_log import KeystrokeView, as_keystroke_view
+from ..data.lazy_session import LazyKeystrokes
 
 
 class ReplaySystem:
-    def __init__(self, text: str, keystrokes: List[Dict[str, Any]]) -> None:
+    def __init__(self, text: str, keystrokes: Union[KeystrokeView, LazyKeystrokes, Iterable[Dict[str, Any]]], clock: Optional[Clock] = None) -> None:
         self.text = text
-        # Expect keystrokes as list of {t: seconds, k: key}
-        self.keystrokes = sorted(keystrokes, key=lambda x: x.get("t", 0))
-        self.engine = TypingEngine(text)
+        self.clock = clock or get_default_clock()
+        # Accepts a columnar log, a stored session's lazily-read keystrokes,
+        # or a legacy list of {t: seconds, k: key}
+        if isinstance(keystrokes, LazyKeystrokes):
+            self.keystrokes = keystrokes
+        else:
+            self.keystrokes = as_keystroke_view(keystrokes)
+        self.engine = TypingEngine(text, clock=self.clock)
 
     def run(self, speed: float = 1.0, on_frame=None) -> None:
         if speed <= 0:
             speed = 1.0
         self.engine.start_test()
-        start = time.time()
-        idx = 0
-        while idx < len(self.keystrokes):
-            now = time.time()
-            elapsed = (now - start) * speed
+        # Keystrokes are consumed as a stream, so a lazily-read log only
+        # decodes as far as playback has reached
+        events = self.keystrokes.iter_raw()
+        pending = next(events, None)
+        start = self.clock.now()
+        while pending is not None:
+            now = self.clock.now()
+            elapsed_ms = (now - start) * speed * 1000.0
             # Process all keystrokes whose timestamp <= elapsed
-            while idx < len(self.keystrokes) and self.keystrokes[idx].get("t", 0) <= elapsed:
-                key = self.keystrokes[idx].get("k", "")
-                self.engine.process_keystroke(key)
-                idx += 1
+            while pending is not None and pending[0] <= elapsed_ms:
+                self.engine.process_keystroke(chr(pending[1]))
+                pending = next(events, None)
             if on_frame:
                 on_frame(self.engine)
-            time.sleep(0.02)
+            self.clock.sleep(0.02)
         self.engine.finalize_test()
\ No newline at end of file
@@ -0,0 +1,72 @@
+"""Rendered reports cached on disk, keyed on the storage revision.
+
+StorageManager.get_revision() moves on every save or import, so a cached
+report is served only while the sessions it was built from are
+unchanged; any save invalidates it without the cache being told. A hit
+costs one indexed revision read plus a dict lookup. The file sits next
+to the database and is rewritten atomically when a report is rebuilt.
+"""
+
+import json
+import os
+from typing import Any, Callable, Dict
+
+from ..data.storage import StorageManager
+
+
+def default_report_cache_path(db_path: str) -> str:
+    root, _ = os.path.splitext(db_path)
+    return f"{root}-reports.json"
+
+
+class ReportCache:
+    def __init__(self, storage: StorageManager, path: str = None) -> None:
+        self.storage = storage
+        self.path = path or default_report_cache_path(storage.db_path)
+        self._entries = self._load()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            # A damaged cache is only a missed optimization
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _save(self) -> None:
+        tmp_path = self.path + ".part"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(tmp_path, self.path)
+        except OSError:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get_or_build(self, name: str, build: Callable[[], Any]) -> Any:
+        """The cached value of report `name` for the current user, rebuilt if stale.
+
+        build() must return something JSON-serializable.
+        """
+        revision = self.storage.get_revision()
+        prefix = f"{self.storage.user_id}:"
+        key = prefix + name
+        entry = self._entries.get(key)
+        if entry is not None and entry.get("revision") == revision:
+            self.hits += 1
+            return entry["value"]
+        self.misses += 1
+        value = build()
+        # Drop this user's entries from older revisions; they can never hit again
+        self._entries = {
+            k: v for k, v in self._entries.items()
+            if not k.startswith(prefix) or v.get("revision") == revision
+        }
+        self._entries[key] = {"revision": revision, "value": value}
+        self._save()
+        return value
@@ -1,12 +1,14 @@
 from typing import List, Dict, Any
 
+from ..core.keystroke_timing import TimingStat, histogram_quantile
 
-def format_history_table(rows: List[Dict[str, Any]]) -> str:
+
+def format_history_table(rows: List[Dict[str, Any]], start: int = 1) -> str:
     if not rows:
         return "No sessions found."
     headers = ["#", "ID", "Timestamp", "Mode", "Dur(s)", "WPM", "Acc(%)", "Err"]
     lines = [" | ".join(headers), "-" * 80]
-    for idx, r in enumerate(rows, 1):
+    for idx, r in enumerate(rows, start):
         lines.append(
             " | ".join(
                 [
@@ -21,4 +23,40 @@ def format_history_table(rows: List[Dict[str, Any]]) -> str:
                 ]
             )
         )
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
+
+
+def _timing_label(item: str) -> str:
+    return repr(item)[1:-1].replace(" ", "␣")
+
+
+def format_timing_report(keys: List[TimingStat], bigrams: List[TimingStat], intervals: TimingStat) -> str:
+    if not intervals.histogram:
+        return "No keystroke timing recorded yet."
+    lines = [
+        "Inter-key interval: median {:.0f} ms, 90th percentile {:.0f} ms".format(
+            histogram_quantile(intervals.histogram, 0.5), histogram_quantile(intervals.histogram, 0.9)
+        ),
+        "",
+    ]
+    for title, stats in (("Slowest keys", keys), ("Slowest bigrams", bigrams)):
+        lines.append(title)
+        lines.append(" | ".join(["#", "Keys", "Mean(ms)", "P90(ms)", "Err(%)", "Samples"]))
+        lines.append("-" * 50)
+        if not stats:
+            lines.append("(not enough data yet)")
+        for idx, stat in enumerate(stats, 1):
+            lines.append(
+                " | ".join(
+                    [
+                        str(idx),
+                        _timing_label(stat.item),
+                        f"{stat.mean_ms:.0f}",
+                        f"{stat.p90_ms:.0f}",
+                        f"{stat.error_rate * 100:.1f}",
+                        str(stat.samples),
+                    ]
+                )
+            )
+        lines.append("")
+    return "\n".join(lines).rstrip()
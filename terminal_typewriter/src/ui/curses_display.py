@@ -1,86 +1,144 @@
-import time
-from typing import Tuple
+import math
+from typing import List, Optional, Tuple
 
 import curses
 
+from ..core.clock import Clock, get_default_clock
 from ..core.engine import TypingEngine, BACKSPACE, ENTER
+from ..core.timer import CountdownTimer
+
+
+INPUT_VIEW_HEIGHT = 2
+
+
+def wrap_words(text: str, width: int) -> List[str]:
+    text_lines = []
+    line: List[str] = []
+    for word in text.split(" "):
+        if sum(len(w) for w in line) + max(0, len(line) - 1) + len(word) + 1 > width:
+            text_lines.append(" ".join(line))
+            line = [word]
+        else:
+            line.append(word)
+    if line:
+        text_lines.append(" ".join(line))
+    return text_lines
+
+
+def tail_lines(buf: str, width: int, count: int, line_offset: int = 0) -> List[str]:
+    """Return the last `count` display lines of buf wrapped at `width`.
+
+    Lines break on newlines and every `width` characters. buf may be just
+    the tail of a longer input (see TypingEngine.get_buffer_tail); then
+    line_offset is the number of characters of its first line that were
+    cut off, so wrapping lines up with the full buffer.
+    """
+    lines: List[str] = []
+    end = len(buf)
+    while len(lines) < count:
+        start = buf.rfind("\n", 0, end) + 1
+        seg_len = end - start + (line_offset if start == 0 else 0)
+        if seg_len == 0:
+            lines.append("")
+        else:
+            pos = end - (seg_len % width or width)
+            lines.append(buf[max(start, pos):end])
+            while pos > start and len(lines) < count:
+                lines.append(buf[max(start, pos - width):pos])
+                pos -= width
+        if start == 0:
+            break
+        end = start - 1
+    lines.reverse()
+    return lines
 
 
 class CursesDisplay:
-    def __init__(self, stdscr) -> None:
+    def __init__(self, stdscr, clock: Optional[Clock] = None) -> None:
         self.stdscr = stdscr
+        self.clock = clock or get_default_clock()
         curses.curs_set(1)
         self.stdscr.nodelay(True)
         self.stdscr.keypad(True)
+        self._size: Optional[Tuple[int, int]] = None
+        self._header_win = None
+        self._text_win = None
+        self._input_win = None
+        self._last_header: Optional[str] = None
+        self._last_input: List[str] = []
 
-    def _draw_layout(self, remaining: int, engine: TypingEngine, text: str) -> None:
-        self.stdscr.erase()
+    def _build_layout(self, text: str) -> None:
+        """Create the header/text/input windows for the current terminal size.
+
+        The target text is wrapped and drawn once here; per-frame updates
+        only touch the header and input windows.
+        """
         max_y, max_x = self.stdscr.getmaxyx()
+        self._size = (max_y, max_x)
+        self.stdscr.erase()
+        self.stdscr.noutrefresh()
+
+        self._header_win = curses.newwin(2, max_x, 0, 0)
+        self._header_win.hline(1, 0, curses.ACS_HLINE, max_x)
+        self._header_win.noutrefresh()
+
+        text_height = max(1, max_y - 6)
+        self._text_win = curses.newwin(text_height, max_x, 2, 0)
+        for idx, tline in enumerate(wrap_words(text, max_x)[:text_height]):
+            self._text_win.addnstr(idx, 0, tline, max_x)
+        self._text_win.noutrefresh()
+
+        self._input_win = curses.newwin(INPUT_VIEW_HEIGHT + 2, max_x, max_y - 4, 0)
+        self._input_win.hline(0, 0, curses.ACS_HLINE, max_x)
+        self._input_win.addnstr(1, 0, "Your input:", max_x)
+        self._input_win.noutrefresh()
+
+        self._last_header = None
+        self._last_input = [""] * INPUT_VIEW_HEIGHT
+
+    def _draw_layout(self, remaining: int, engine: TypingEngine, text: str) -> None:
+        if self.stdscr.getmaxyx() != self._size:
+            self._build_layout(text)
+        max_x = self._size[1]
 
         # Header
         stats = engine.get_current_stats()
         header = f"⏳ {remaining:>3}s  |  WPM: {stats.wpm:>5}  |  Acc: {stats.accuracy:>5}%  |  Chars: {stats.characters_typed}"
-        self.stdscr.addnstr(0, 0, header.ljust(max_x), max_x)
-        self.stdscr.hline(1, 0, curses.ACS_HLINE, max_x)
-
-        # Text area
-        text_lines = []
-        line = []
-        for word in text.split(" "):
-            if sum(len(w) for w in line) + max(0, len(line) - 1) + len(word) + 1 > max_x:
-                text_lines.append(" ".join(line))
-                line = [word]
-            else:
-                line.append(word)
-        if line:
-            text_lines.append(" ".join(line))
-        for idx, tline in enumerate(text_lines[: max(1, max_y - 6)]):
-            self.stdscr.addnstr(2 + idx, 0, tline, max_x)
-
-        # Separator
-        self.stdscr.hline(max_y - 4, 0, curses.ACS_HLINE, max_x)
+        if header != self._last_header:
+            self._header_win.addnstr(0, 0, header.ljust(max_x), max_x)
+            self._header_win.noutrefresh()
+            self._last_header = header
 
-        # Input label
-        self.stdscr.addnstr(max_y - 3, 0, "Your input:", max_x)
-
-        # Input echo (last lines)
-        buf = engine.get_buffer()
-        view_height = 2
+        # Input echo (last lines), redrawing only rows that changed
         view_width = max_x - 1
-        lines = []
-        current = ""
-        for ch in buf:
-            if ch == "\n":
-                lines.append(current)
-                current = ""
-            else:
-                if len(current) >= view_width:
-                    lines.append(current)
-                    current = ch
-                else:
-                    current += ch
-        lines.append(current)
-        start_line = max(0, len(lines) - view_height)
-        for i in range(view_height):
-            content = lines[start_line + i] if start_line + i < len(lines) else ""
-            self.stdscr.addnstr(max_y - 2 + i, 0, content.ljust(view_width), view_width)
-
-        # Place caret
-        caret_y = max_y - 2 + min(view_height - 1, len(lines) - 1 - start_line)
+        tail, line_offset = engine.get_buffer_tail(INPUT_VIEW_HEIGHT * (view_width + 1))
+        lines = tail_lines(tail, view_width, INPUT_VIEW_HEIGHT, line_offset)
+        padded = lines + [""] * (INPUT_VIEW_HEIGHT - len(lines))
+        for i, content in enumerate(padded):
+            if content != self._last_input[i]:
+                self._input_win.addnstr(2 + i, 0, content.ljust(view_width), view_width)
+        self._last_input = padded
+
+        # Place caret; the input window is refreshed last so the cursor stays there
+        caret_y = 2 + len(lines) - 1
         caret_x = min(len(lines[-1]), view_width - 1)
         try:
-            self.stdscr.move(caret_y, caret_x)
+            self._input_win.move(caret_y, caret_x)
         except curses.error:
             pass
+        self._input_win.noutrefresh()
 
-        self.stdscr.refresh()
+        curses.doupdate()
 
     def run_session(self, text: str, duration: int, engine: TypingEngine) -> None:
         engine.start_test()
-        start = time.time()
-        remaining = duration
-        while remaining > 0:
-            # Input handling
+        timer = CountdownTimer(duration_seconds=duration, clock=self.clock)
+        timer.start()
+        self._draw_layout(timer.remaining, engine, text)
+        while not timer.expired:
+            # Block in getch until a key arrives or the next tick/deadline is due
+            wait_ms = math.ceil(timer.time_until_next_tick() * 1000)
+            self.stdscr.timeout(max(1, wait_ms))
             try:
                 key = self.stdscr.getch()
             except curses.error:
@@ -92,9 +150,5 @@ class CursesDisplay:
                     engine.process_keystroke(ENTER)
                 elif 0 <= key <= 255:
                     engine.process_keystroke(chr(key))
-            # Render
-            self._draw_layout(remaining, engine, text)
-            # Update remaining
-            elapsed = int(time.time() - start)
-            remaining = max(0, duration - elapsed)
-            time.sleep(0.02)
\ No newline at end of file
+            timer.poll()
+            self._draw_layout(timer.remaining, engine, text)
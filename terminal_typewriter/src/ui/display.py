@@ -1,9 +1,20 @@
 import os
 import sys
+from typing import Optional
+
 from ..core.engine import TypingEngine
+from .frame_renderer import AnsiFrameRenderer, display_width, fit_tail_to_width
+
+
+INPUT_PREFIX = "Your input: "
+CARET = "|"
 
 
 class DisplayManager:
+    def __init__(self, max_fps: float = 10.0, renderer: Optional[AnsiFrameRenderer] = None) -> None:
+        self.max_fps = max_fps
+        self._live = renderer or AnsiFrameRenderer(max_fps=max_fps)
+
     def clear(self) -> None:
         os.system('clear' if os.name == 'posix' else 'cls')
 
@@ -38,11 +49,19 @@ class DisplayManager:
 
     def render_live(self, engine: TypingEngine, remaining_seconds: int) -> None:
         stats = engine.get_current_stats()
-        print("\n" + "-" * 70)
-        print(f"⏳ Time remaining: {remaining_seconds:>3} s  |  WPM: {stats.wpm:>5}  |  Acc: {stats.accuracy:>5}%  |  Chars: {stats.characters_typed}")
-        print("-" * 70)
-        buf = engine.get_buffer()
-        caret = "|"
-        # Show only last 120 characters of buffer for brevity
-        snippet = buf[-120:]
-        print(f"Your input: {snippet}{caret}")
\ No newline at end of file
+        # Show the newest input that fits on the line next to the prefix and caret
+        room = max(0, self._live.width() - display_width(INPUT_PREFIX) - display_width(CARET))
+        tail, _ = engine.get_buffer_tail(room)
+        snippet = fit_tail_to_width(tail, room)
+        frame = [
+            "",
+            "-" * 70,
+            f"⏳ Time remaining: {remaining_seconds:>3} s  |  WPM: {stats.wpm:>5}  |  Acc: {stats.accuracy:>5}%  |  Chars: {stats.characters_typed}",
+            "-" * 70,
+            f"{INPUT_PREFIX}{snippet}{CARET}",
+        ]
+        # The final frame is always drawn so the last state is not dropped by the cap
+        self._live.render(frame, force=remaining_seconds <= 0)
+
+    def end_live(self) -> None:
+        self._live.finish()
\ No newline at end of file
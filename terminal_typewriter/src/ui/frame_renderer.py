@@ -0,0 +1,139 @@
+import shutil
+import sys
+import unicodedata
+from typing import List, Optional, TextIO
+
+from ..core.clock import Clock, get_default_clock
+
+
+CSI = "\x1b["
+
+
+def display_width(text: str) -> int:
+    width = 0
+    for ch in text:
+        if unicodedata.combining(ch):
+            continue
+        width += 2 if unicodedata.east_asian_width(ch) in ("W", "F") else 1
+    return width
+
+
+def fit_to_width(text: str, columns: int) -> str:
+    """Truncate text so it occupies at most `columns` terminal cells."""
+    if len(text) * 2 <= columns:
+        return text
+    width = 0
+    for idx, ch in enumerate(text):
+        width += display_width(ch)
+        if width > columns:
+            return text[:idx]
+    return text
+
+
+def fit_tail_to_width(text: str, columns: int) -> str:
+    """Keep the end of text, dropping characters from the left, so it fits in `columns` cells."""
+    if len(text) * 2 <= columns:
+        return text
+    width = 0
+    for idx in range(len(text) - 1, -1, -1):
+        width += display_width(text[idx])
+        if width > columns:
+            return text[idx + 1:]
+    return text
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    limit = min(len(a), len(b))
+    i = 0
+    while i < limit and a[i] == b[i]:
+        i += 1
+    return i
+
+
+class AnsiFrameRenderer:
+    """Redraw a fixed block of lines in place using cursor-movement escapes.
+
+    Only the changed span of each changed line is emitted, the whole frame
+    is assembled into one string and written with a single write/flush, and
+    frames arriving faster than max_fps are dropped unless forced.
+    """
+
+    def __init__(self, stream: Optional[TextIO] = None, max_fps: float = 10.0, clock: Optional[Clock] = None, columns: Optional[int] = None) -> None:
+        self.stream = stream or sys.stdout
+        self.clock = clock or get_default_clock()
+        self.min_interval = 1.0 / max_fps if max_fps > 0 else 0.0
+        self.columns = columns
+        self._lines: Optional[List[str]] = None
+        self._last_frame_at: Optional[float] = None
+
+    def reset(self) -> None:
+        """Forget the current frame; the next render starts a fresh block."""
+        self._lines = None
+        self._last_frame_at = None
+
+    def width(self) -> int:
+        """Cells available per line; longer lines are truncated on the right."""
+        if self.columns is not None:
+            return self.columns
+        return shutil.get_terminal_size((80, 24)).columns - 1
+
+    def render(self, lines: List[str], force: bool = False) -> bool:
+        now = self.clock.now()
+        if not force and self._last_frame_at is not None and now - self._last_frame_at < self.min_interval:
+            return False
+        columns = self.width()
+        lines = [fit_to_width(line, columns) for line in lines]
+
+        if self._lines is None:
+            # First frame: print it plainly and park the cursor at column 0 of its last line
+            out = ["\n".join(lines), "\r"]
+        else:
+            out = self._diff(self._lines, lines)
+        self._lines = lines
+        self._last_frame_at = now
+        frame = "".join(out)
+        if frame:
+            self.stream.write(frame)
+            self.stream.flush()
+        return True
+
+    def _diff(self, old: List[str], new: List[str]) -> List[str]:
+        out: List[str] = []
+        height = len(old)
+        if len(new) > height:
+            # Grow the block downwards; the new rows start out blank
+            out.append("\n" * (len(new) - height))
+            old = old + [""] * (len(new) - height)
+            height = len(new)
+        else:
+            new = new + [""] * (height - len(new))
+
+        row = height - 1
+        for idx, (before, after) in enumerate(zip(old, new)):
+            if before == after:
+                continue
+            if idx < row:
+                out.append(f"{CSI}{row - idx}A")
+            elif idx > row:
+                out.append(f"{CSI}{idx - row}B")
+            row = idx
+            prefix = _common_prefix_length(before, after)
+            col = display_width(after[:prefix])
+            out.append("\r")
+            if col:
+                out.append(f"{CSI}{col}C")
+            out.append(after[prefix:])
+            if display_width(after) < display_width(before):
+                out.append(f"{CSI}K")
+        if row != height - 1:
+            out.append(f"{CSI}{height - 1 - row}B")
+        if out:
+            out.append("\r")
+        return out
+
+    def finish(self) -> None:
+        """Move below the current block so normal output can resume."""
+        if self._lines is not None:
+            self.stream.write("\n")
+            self.stream.flush()
+        self.reset()
@@ -1,26 +1,58 @@
+import codecs
+import os
 import sys
 import termios
 import tty
 import select
-from typing import Optional
+from typing import Optional, TextIO
+
+
+READ_CHUNK_SIZE = 4096
 
 
 class InputHandler:
-    def __init__(self) -> None:
+    def __init__(self, stream: Optional[TextIO] = None) -> None:
+        self._stream = stream or sys.stdin
         self._orig_settings: Optional[list[int]] = None
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        self.eof = False
 
     def __enter__(self):
-        self._orig_settings = termios.tcgetattr(sys.stdin)
-        tty.setcbreak(sys.stdin.fileno())
+        if self._stream.isatty():
+            self._orig_settings = termios.tcgetattr(self._stream)
+            tty.setcbreak(self._stream.fileno())
         return self
 
     def __exit__(self, exc_type, exc, tb):
         if self._orig_settings is not None:
-            termios.tcsetattr(sys.stdin, termios.TCSADRAIN, self._orig_settings)
+            termios.tcsetattr(self._stream, termios.TCSADRAIN, self._orig_settings)
+
+    def fileno(self) -> int:
+        return self._stream.fileno()
 
-    def read_key(self) -> Optional[str]:
-        dr, _, _ = select.select([sys.stdin], [], [], 0.01)
+    def read_key(self, timeout: float = 0.01) -> Optional[str]:
+        dr, _, _ = select.select([self._stream], [], [], max(0.0, timeout))
         if dr:
-            ch = sys.stdin.read(1)
+            ch = self._stream.read(1)
             return ch
-        return None
\ No newline at end of file
+        return None
+
+    def read_available(self) -> str:
+        """Drain every byte that is ready on the input without blocking.
+
+        Reads the file descriptor directly so nothing is left behind in
+        Python's stdin buffer; partial UTF-8 sequences are carried over to
+        the next call.
+        """
+        fd = self.fileno()
+        chunks = []
+        while True:
+            data = os.read(fd, READ_CHUNK_SIZE)
+            if not data:
+                self.eof = True
+                break
+            chunks.append(self._decoder.decode(data))
+            ready, _, _ = select.select([fd], [], [], 0)
+            if not ready:
+                break
+        return "".join(chunks)
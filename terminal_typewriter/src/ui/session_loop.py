@@ -0,0 +1,80 @@
+import math
+import selectors
+from typing import Callable, Optional
+
+from ..core.engine import TypingEngine
+from ..core.timer import CountdownTimer
+from .input_handler import InputHandler
+
+
+class SessionLoop:
+    """Selector-driven input/render loop for a timed typing session.
+
+    The loop sleeps until stdin is readable, the timer's next tick or
+    deadline is due, or a pending frame should be drawn. Every wakeup
+    drains all buffered input, so pastes and injected replays at thousands
+    of keys per second are processed without drops, while rendering stays
+    capped at render_interval.
+    """
+
+    def __init__(
+        self,
+        engine: TypingEngine,
+        timer: CountdownTimer,
+        source: InputHandler,
+        render: Callable[[], None],
+        render_interval: float = 0.1,
+        selector: Optional[selectors.BaseSelector] = None,
+    ) -> None:
+        self.engine = engine
+        self.timer = timer
+        self.source = source
+        self.render = render
+        self.render_interval = render_interval
+        self.clock = timer.clock
+        self._selector = selector or selectors.DefaultSelector()
+        self.wakeups = 0
+        self.frames = 0
+
+    def _draw(self) -> None:
+        self.render()
+        self.frames += 1
+
+    def run(self) -> None:
+        selector = self._selector
+        selector.register(self.source.fileno(), selectors.EVENT_READ)
+        watching_input = True
+        try:
+            self._draw()
+            next_frame = self.clock.now() + self.render_interval
+            dirty = False
+            while not self.timer.expired:
+                timeout = self.timer.time_until_next_tick()
+                if dirty:
+                    timeout = min(timeout, max(0.0, next_frame - self.clock.now()))
+                if watching_input:
+                    events = selector.select(None if timeout == math.inf else timeout)
+                else:
+                    events = []
+                    self.clock.sleep(timeout)
+                self.wakeups += 1
+                if events:
+                    typed = self.source.read_available()
+                    for key in typed:
+                        self.engine.process_keystroke(key)
+                    dirty = dirty or bool(typed)
+                    if self.source.eof:
+                        selector.unregister(self.source.fileno())
+                        watching_input = False
+                if self.timer.poll():
+                    dirty = True
+                now = self.clock.now()
+                if dirty and now >= next_frame:
+                    self._draw()
+                    dirty = False
+                    next_frame = now + self.render_interval
+            if dirty:
+                self._draw()
+        finally:
+            if watching_input:
+                selector.unregister(self.source.fileno())
@@ -117,31 +117,55 @@ class ASCIIChart:
         
         return "\n".join(chart_lines)
 
+    def generate_trend_chart(self, values: List[float], title: str) -> str:
+        """Generate a line chart of per-session values in chronological order."""
+        if not values:
+            return f"{title}\n(No sessions available)\n"
+        x_labels = [f"S{i+1}" for i in range(len(values))]
+        return self.generate_line_chart(values, title, x_labels)
+
     def generate_wpm_trend_chart(self, sessions: List[Dict[str, Any]], title: str = "WPM Trend") -> str:
         """Generate a WPM trend chart from session data."""
-        if not sessions:
-            return f"{title}\n(No sessions available)\n"
-        
         # Extract WPM data (most recent first, so reverse for chronological order)
-        wpm_data = [s.get('wpm', 0) for s in reversed(sessions[-20:])]  # Last 20 sessions
-        
-        # Generate labels (session numbers)
-        x_labels = [f"S{i+1}" for i in range(len(wpm_data))]
-        
-        return self.generate_line_chart(wpm_data, title, x_labels)
+        return self.generate_trend_chart([s.get('wpm', 0) for s in reversed(sessions[-20:])], title)  # Last 20 sessions
 
     def generate_accuracy_trend_chart(self, sessions: List[Dict[str, Any]], title: str = "Accuracy Trend") -> str:
         """Generate an accuracy trend chart from session data."""
-        if not sessions:
+        return self.generate_trend_chart([s.get('accuracy', 0) for s in reversed(sessions[-20:])], title)  # Last 20 sessions
+
+    def generate_rollup_chart(self, rollups: List[Dict[str, Any]], metric: str = "avg_wpm", title: str = "WPM by Period") -> str:
+        """Generate a line chart of one rollup metric over time, one point per bucket.
+
+        Empty buckets repeat the previous value. When there are more
+        buckets than the chart is wide, neighbouring buckets are merged:
+        best values take the maximum, others a count-weighted mean (for
+        medians that is an approximation).
+        """
+        points = [(r["bucket"], r[metric], r["count"]) for r in rollups]
+        while points and not points[0][2]:
+            points.pop(0)
+        if not points:
             return f"{title}\n(No sessions available)\n"
         
-        # Extract accuracy data
-        accuracy_data = [s.get('accuracy', 0) for s in reversed(sessions[-20:])]  # Last 20 sessions
-        
-        # Generate labels
-        x_labels = [f"S{i+1}" for i in range(len(accuracy_data))]
-        
-        return self.generate_line_chart(accuracy_data, title, x_labels)
+        group = -(-len(points) // self.width)
+        values, labels = [], []
+        previous = 0.0
+        for start in range(0, len(points), group):
+            chunk = points[start:start + group]
+            count = sum(c for _, _, c in chunk)
+            if not count:
+                value = previous
+            elif metric.startswith("best_"):
+                value = max(v for _, v, c in chunk if c)
+            else:
+                value = sum(v * c for _, v, c in chunk) / count
+            values.append(value)
+            # Labels get 8 columns: "05-17" for days, "24-W20" for weeks, "2024-05" for months
+            key = chunk[0][0]
+            labels.append(key[5:] if len(key) == 10 else key[2:] if "-W" in key else key)
+            previous = value
+        
+        return self.generate_line_chart(values, title, labels)
 
     def generate_difficulty_performance_chart(self, sessions: List[Dict[str, Any]], title: str = "Performance by Difficulty") -> str:
         """Generate a bar chart showing performance by difficulty level."""
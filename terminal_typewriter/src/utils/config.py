@@ -31,6 +31,9 @@ class ConfigManager:
             "default_theme": "default",
             "auto_save_sessions": True,
             "show_live_stats": True,
+            "live_render_fps": 10,
+            "keystroke_retention_days": 0,
+            "keystroke_retention_policy": "archive",
             "wpm_target": 60,
             "user_name": "Guest"
         }
@@ -0,0 +1,75 @@
+import json
+import os
+import random
+import statistics
+import tempfile
+
+from src.core.accumulators import MetricAccumulator, QuantileDigest, RunningStats
+from src.data.storage import StorageManager
+from src.features.analytics import Analytics
+
+
+def _values(count=20000, seed=7):
+    rng = random.Random(seed)
+    return [rng.gauss(55, 14) for _ in range(count)]
+
+
+def test_running_stats_match_statistics_and_merge():
+    values = _values()
+    whole = RunningStats()
+    for v in values:
+        whole.update(v)
+    left, right = RunningStats(), RunningStats()
+    for v in values[:7000]:
+        left.update(v)
+    for v in values[7000:]:
+        right.update(v)
+    left.merge(right)
+
+    for stats in (whole, left):
+        assert stats.count == len(values)
+        assert abs(stats.mean - statistics.mean(values)) < 1e-9
+        assert abs(stats.variance - statistics.variance(values)) < 1e-6
+        assert stats.minimum == min(values) and stats.maximum == max(values)
+
+
+def test_digest_quantiles_survive_merge_and_persistence():
+    values = _values()
+    ordered = sorted(values)
+    parts = [QuantileDigest() for _ in range(4)]
+    for i, v in enumerate(values):
+        parts[i % 4].update(v)
+    digest = QuantileDigest.from_dict(json.loads(json.dumps(parts[0].to_dict())))
+    for part in parts[1:]:
+        digest.merge(part)
+
+    assert len(digest.means) <= 2 * digest.compression
+    for q in (0.1, 0.5, 0.9, 0.99):
+        exact = ordered[int(q * (len(ordered) - 1))]
+        assert abs(digest.quantile(q) - exact) < 0.5
+    assert digest.quantile(0) == ordered[0] and digest.quantile(1) == ordered[-1]
+    assert QuantileDigest().quantile(0.5) == 0.0
+
+
+def test_storage_keeps_accumulators_current():
+    def session(user, i, wpm):
+        return {"id": f"{user}{i}", "timestamp": f"2024-01-01T00:00:{i:02d}Z", "mode": "expert", "wpm": wpm, "accuracy": 90.0}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db"), user_name="alice") as storage:
+            for i in range(30):
+                storage.save_session(session("a", i, float(40 + i)))
+            summary = storage.get_metric_accumulator("wpm").summary()
+            assert summary["count"] == 30 and summary["mean"] == 54.5 and summary["max"] == 69.0
+            assert abs(summary["p50"] - 54.5) <= 0.5
+
+            storage.set_user("bob")
+            storage.import_sessions(session("b", i, 100.0) for i in range(10))
+            assert storage.get_metric_accumulator("wpm").summary()["p90"] == 100.0
+            assert storage.get_metric_accumulator("wpm", all_users=True).stats.count == 40
+
+            storage.set_user("alice")
+            analytics = Analytics.from_aggregates(storage)
+            stats = analytics.get_summary_stats()
+            assert stats["total_sessions"] == 30 and stats["median_wpm"] == summary["p50"]
+            assert "90th percentile" in analytics.format_summary_report()
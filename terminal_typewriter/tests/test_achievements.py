@@ -0,0 +1,21 @@
+import os
+import tempfile
+
+from src.data.storage import StorageManager
+from src.features.achievements import AchievementSystem
+
+
+def test_only_real_difficulties_count_as_completed():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            storage.save_sessions([
+                {"id": "s0", "timestamp": "2024-01-01T00:00:00Z", "mode": None, "wpm": 30.0, "accuracy": 90.0, "duration": 30.0},
+                {"id": "s1", "timestamp": "2024-01-02T00:00:00Z", "mode": "custom", "wpm": 30.0, "accuracy": 90.0, "duration": 30.0},
+                {"id": "s2", "timestamp": "2024-01-03T00:00:00Z", "mode": "beginner", "wpm": 30.0, "accuracy": 90.0, "duration": 30.0},
+            ])
+            assert "unknown" in storage.get_mode_totals()
+            achievements = AchievementSystem(storage, config_dir=tmp)
+
+            stats = achievements._calculate_stats(storage.fetch_recent_sessions(10))
+
+            assert stats["difficulties_completed"] == {"beginner"}
@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+from statistics import mean, median
+
+from src.features.analytics import Analytics
+from src.features.columnar import SessionColumns
+from src.data.storage import StorageManager
+
+
+def _sessions(count):
+    return [
+        {
+            "id": f"s{i}", "timestamp": f"2024-01-01T{i // 3600 % 24:02d}:{i // 60 % 60:02d}:{i % 60:02d}Z",
+            "mode": ("beginner", "intermediate", "expert")[i % 3], "duration": 30.0 + i % 7,
+            "wpm": 30.0 + (i * 37) % 61, "accuracy": 80.0 + (i * 13) % 20, "errors": i % 4, "text": "passage",
+        }
+        for i in range(count)
+    ]
+
+
+def test_columns_match_the_per_metric_computation():
+    sessions = _sessions(50)
+    summary = Analytics(list(reversed(sessions))).get_summary_stats()
+    wpm = [s["wpm"] for s in sessions]
+
+    assert summary["total_sessions"] == 50
+    assert summary["avg_wpm"] == round(mean(wpm), 2)
+    assert summary["median_wpm"] == round(median(wpm), 2)
+    assert summary["best_accuracy"] == max(s["accuracy"] for s in sessions)
+    assert summary["total_errors"] == sum(s["errors"] for s in sessions)
+
+    expert = [s for s in sessions if s["mode"] == "expert"]
+    stats = SessionColumns.from_sessions(sessions, newest_first=False).mode_stats()["expert"]
+    assert stats["count"] == len(expert)
+    assert stats["avg_wpm"] == round(mean(s["wpm"] for s in expert), 2)
+    assert stats["best_wpm"] == max(s["wpm"] for s in expert)
+
+
+def test_trends_compare_the_latest_sessions():
+    sessions = [{"wpm": w, "accuracy": 90.0} for w in (40.0, 41.0, 55.0)]  # newest first
+    trends = Analytics(sessions).get_progress_trends()
+    assert trends["wpm_trend"] == "declining" and trends["wpm_change"] == -15.0
+    assert trends["sessions_analyzed"] == 3
+    assert Analytics([]).get_progress_trends()["trend"] == "insufficient_data"
+
+
+def test_full_history_report_is_fast():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            storage.import_sessions(_sessions(100_000))
+
+            began = time.perf_counter()
+            analytics = Analytics.from_storage(storage)
+            report = analytics.format_summary_report_with_charts()
+            elapsed = time.perf_counter() - began
+
+            assert "Total Sessions: 100000" in report
+            assert analytics.get_difficulty_stats() == storage.get_mode_totals()
+            assert elapsed < 1.0
@@ -0,0 +1,91 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from src.data.storage import StorageManager
+
+
+WRITERS = 6
+READERS = 2
+SESSIONS_PER_WRITER = 40
+
+
+def _session(writer, i):
+    return {
+        "id": f"w{writer}-{i}", "timestamp": f"2024-01-{writer + 1:02d}T00:{i // 60:02d}:{i % 60:02d}Z", "mode": "expert",
+        "duration": 30.0, "wpm": float(writer * 10 + 40), "accuracy": 95.0, "errors": 1, "text": f"passage {i % 5}",
+    }
+
+
+def _writer(db_path, writer, start, latencies):
+    start.wait()
+    with StorageManager(db_path=db_path, busy_timeout_ms=200) as storage:
+        for i in range(SESSIONS_PER_WRITER):
+            began = time.perf_counter()
+            storage.save_session(_session(writer, i))
+            latencies.append(time.perf_counter() - began)
+
+
+def _reader(db_path, start, stop, failures):
+    start.wait()
+    try:
+        with StorageManager(db_path=db_path, busy_timeout_ms=200) as storage:
+            while not stop.is_set():
+                storage.fetch_sessions_page(limit=20)
+                storage.get_totals()
+    except Exception as exc:  # reported back to the test process
+        failures.append(repr(exc))
+
+
+def test_concurrent_writers_lose_no_sessions():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        ctx = multiprocessing.get_context("spawn")
+        with ctx.Manager() as manager:
+            start = manager.Event()
+            stop = manager.Event()
+            latencies = manager.list()
+            failures = manager.list()
+            # Every process also races to create and migrate the fresh database
+            writers = [ctx.Process(target=_writer, args=(db_path, w, start, latencies)) for w in range(WRITERS)]
+            readers = [ctx.Process(target=_reader, args=(db_path, start, stop, failures)) for _ in range(READERS)]
+            for proc in writers + readers:
+                proc.start()
+            start.set()
+            for proc in writers:
+                proc.join(timeout=120)
+            stop.set()
+            for proc in readers:
+                proc.join(timeout=30)
+
+            assert [proc.exitcode for proc in writers + readers] == [0] * (WRITERS + READERS)
+            assert list(failures) == []
+            timings = sorted(latencies)
+
+        assert len(timings) == WRITERS * SESSIONS_PER_WRITER
+        assert timings[int(len(timings) * 0.99) - 1] < 2.0
+
+        with StorageManager(db_path=db_path) as storage:
+            assert storage.count_sessions() == WRITERS * SESSIONS_PER_WRITER
+            totals = storage.get_totals()
+            assert totals["best_wpm"] == (WRITERS - 1) * 10 + 40
+            assert {r["id"] for r in storage.iter_sessions()} == {f"w{w}-{i}" for w in range(WRITERS) for i in range(SESSIONS_PER_WRITER)}
+
+
+def test_save_waits_out_a_lock_held_past_the_busy_timeout():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        with StorageManager(db_path=db_path, busy_timeout_ms=20, write_attempts=20) as storage:
+            blocker = sqlite3.connect(db_path, isolation_level=None, check_same_thread=False)
+            blocker.execute("BEGIN IMMEDIATE")
+            release = threading.Timer(0.3, blocker.commit)
+            release.start()
+            try:
+                storage.save_session(_session(0, 0))
+            finally:
+                release.join()
+                blocker.close()
+            assert storage.count_sessions() == 1
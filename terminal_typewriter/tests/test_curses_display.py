@@ -0,0 +1,68 @@
+import random
+
+from src.core.engine import BACKSPACE, TypingEngine
+from src.ui.curses_display import tail_lines, wrap_words
+
+
+def _legacy_text_lines(text, width):
+    """The target text wrapping the curses display used before per-region windows."""
+    text_lines = []
+    line = []
+    for word in text.split(" "):
+        if sum(len(w) for w in line) + max(0, len(line) - 1) + len(word) + 1 > width:
+            text_lines.append(" ".join(line))
+            line = [word]
+        else:
+            line.append(word)
+    if line:
+        text_lines.append(" ".join(line))
+    return text_lines
+
+
+def _legacy_input_lines(buf, width):
+    """The input echo wrapping the curses display used before per-region windows."""
+    lines = []
+    current = ""
+    for ch in buf:
+        if ch == "\n":
+            lines.append(current)
+            current = ""
+        elif len(current) >= width:
+            lines.append(current)
+            current = ch
+        else:
+            current += ch
+    lines.append(current)
+    return lines
+
+
+def test_wrap_words_matches_the_original_layout():
+    text = "the quick brown fox jumps over the lazy dog"
+
+    assert wrap_words(text, 20) == ["the quick brown fox", "jumps over the lazy", "dog"]
+    rng = random.Random(3)
+    for _ in range(200):
+        text = " ".join("w" * rng.randrange(0, 12) for _ in range(rng.randrange(1, 20)))
+        width = rng.randrange(1, 40)
+        assert wrap_words(text, width) == _legacy_text_lines(text, width)
+
+
+def test_tail_lines_matches_legacy_wrapping():
+    rng = random.Random(7)
+    for _ in range(500):
+        buf = "".join(rng.choice("ab \n") if rng.random() < 0.2 else "x" for _ in range(rng.randrange(0, 60)))
+        width = rng.randrange(1, 12)
+        count = rng.randrange(1, 4)
+        assert tail_lines(buf, width, count) == _legacy_input_lines(buf, width)[-count:], (buf, width, count)
+
+
+def test_tail_lines_from_engine_tail_matches_full_buffer():
+    rng = random.Random(11)
+    engine = TypingEngine("x" * 10)
+    engine.start_test()
+    # ENTER is typed as a space, so newlines only arrive inside pasted chunks
+    for _ in range(3000):
+        engine.process_keystroke(BACKSPACE if rng.random() < 0.1 else rng.choice(["a", "b", " ", "c\nd", "\n"]))
+        width = rng.randrange(1, 30)
+        tail, line_offset = engine.get_buffer_tail(2 * (width + 1))
+        assert tail_lines(tail, width, 2, line_offset) == _legacy_input_lines(engine.get_buffer(), width)[-2:]
@@ -0,0 +1,73 @@
+import io
+
+from src.core.clock import VirtualClock
+from src.core.engine import TypingEngine
+from src.ui.display import DisplayManager
+from src.ui.frame_renderer import AnsiFrameRenderer, display_width
+
+
+class CountingStream(io.StringIO):
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+
+    def write(self, s: str) -> int:
+        self.writes += 1
+        return super().write(s)
+
+
+def test_only_changed_span_is_emitted_in_one_write():
+    stream = CountingStream()
+    clock = VirtualClock()
+    renderer = AnsiFrameRenderer(stream=stream, max_fps=10, clock=clock, columns=80)
+    renderer.render(["WPM: 10", "-----", "Your input: ab|"])
+    first = stream.getvalue()
+    assert first == "WPM: 10\n-----\nYour input: ab|\r"
+
+    clock.advance(0.1)
+    renderer.render(["WPM: 12", "-----", "Your input: abc|"])
+    update = stream.getvalue()[len(first):]
+
+    # Up two rows to the header, patch "2", down two rows, patch "c|"
+    assert update == "\x1b[2A\r\x1b[6C2\x1b[2B\r\x1b[14Cc|\r"
+    assert stream.writes == 2
+
+
+def test_frame_rate_cap_drops_early_frames_unless_forced():
+    stream = CountingStream()
+    clock = VirtualClock()
+    renderer = AnsiFrameRenderer(stream=stream, max_fps=10, clock=clock, columns=80)
+    assert renderer.render(["a"])
+    clock.advance(0.05)
+    assert not renderer.render(["b"])
+    assert renderer.render(["c"], force=True)
+    assert stream.writes == 2
+
+
+def test_wide_characters_and_shrinking_lines():
+    stream = io.StringIO()
+    renderer = AnsiFrameRenderer(stream=stream, max_fps=0, clock=VirtualClock(), columns=80)
+    renderer.render(["⏳ 10 s | abcdef"])
+    mark = len(stream.getvalue())
+    renderer.render(["⏳ 9 s | a"])
+
+    # The emoji is two cells wide, and the shorter line clears its tail
+    assert stream.getvalue()[mark:] == "\r\x1b[3C9 s | a\x1b[K\r"
+
+
+def test_live_input_keeps_newest_keys_and_caret_on_screen():
+    stream = io.StringIO()
+    renderer = AnsiFrameRenderer(stream=stream, max_fps=0, clock=VirtualClock(), columns=80)
+    display = DisplayManager(renderer=renderer)
+    text = "".join(chr(ord("a") + i % 26) for i in range(99)) + "語"
+    engine = TypingEngine(text)
+    engine.start_test()
+    for ch in text:
+        engine.process_keystroke(ch)
+
+    display.render_live(engine, 30)
+
+    input_line = stream.getvalue().rstrip("\r").split("\n")[-1]
+    assert input_line.startswith("Your input: ")
+    assert input_line.endswith(text[-10:] + "|")
+    assert display_width(input_line) in (79, 80)
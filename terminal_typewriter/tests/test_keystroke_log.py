@@ -0,0 +1,73 @@
+from src.core.engine import TypingEngine, BACKSPACE
+from src.core.keystroke_log import KeystrokeLog
+from src.data.keystroke_codec import FORMAT_VERSION, decode_keystrokes, encode_keystrokes, iter_decode
+
+
+def test_log_round_trips_through_serialize():
+    log = KeystrokeLog()
+    log.append(0.0, "h")
+    log.append(0.1234, "é")
+    log.append(0.25, BACKSPACE)
+
+    restored = KeystrokeLog.deserialize(log.serialize())
+
+    assert len(restored) == 3
+    assert list(restored.times_ms) == [0, 123, 250]
+    assert restored.keys() == "hé" + BACKSPACE
+    assert restored[1] == (0.123, "é")
+
+
+def test_deserialize_accepts_legacy_records():
+    legacy = '[{"t": 0.2, "k": "b"}, {"t": 0.1, "k": "a"}]'
+
+    log = KeystrokeLog.deserialize(legacy)
+
+    assert log.to_dicts() == [{"t": 0.1, "k": "a"}, {"t": 0.2, "k": "b"}]
+
+
+def test_engine_exposes_read_only_view():
+    engine = TypingEngine("abc")
+    engine.start_test()
+    for key in "ab":
+        engine.process_keystroke(key)
+
+    view = engine.get_keystrokes()
+
+    assert view.keys() == "ab"
+    assert not hasattr(view, "append")
+
+
+def test_engine_keeps_typing_while_a_view_is_held():
+    engine = TypingEngine("abcd")
+    engine.start_test()
+    engine.process_keystroke("a")
+
+    view = engine.get_keystrokes()
+    times, codes = view.times_ms, view.codes
+    raw = view.iter_raw()
+    for key in "bcd":
+        engine.process_keystroke(key)
+
+    assert list(codes) == [ord("a")]
+    assert len(times) == 1
+    assert view.keys() == "abcd"
+    assert [code for _, code in raw] == [ord(ch) for ch in "abcd"]
+
+
+def test_binary_codec_round_trip_and_streaming():
+    log = KeystrokeLog()
+    for i, ch in enumerate("héllo wörld ✓ " * 20):
+        log.append(i * 0.137, ch)
+
+    for compress in (False, True):
+        payload = encode_keystrokes(log, compress=compress)
+        assert payload[0] == FORMAT_VERSION
+        decoded = decode_keystrokes(payload)
+        assert list(decoded.times_ms) == list(log.times_ms)
+        assert decoded.keys() == log.keys()
+
+        # Feeding the payload a few bytes at a time yields the same records
+        chunks = [payload[i:i + 3] for i in range(0, len(payload), 3)]
+        assert list(iter_decode(chunks)) == list(zip(log.times_ms, log.codes))
+
+    assert len(encode_keystrokes(log)) < len(log.serialize()) / 4
@@ -0,0 +1,116 @@
+import os
+import sqlite3
+import tempfile
+
+from src.core.keystroke_log import KeystrokeLog
+from src.core.keystroke_timing import KIND_BIGRAM, KIND_KEY, analyze_session, histogram_quantile
+from src.data import transfer
+from src.data.migrations import MigrationContext, MigrationRunner, rebuild_keystroke_timing, schedule_backfill
+from src.data.retention import LOCATION_DROPPED, RetentionManager
+from src.data.storage import StorageManager
+
+
+def _log(events):
+    log = KeystrokeLog()
+    for ms, key in events:
+        log.append(ms / 1000.0, key)
+    return log
+
+
+def test_latencies_are_charged_to_expected_keys_and_bigrams():
+    # "abc": 'b' is mistyped as 'x', corrected, then typed after a pause
+    events = [(0, "a"), (100, "x"), (150, "\x7f"), (400, "b"), (500, "c")]
+    profile = analyze_session("abc", _log(events).iter_raw())
+
+    b = profile.stat(KIND_KEY, "b")
+    assert (b.attempts, b.errors, b.samples) == (2, 1, 0)  # typed after a correction: not timed
+    c = profile.stat(KIND_KEY, "c")
+    assert (c.samples, c.mean_ms) == (1, 100.0)
+    ab = profile.stat(KIND_BIGRAM, "ab")
+    assert (ab.attempts, ab.errors, ab.samples) == (1, 1, 0)
+    assert profile.stat(KIND_BIGRAM, "bc").total_ms == 100
+    assert profile.stat(KIND_KEY, "a").samples == 0  # first keystroke has no interval
+
+
+def test_histogram_quantile_interpolates_within_buckets():
+    assert histogram_quantile({4: 10}, 0.5) == 112.5
+    assert histogram_quantile({}, 0.9) == 0.0
+
+
+def _session(i, slow_pair):
+    text = "the cat sat on the mat"
+    events, t = [], 0
+    for pos, ch in enumerate(text):
+        t += 400 if text[pos - 1:pos + 1] == slow_pair else 120
+        events.append((t, ch))
+    return {"id": f"s{i}", "timestamp": f"2024-01-01T00:00:{i:02d}Z", "mode": "expert", "wpm": 50.0, "text": text, "keystrokes": _log(events)}
+
+
+def test_slowest_bigrams_are_kept_incrementally():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        with StorageManager(db_path=db_path) as storage:
+            for i in range(6):
+                storage.save_session(_session(i, "at"))
+            slowest = storage.get_keystroke_timing(kind=KIND_BIGRAM, limit=3)
+            assert slowest[0].item == "at" and slowest[0].samples == 18
+            assert slowest[0].mean_ms == 400.0 and 375 <= slowest[0].p90_ms <= 425
+            assert sum(storage.get_interval_histogram().histogram.values()) == 6 * 21
+
+            # Re-importing the same sessions with --replace must not double count
+            path = os.path.join(tmp, "sessions.ndjson")
+            transfer.export_sessions(storage, path)
+            assert transfer.import_sessions(storage, path, replace=True) == 6
+            assert transfer.import_sessions(storage, path) == 0
+            assert storage.get_keystroke_timing(kind=KIND_BIGRAM, limit=1)[0].samples == 18
+
+            conn = sqlite3.connect(db_path)
+            incremental = sorted(conn.execute("SELECT * FROM keystroke_timing"))
+            rebuild_keystroke_timing(conn)
+            assert sorted(conn.execute("SELECT * FROM keystroke_timing")) == incremental
+            conn.close()
+
+
+def test_import_counts_repeated_ids_once_and_replaces_archived_timing():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            sessions = [_session(i, "at") for i in range(3)]
+            assert storage.import_sessions(sessions + sessions[:1], batch_size=10) == 3
+            assert storage.get_keystroke_timing(kind=KIND_BIGRAM, limit=1)[0].samples == 9
+
+            # Payloads retired to the archive are still taken back on replace
+            assert RetentionManager(storage).expire(30) == 3
+            assert storage.import_sessions(sessions, replace=True) == 3
+            assert storage.get_keystroke_timing(kind=KIND_BIGRAM, limit=1)[0].samples == 9
+
+
+def test_replacing_a_session_with_dropped_keystrokes_does_not_double_count():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            sessions = [_session(i, "at") for i in range(3)]
+            storage.save_sessions(sessions)
+            assert RetentionManager(storage).expire(30, policy=LOCATION_DROPPED) == 3
+
+            assert storage.import_sessions(sessions, replace=True) == 3
+            assert storage.get_keystroke_timing(kind=KIND_BIGRAM, limit=1)[0].samples == 9
+
+
+def test_migration_backfills_timing_in_committed_batches():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            storage.save_sessions([_session(i, "at") for i in range(3)])
+            with storage._connect() as conn:
+                incremental = sorted(conn.execute("SELECT * FROM keystroke_timing"))
+                conn.execute("DELETE FROM keystroke_timing")
+                conn.execute("DELETE FROM keystroke_latency_buckets")
+                schedule_backfill(conn, "keystroke_timing")
+                conn.execute("PRAGMA user_version = 18")
+                conn.commit()
+
+                progress = []
+                context = MigrationContext(batch_size=2, progress=lambda msg, done, total: progress.append((msg, done, total)))
+                MigrationRunner(conn, context=context).run()
+
+                assert progress == [("Backfilling keystroke timing", 2, 3), ("Backfilling keystroke timing", 3, 3)]
+                assert sorted(conn.execute("SELECT * FROM keystroke_timing")) == incremental
+                assert conn.execute("SELECT COUNT(1) FROM backfills").fetchone() == (0,)
@@ -0,0 +1,80 @@
+import os
+import tempfile
+from itertools import islice
+
+from src.core.clock import VirtualClock
+from src.core.keystroke_log import KeystrokeLog
+from src.data.storage import StorageManager
+from src.features.replay import ReplaySystem
+
+
+class ChunkCountingStorage(StorageManager):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.chunks_read = 0
+
+    def iter_keystroke_chunks(self, session_id, chunk_size=1024):
+        for chunk in super().iter_keystroke_chunks(session_id, chunk_size):
+            self.chunks_read += 1
+            yield chunk
+
+
+def _save_long_session(storage, count=20000):
+    keystrokes = KeystrokeLog()
+    for i in range(count):
+        keystrokes.append(i * 0.037, "abcdéfgh "[i % 9])
+    storage.save_session({
+        "id": "long",
+        "timestamp": "2024-01-01T00:00:00Z",
+        "mode": "expert",
+        "duration": 60.0,
+        "wpm": 55.0,
+        "accuracy": 97.0,
+        "errors": 2,
+        "keystrokes": keystrokes,
+        "text": "abcdéfgh",
+    })
+    return keystrokes
+
+
+def test_summary_fields_do_not_load_keystrokes():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            keystrokes = _save_long_session(storage, count=500)
+            session = storage.fetch_session_by_id("long")
+
+            assert session["wpm"] == 55.0
+            assert session.get("text") == "abcdéfgh"
+            assert not session.keystroke_stream.loaded
+            assert "keystrokes" in session
+
+            assert session["keystrokes"].to_dicts() == keystrokes.to_dicts()
+            assert session.keystroke_stream.loaded
+
+
+def test_streamed_keystrokes_match_and_read_only_what_is_consumed():
+    with tempfile.TemporaryDirectory() as tmp:
+        for compress in (False, True):
+            db_path = os.path.join(tmp, f"typewriter-{compress}.db")
+            with ChunkCountingStorage(db_path=db_path, compress_keystrokes=compress) as storage:
+                keystrokes = _save_long_session(storage)
+                stream = storage.fetch_latest_session_with_keystrokes().keystroke_stream
+
+                assert list(islice(stream.iter_raw(), 10)) == list(islice(keystrokes.iter_raw(), 10))
+                assert storage.chunks_read == 1
+
+                assert list(stream.iter_raw()) == list(keystrokes.iter_raw())
+                assert not stream.loaded
+
+
+def test_replay_plays_back_lazily_read_keystrokes():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            keystrokes = _save_long_session(storage, count=300)
+            session = storage.fetch_session_by_id("long")
+
+            replayer = ReplaySystem(session["text"], session.keystroke_stream, clock=VirtualClock())
+            replayer.run(speed=4.0)
+
+            assert replayer.engine.get_buffer() == keystrokes.keys()
+            assert not session.keystroke_stream.loaded
@@ -0,0 +1,181 @@
+import json
+import os
+import sqlite3
+import tempfile
+
+from src.data.migrations import (
+    MIGRATIONS,
+    MigrationContext,
+    MigrationRunner,
+    add_to_metric_accumulators,
+    convert_keystrokes_to_binary,
+    rebuild_metric_accumulators,
+    run_backfill,
+    schedule_backfill,
+)
+from src.data.models import SessionFilter
+from src.data.storage import StorageManager
+
+
+LATEST = MIGRATIONS[-1].version
+
+
+def _legacy_db(path, rows):
+    """A pre-versioning database: no 'text' column, JSON keystrokes, user_version 0."""
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE sessions (id TEXT PRIMARY KEY, timestamp TEXT, mode TEXT, duration REAL, "
+        "text_length INTEGER, wpm REAL, accuracy REAL, errors INTEGER, keystrokes_data TEXT)"
+    )
+    conn.executemany(
+        "INSERT INTO sessions (id, timestamp, mode, duration, wpm, accuracy, errors, keystrokes_data) VALUES (?, ?, 'beginner', 30, ?, 90, 1, ?)",
+        [(f"s{i}", f"2024-01-01T00:00:{i:02d}Z", 20.0 + i, json.dumps([{"t": 0.5, "k": "x"}])) for i in range(rows)],
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_fresh_database_is_created_at_latest_version():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            with storage._connect() as conn:
+                runner = MigrationRunner(conn)
+                assert runner.current_version() == LATEST
+                assert runner.pending() == []
+                assert runner.run() == 0
+
+
+def test_legacy_database_is_upgraded_once_with_progress():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        _legacy_db(db_path, rows=7)
+
+        progress = []
+        with StorageManager(db_path=db_path, migration_progress=lambda msg, done, total: progress.append((done, total))) as storage:
+            assert progress[-1] == (7, 7)
+            assert storage.get_totals()["total_sessions"] == 7
+            assert storage.get_metric_accumulator("wpm").stats.count == 7
+            fetched = storage.fetch_session_by_id("s3")
+            assert fetched["text"] is None
+            assert fetched["keystrokes"].to_dicts() == [{"t": 0.5, "k": "x"}]
+            with storage._connect() as conn:
+                assert MigrationRunner(conn).current_version() == LATEST
+                kinds = {kind for (kind,) in conn.execute("SELECT typeof(keystrokes_data) FROM sessions")}
+            assert kinds == {"blob"}
+
+        # Reopening a current database applies nothing
+        progress.clear()
+        StorageManager(db_path=db_path, migration_progress=lambda *args: progress.append(args)).close()
+        assert progress == []
+
+
+def test_keystroke_backfill_runs_in_bounded_batches():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            with storage._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO sessions (id, timestamp, keystrokes_data, user_id) VALUES (?, ?, ?, ?)",
+                    [(f"s{i}", f"2024-01-01T00:00:{i:02d}Z", json.dumps([{"t": 0.5, "k": "x"}]), storage.user_id) for i in range(7)],
+                )
+                conn.commit()
+
+                progress = []
+                converted = convert_keystrokes_to_binary(conn, batch_size=3, progress=lambda msg, done, total: progress.append((done, total)))
+
+            assert converted == 7
+            assert progress == [(3, 7), (6, 7), (7, 7)]
+            assert storage.fetch_session_by_id("s6")["keystrokes"].keys() == "x"
+
+
+def test_corrupt_legacy_keystrokes_are_cleared_not_fatal():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        _legacy_db(db_path, rows=2)
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE sessions SET keystrokes_data = ? WHERE id = 's1'", ('[{"t": 0.5, "k"',))
+        conn.commit()
+        conn.close()
+
+        progress = []
+        with StorageManager(db_path=db_path, migration_progress=lambda msg, done, total: progress.append((msg, done, total))) as storage:
+            assert ("Cleared unreadable keystroke logs", 1, 1) in progress
+            assert storage.get_totals()["total_sessions"] == 2
+            assert storage.fetch_session_by_id("s0")["keystrokes"].keys() == "x"
+            assert storage.load_keystrokes("s1").keys() == ""
+
+
+def test_inline_texts_move_to_content_addressed_store():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        _legacy_db(db_path, rows=9)
+        passages = ["the quick brown fox", "jumps over the lazy dog", "héllo wörld"]
+        conn = sqlite3.connect(db_path)
+        conn.execute("ALTER TABLE sessions ADD COLUMN text TEXT")
+        conn.executemany("UPDATE sessions SET text = ? WHERE id = ?", [(passages[i % 3], f"s{i}") for i in range(9)])
+        conn.commit()
+        conn.close()
+
+        with StorageManager(db_path=db_path) as storage:
+            with storage._connect() as conn:
+                (stored,) = conn.execute("SELECT COUNT(1) FROM texts").fetchone()
+                (inline,) = conn.execute("SELECT COUNT(1) FROM sessions WHERE text IS NOT NULL").fetchone()
+            assert stored == 3 and inline == 0
+
+            fox = storage.fetch_session_by_id("s3")
+            assert fox["text"] == passages[0]
+            page = storage.fetch_sessions_page(limit=10, filters=SessionFilter(text_hash=fox["text_hash"]))
+            assert [r["id"] for r in page.rows] == ["s6", "s3", "s0"]
+            assert storage.get_passage_totals(fox["text_hash"])["best_wpm"] == 26.0
+
+            # New sessions on a known passage reuse the stored copy
+            storage.save_session({"id": "new", "timestamp": "2024-02-01T00:00:00Z", "wpm": 50.0, "text": passages[0]})
+            with storage._connect() as conn:
+                assert conn.execute("SELECT COUNT(1) FROM texts").fetchone() == (3,)
+            assert storage.get_passage_totals(fox["text_hash"])["count"] == 4
+
+
+def _accumulator_states(conn):
+    return conn.execute("SELECT user_id, metric, state FROM metric_accumulators ORDER BY user_id, metric").fetchall()
+
+
+def test_interrupted_accumulator_backfill_resumes_without_double_counting():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            with storage._connect() as conn:
+                conn.executemany(
+                    "INSERT INTO sessions (id, timestamp, wpm, accuracy, user_id) VALUES (?, ?, ?, 90, ?)",
+                    [(f"s{i}", f"2024-01-01T00:00:{i:02d}Z", 20.0 + i, storage.user_id) for i in range(7)],
+                )
+                rebuild_metric_accumulators(conn)
+                expected = _accumulator_states(conn)
+                conn.execute("DELETE FROM metric_accumulators")
+                schedule_backfill(conn, "metric_accumulators")
+                conn.commit()
+
+                def interrupt_after_first_batch(rows):
+                    if calls:
+                        raise KeyboardInterrupt
+                    calls.append(rows)
+                    add_to_metric_accumulators(conn, [row[1:] for row in rows])
+
+                calls = []
+                ctx = MigrationContext(batch_size=3)
+                select = "SELECT rowid, user_id, wpm, accuracy FROM sessions WHERE rowid > ? ORDER BY rowid LIMIT ?"
+                try:
+                    run_backfill(conn, ctx, "metric_accumulators", "Backfilling", select, interrupt_after_first_batch)
+                except KeyboardInterrupt:
+                    conn.rollback()
+                assert conn.execute("SELECT last_rowid FROM backfills").fetchone() == (calls[0][-1][0],)
+
+                progress = []
+                ctx.progress = lambda msg, done, total: progress.append((done, total))
+                processed = run_backfill(
+                    conn, ctx, "metric_accumulators", "Backfilling", select, lambda rows: add_to_metric_accumulators(conn, [row[1:] for row in rows])
+                )
+
+                assert processed == 4
+                assert progress == [(3, 4), (4, 4)]
+                assert _accumulator_states(conn) == expected
+                assert conn.execute("SELECT COUNT(1) FROM backfills").fetchone() == (0,)
+                # Once finished it is not run again
+                assert run_backfill(conn, ctx, "metric_accumulators", "Backfilling", select, interrupt_after_first_batch) == 0
@@ -0,0 +1,56 @@
+import os
+import tempfile
+
+from src.data.storage import StorageManager
+from src.features.report_cache import ReportCache
+
+
+def _session(i):
+    return {"id": f"s{i}", "timestamp": f"2024-01-01T00:00:{i:02d}Z", "mode": "expert", "wpm": 40.0 + i, "accuracy": 95.0}
+
+
+def test_reports_are_reused_until_sessions_change():
+    builds = []
+
+    def build():
+        builds.append(1)
+        return f"report {len(builds)}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        with StorageManager(db_path=db_path, user_name="alice") as storage:
+            storage.save_session(_session(0))
+            cache = ReportCache(storage)
+            assert cache.get_or_build("summary", build) == "report 1"
+            assert cache.get_or_build("summary", build) == "report 1"
+
+            # Survives a restart
+            assert ReportCache(storage).get_or_build("summary", build) == "report 1"
+            assert len(builds) == 1
+
+            storage.save_session(_session(1))
+            assert cache.get_or_build("summary", build) == "report 2"
+
+            # A write from another process invalidates too
+            with StorageManager(db_path=db_path, user_name="alice") as other:
+                other.save_session(_session(2))
+            assert cache.get_or_build("summary", build) == "report 3"
+
+            # Entries are per user
+            storage.set_user("bob")
+            assert cache.get_or_build("summary", build) == "report 4"
+            storage.set_user("alice")
+            assert cache.get_or_build("summary", build) == "report 3"
+            assert (cache.hits, cache.misses) == (2, 4)
+
+
+def test_recreated_database_does_not_reuse_old_reports():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        with StorageManager(db_path=db_path) as storage:
+            ReportCache(storage).get_or_build("summary", lambda: "old")
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(db_path + suffix):
+                os.remove(db_path + suffix)
+        with StorageManager(db_path=db_path) as storage:
+            assert ReportCache(storage).get_or_build("summary", lambda: "new") == "new"
@@ -0,0 +1,137 @@
+import os
+import random
+import sqlite3
+import tempfile
+from datetime import datetime
+
+from src.core.keystroke_log import KeystrokeLog
+from src.data.migrations import MIGRATIONS, STARTUP_VACUUM_MAX_PAGES, MigrationContext
+from src.data.retention import LOCATION_DROPPED, RetentionManager
+from src.data.storage import StorageManager
+
+
+NOW = datetime(2024, 6, 1)
+
+
+def _keystrokes(seed, count=4000):
+    rng = random.Random(seed)
+    log = KeystrokeLog()
+    t = 0.0
+    for _ in range(count):
+        t += rng.uniform(0.01, 0.5)
+        log.append(t, chr(rng.randint(33, 0x2FF)))
+    return log
+
+
+def _fill(storage, old=30, new=10):
+    # Old sessions are from 2022, new ones from May 2024
+    sessions = [
+        {"id": f"old{i}", "timestamp": f"2022-03-{i % 28 + 1:02d}T00:00:00Z", "mode": "expert", "wpm": 40.0, "keystrokes": _keystrokes(i)}
+        for i in range(old)
+    ] + [
+        {"id": f"new{i}", "timestamp": f"2024-05-{i % 28 + 1:02d}T00:00:00Z", "mode": "expert", "wpm": 60.0, "keystrokes": _keystrokes(1000 + i)}
+        for i in range(new)
+    ]
+    storage.save_sessions(sessions)
+    return sessions
+
+
+def test_archive_moves_old_keystrokes_and_keeps_summaries():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db"), compress_keystrokes=False) as storage:
+            sessions = _fill(storage)
+            retention = RetentionManager(storage, batch_size=8)
+
+            assert retention.expire(365, now=NOW) == 30
+            assert retention.expire(365, now=NOW) == 0
+            assert storage.get_totals()["total_sessions"] == 40
+
+            report = {y["year"]: y for y in retention.space_report()["years"]}
+            assert report["2022"]["keystroke_sessions"] == 0 and report["2022"]["archived"] == 30
+            assert report["2024"]["keystroke_sessions"] == 10
+            assert os.path.exists(storage.archive_path)
+
+            # Archived keystrokes are still replayable, read back from the archive
+            archived = storage.fetch_session_by_id("old3")
+            assert archived["wpm"] == 40.0
+            assert list(archived.keystroke_stream.iter_raw()) == list(sessions[3]["keystrokes"].iter_raw())
+            assert storage.fetch_session_by_id("new2")["keystrokes"].to_dicts() == sessions[32]["keystrokes"].to_dicts()
+
+
+def test_dropped_space_is_reclaimed_in_bounded_steps():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        with StorageManager(db_path=db_path, compress_keystrokes=False) as storage:
+            _fill(storage)
+            retention = RetentionManager(storage, vacuum_step_pages=10)
+            retention.expire(365, policy=LOCATION_DROPPED, now=NOW)
+            assert len(storage.fetch_session_by_id("old0")["keystrokes"]) == 0
+            assert not os.path.exists(storage.archive_path)
+
+            free = retention.free_pages()
+            size_before = retention.space_report()["db_bytes"]
+            assert free > 20
+
+            assert retention.vacuum_step() == free - 10
+            assert retention.reclaim(max_steps=1) == 10
+            retention.reclaim()
+            assert retention.free_pages() == 0
+            assert retention.space_report()["db_bytes"] < size_before
+            assert storage.count_sessions() == 40
+
+
+def test_maintenance_step_handles_one_batch():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            _fill(storage, old=12, new=0)
+            retention = RetentionManager(storage, batch_size=5)
+            retention.maintenance_step(30)
+            report = retention.space_report()["years"]
+            assert report[0]["archived"] == 5
+
+
+def test_expiry_skips_retired_rows_through_the_partial_index():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        with StorageManager(db_path=db_path) as storage:
+            _fill(storage, old=5, new=0)
+            conn = sqlite3.connect(db_path)
+            conn.executemany(
+                "INSERT INTO sessions (id, timestamp, keystrokes_location, user_id) VALUES (?, '2021-01-01T00:00:00Z', 'dropped', ?)",
+                [(f"retired{i}", storage.user_id) for i in range(1000)],
+            )
+            conn.commit()
+            plan = conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM sessions WHERE timestamp < ? AND keystrokes_data IS NOT NULL ORDER BY timestamp LIMIT 1",
+                ("2024",),
+            ).fetchall()
+            conn.close()
+            assert "idx_sessions_inline_keystrokes" in plan[0][-1]
+
+            assert RetentionManager(storage, batch_size=3).expire(365, policy=LOCATION_DROPPED, now=NOW) == 5
+
+
+def test_large_database_is_only_rewritten_for_incremental_vacuum_on_request():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE filler (data BLOB)")
+        conn.executemany("INSERT INTO filler VALUES (randomblob(4000))", [()] * (STARTUP_VACUUM_MAX_PAGES + 10))
+        conn.commit()
+        auto_vacuum = next(m for m in MIGRATIONS if m.version == 9)
+        auto_vacuum.apply(conn, MigrationContext())
+        assert conn.execute("PRAGMA auto_vacuum").fetchone() == (0,)
+        conn.execute("DROP TABLE filler")
+        conn.commit()
+        conn.close()
+
+        with StorageManager(db_path=db_path) as storage:
+            retention = RetentionManager(storage)
+            assert not retention.incremental_vacuum_enabled()
+            # Menu upkeep never starts the full rewrite
+            retention.maintenance_step(None)
+            assert not retention.incremental_vacuum_enabled()
+
+            assert retention.enable_incremental_vacuum()
+            assert retention.incremental_vacuum_enabled()
+            assert not retention.enable_incremental_vacuum()
@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import date, timedelta
+
+from src.core.rollups import bucket_bounds, bucket_range, session_bucket
+from src.data.migrations import MigrationContext, MigrationRunner, add_to_rollups, rebuild_rollups, schedule_backfill
+from src.data.storage import StorageManager
+from src.features.analytics import format_rollup_report, rollup_trend
+from src.utils.charts import ASCIIChart
+
+
+def test_bucket_keys_sort_and_span_calendar_boundaries():
+    assert session_bucket("2024-12-30T10:00:00Z", "week") == "2025-W01"
+    assert session_bucket("2024-02-29T10:00:00Z", "month") == "2024-02"
+    assert session_bucket(None, "day") is None
+    assert bucket_range("2024-W52", "2025-W02", "week") == ["2024-W52", "2025-W01", "2025-W02"]
+    assert bucket_range("2024-11", "2025-02", "month") == ["2024-11", "2024-12", "2025-01", "2025-02"]
+    assert bucket_bounds("2024-01-01", "2024-02-01", "month") == ("2024-01", "2024-01")
+
+
+def _year_of_sessions(per_day=3):
+    start = date(2024, 1, 1)
+    sessions = []
+    for d in range(366):
+        if d % 7 == 6:
+            continue  # a rest day each week leaves gaps in the daily series
+        day = start + timedelta(days=d)
+        for k in range(per_day):
+            sessions.append({
+                "id": f"{day}-{k}", "timestamp": f"{day}T0{k}:00:00Z", "mode": "expert",
+                "wpm": 30.0 + d / 10 + k, "accuracy": 90.0 + k,
+            })
+    return sessions
+
+
+def test_rollups_are_maintained_per_bucket():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        with StorageManager(db_path=db_path) as storage:
+            storage.save_sessions(_year_of_sessions()[:30])
+            days = storage.get_rollups("day")
+            assert days[0] == {"bucket": "2024-01-01", "count": 3, "avg_wpm": 31.0, "best_wpm": 32.0, "p50_wpm": 31.0, "avg_accuracy": 91.0, "best_accuracy": 92.0}
+            assert days[6]["bucket"] == "2024-01-07" and days[6]["count"] == 0
+            assert [r["count"] for r in storage.get_rollups("week", since="2024-01-08", until="2024-01-15")] == [12]
+            assert len(storage.get_rollups("day", fill_gaps=False)) == 10
+
+            conn = sqlite3.connect(db_path)
+            incremental = sorted(conn.execute("SELECT user_id, period, bucket, session_count, sum_wpm, max_wpm FROM session_rollups"))
+            rebuild_rollups(conn)
+            assert sorted(conn.execute("SELECT user_id, period, bucket, session_count, sum_wpm, max_wpm FROM session_rollups")) == incremental
+            conn.close()
+
+
+def test_migration_resumes_a_partly_done_rollup_backfill():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            storage.save_sessions(_year_of_sessions()[:30])
+            with storage._connect() as conn:
+                expected = sorted(conn.execute("SELECT * FROM session_rollups"))
+                conn.execute("DELETE FROM session_rollups")
+                # An earlier run committed the first ten sessions before stopping
+                done = conn.execute("SELECT rowid, user_id, timestamp, wpm, accuracy FROM sessions ORDER BY rowid LIMIT 10").fetchall()
+                add_to_rollups(conn, [row[1:] for row in done])
+                schedule_backfill(conn, "session_rollups")
+                conn.execute("UPDATE backfills SET last_rowid = ?", (done[-1][0],))
+                conn.execute("PRAGMA user_version = 19")
+                conn.commit()
+
+                progress = []
+                context = MigrationContext(batch_size=8, progress=lambda msg, done, total: progress.append((done, total)))
+                assert MigrationRunner(conn, context=context).run() == 1
+
+                assert progress == [(8, 20), (16, 20), (20, 20)]
+                assert sorted(conn.execute("SELECT * FROM session_rollups")) == expected
+
+
+def test_a_year_charts_quickly():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            storage.import_sessions(_year_of_sessions(per_day=20))
+
+            began = time.perf_counter()
+            rollups = storage.get_rollups("day", since="2024-01-01", until="2025-01-01")
+            report = format_rollup_report(rollups, "day")
+            elapsed = time.perf_counter() - began
+
+            assert len(rollups) == 366
+            assert sum(r["count"] for r in rollups) == 314 * 20
+            assert "DAILY TRENDS" in report and "improving" in report
+            assert elapsed < 0.5
+
+            chart = ASCIIChart().generate_rollup_chart(rollups)
+            axis = next(line for line in chart.splitlines() if "└" in line)
+            assert axis.count("─") == 53  # 366 days merged seven at a time
+            assert rollup_trend(storage.get_rollups("month"))["periods_analyzed"] == 12
@@ -0,0 +1,35 @@
+import os
+import threading
+
+from src.core.clock import VirtualClock
+from src.core.engine import TypingEngine
+from src.core.timer import CountdownTimer
+from src.ui.input_handler import InputHandler
+from src.ui.session_loop import SessionLoop
+
+
+def test_loop_drains_burst_input_without_drops():
+    text = "the quick brown fox jumps over the lazy dog " * 2000
+    read_fd, write_fd = os.pipe()
+    burst = text.encode("utf-8")
+    assert len(burst) > 65536
+
+    # Larger than a pipe buffer, so the writer blocks until the loop drains it.
+    # Virtual time only moves while the loop sleeps after EOF, so the session
+    # cannot expire before the whole burst has been read.
+    writer = threading.Thread(target=lambda: (os.write(write_fd, burst), os.close(write_fd)))
+    engine = TypingEngine(text, clock=VirtualClock())
+    engine.start_test()
+    timer = CountdownTimer(duration_seconds=1.0, clock=engine.clock)
+    with os.fdopen(read_fd, "r") as stream, InputHandler(stream) as source:
+        loop = SessionLoop(engine, timer, source, render=lambda: None, render_interval=0.05)
+        timer.start()
+        writer.start()
+        loop.run()
+        writer.join()
+
+    assert engine.get_buffer() == text
+    assert engine.get_current_stats().accuracy == 100.0
+    assert timer.expired
+    # Rendering is throttled independently of how many keys arrived
+    assert loop.frames <= 1.0 / 0.05 + 2
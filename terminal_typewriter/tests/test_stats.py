@@ -1,3 +1,5 @@
+from src.core.clock import VirtualClock
+from src.core.engine import TypingEngine
 from src.core.stats import StatsTracker
 from src.data.models import RealtimeStats
 
@@ -29,4 +31,40 @@ def test_accuracy_with_errors():
     tracker.update_from_input("abcxyz")
 
     # 6 typed, 3 correct => 50% accuracy
-    assert tracker.stats.accuracy == 50.0
\ No newline at end of file
+    assert tracker.stats.accuracy == 50.0
+
+def test_incremental_scoring_matches_rescan():
+    text = "the quick brown fox"
+    incremental = StatsTracker(target_text=text, stats=RealtimeStats())
+    rescan = StatsTracker(target_text=text, stats=RealtimeStats())
+    incremental.start()
+    rescan.start()
+
+    buffer = ""
+    for step in ["the", " quack", "\b\b\b", "ick", " brown", " fix"]:
+        if step.startswith("\b"):
+            incremental.apply_delete(len(step))
+            buffer = buffer[: -len(step)]
+        else:
+            incremental.apply_append(step)
+            buffer += step
+        rescan.update_from_input(buffer)
+        assert incremental.stats.characters_typed == rescan.stats.characters_typed
+        assert incremental.stats.correct_characters == rescan.stats.correct_characters
+        assert incremental.stats.errors == rescan.stats.errors
+        assert incremental.stats.accuracy == rescan.stats.accuracy
+
+
+def test_virtual_clock_gives_exact_wpm():
+    clock = VirtualClock()
+    engine = TypingEngine("hello world", clock=clock)
+    engine.start_test()
+    for key in "hello world":
+        clock.advance(0.25)
+        engine.process_keystroke(key)
+
+    stats = engine.get_current_stats()
+    # 11 keys, 0.25s apart => 2.75s; 2.2 words / (2.75 / 60) min => 48 WPM
+    assert stats.elapsed_seconds == 2.75
+    assert stats.wpm == 48.0
+    assert list(engine.get_keystrokes().times_ms)[:3] == [250, 500, 750]
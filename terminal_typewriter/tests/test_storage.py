@@ -1,6 +1,8 @@
 import os
 import tempfile
 
+from src.core.keystroke_log import KeystrokeView
+from src.data.models import SessionFilter
 from src.data.storage import StorageManager
 
 
@@ -27,4 +29,128 @@ def test_storage_save_and_fetch_latest():
         assert fetched is not None
         assert fetched["id"] == session["id"]
         assert fetched["text"] == session["text"]
-        assert isinstance(fetched["keystrokes"], list)
\ No newline at end of file
+        assert isinstance(fetched["keystrokes"], KeystrokeView)
+        assert fetched["keystrokes"].to_dicts() == session["keystrokes"]
+
+def test_storage_reuses_one_wal_connection():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            with storage._connect() as first:
+                (mode,) = first.execute("PRAGMA journal_mode").fetchone()
+                (sync,) = first.execute("PRAGMA synchronous").fetchone()
+            storage.fetch_recent_sessions(limit=5)
+            with storage._connect() as second:
+                assert second is first
+            assert mode == "wal"
+            assert sync == 1  # NORMAL
+
+
+def test_switching_to_an_existing_user_does_not_take_the_write_lock():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            default_id = storage.user_id
+            storage.set_user("alice")
+            alice_id = storage.user_id
+            assert alice_id != default_id
+            assert storage.get_revision() != 0
+
+            statements = []
+            with storage._connect() as conn:
+                conn.set_trace_callback(statements.append)
+            storage.set_user("alice")
+            with storage._connect() as conn:
+                conn.set_trace_callback(None)
+            assert storage.user_id == alice_id
+            assert statements == ["SELECT id FROM users WHERE name = 'alice'"]
+
+
+def _executed_plan(storage, call):
+    """Query plan of the SELECTs call() actually runs on the storage connection."""
+    statements = []
+    with storage._connect() as conn:
+        conn.set_trace_callback(statements.append)
+    try:
+        call()
+    finally:
+        with storage._connect() as conn:
+            conn.set_trace_callback(None)
+    selects = [sql for sql in statements if sql.lstrip().upper().startswith("SELECT")]
+    assert selects
+    with storage._connect() as conn:
+        return " ".join(row[-1] for sql in selects for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+
+
+def test_history_queries_use_timestamp_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            recent = _executed_plan(storage, lambda: storage.fetch_recent_sessions(100))
+            by_mode = _executed_plan(storage, lambda: storage.fetch_recent_sessions(100, mode="expert"))
+            latest = _executed_plan(storage, storage.fetch_latest_session_with_keystrokes)
+
+            # Summary columns are in the per-user indexes, so history pages never touch the table
+            assert "COVERING INDEX idx_sessions_user_timestamp" in recent and "TEMP B-TREE" not in recent
+            assert "COVERING INDEX idx_sessions_user_mode_timestamp" in by_mode and "TEMP B-TREE" not in by_mode
+            assert "idx_sessions_user_timestamp" in latest
+
+
+def test_aggregates_cover_whole_history():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        with StorageManager(db_path=db_path) as storage:
+            for i, (mode, wpm, acc) in enumerate([("beginner", 30.0, 90.0), ("beginner", 50.0, 80.0), ("expert", 20.0, 99.0)]):
+                storage.save_session({
+                    "id": f"s{i}", "timestamp": f"2024-01-0{i + 1}T00:00:00Z", "mode": mode,
+                    "duration": 60.0, "wpm": wpm, "accuracy": acc, "errors": i,
+                })
+            totals = storage.get_totals()
+            modes = storage.get_mode_totals()
+
+            assert totals["total_sessions"] == 3
+            assert totals["total_time"] == 180.0
+            assert totals["total_errors"] == 3
+            assert totals["best_wpm"] == 50.0
+            assert totals["avg_wpm"] == 33.33
+            assert totals["best_accuracy"] == 99.0
+            assert modes["beginner"]["count"] == 2
+            assert modes["beginner"]["avg_wpm"] == 40.0
+            assert modes["expert"]["best_accuracy"] == 99.0
+
+            # A rebuild from the sessions table reproduces the same values
+            storage.rebuild_aggregates()
+            assert storage.get_totals() == totals
+            assert storage.get_mode_totals() == modes
+
+
+def test_keyset_pages_cover_history_in_order_with_filters():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            # Pairs of sessions share a timestamp, so paging must tie-break on id
+            storage.save_sessions([
+                {
+                    "id": f"s{i:03d}", "timestamp": f"2024-01-{i // 2 + 1:02d}T00:00:00Z",
+                    "mode": "expert" if i % 3 == 0 else "beginner", "duration": 30.0, "wpm": float(i), "accuracy": 90.0, "errors": 0,
+                }
+                for i in range(50)
+            ])
+
+            seen, cursor = [], None
+            while True:
+                page = storage.fetch_sessions_page(limit=7, after=cursor)
+                assert len(page.rows) <= 7
+                seen += [r["id"] for r in page.rows]
+                if not page.has_more:
+                    break
+                cursor = page.next_cursor
+            assert seen == [f"s{i:03d}" for i in reversed(range(50))]
+
+            filters = SessionFilter(mode="expert", since="2024-01-05", until="2024-01-20", min_wpm=10, max_wpm=30)
+            first = storage.fetch_sessions_page(limit=2, filters=filters)
+            rest = storage.fetch_sessions_page(limit=10, after=first.next_cursor, filters=filters)
+            assert [r["id"] for r in first.rows + rest.rows] == ["s030", "s027", "s024", "s021", "s018", "s015", "s012"]
+            assert not rest.has_more
+
+            plan = _executed_plan(
+                storage,
+                lambda: storage.fetch_sessions_page(limit=7, after=("2024-01-10", "s020"), filters=SessionFilter(mode="expert")),
+            )
+            assert "idx_sessions_user_mode_timestamp" in plan and "TEMP B-TREE" not in plan
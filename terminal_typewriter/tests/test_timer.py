@@ -0,0 +1,46 @@
+from src.core.clock import VirtualClock
+from src.core.timer import CountdownTimer
+
+
+def test_timer_expires_exactly_at_deadline():
+    clock = VirtualClock()
+    completed = []
+    timer = CountdownTimer(duration_seconds=2.5, on_complete=lambda: completed.append(clock.now()), clock=clock)
+    timer.start()
+
+    clock.advance(2.499)
+    timer.poll()
+    assert completed == []
+    assert timer.remaining == 1
+    assert not timer.expired
+
+    clock.advance(0.001)
+    timer.poll()
+    assert timer.expired
+    assert completed == [2.5]
+
+
+def test_sub_second_ticks_stay_on_grid():
+    clock = VirtualClock()
+    ticks = []
+    timer = CountdownTimer(duration_seconds=1.0, on_tick=ticks.append, clock=clock, tick_interval=0.25)
+    timer.start()
+
+    while not timer.expired:
+        timer.wait()
+
+    assert ticks == [0.75, 0.5, 0.25, 0.0]
+    assert clock.now() == 1.0
+
+
+def test_missed_ticks_are_coalesced():
+    clock = VirtualClock()
+    ticks = []
+    timer = CountdownTimer(duration_seconds=10, on_tick=ticks.append, clock=clock)
+    timer.start()
+
+    clock.advance(3.5)
+    timer.poll()
+
+    assert ticks == [6.5]
+    assert timer.time_until_next_tick() == 0.5
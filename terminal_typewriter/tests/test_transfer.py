@@ -0,0 +1,123 @@
+import csv
+import os
+import tempfile
+
+import pytest
+
+from src.core.keystroke_log import KeystrokeLog
+from src.data import transfer
+from src.data.retention import RetentionManager
+from src.data.storage import StorageManager
+
+
+def _session(i, wpm=40.0):
+    keystrokes = KeystrokeLog()
+    for j, ch in enumerate("héllo, wörld"):
+        keystrokes.append(0.1 * (j + 1), ch)
+    return {
+        "id": f"s{i}",
+        "timestamp": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}Z",
+        "mode": "beginner" if i % 2 else "expert",
+        "duration": 30.0,
+        "text_length": 12,
+        "wpm": wpm,
+        "accuracy": 95.5,
+        "errors": i % 3,
+        "keystrokes": keystrokes,
+        "text": 'héllo, "wörld"\nnext line',
+    }
+
+
+@pytest.mark.parametrize("fmt", ["ndjson", "csv"])
+def test_export_import_round_trip(fmt):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "exports", f"sessions.{fmt}")
+        with StorageManager(db_path=os.path.join(tmp, "source.db")) as source:
+            source.save_sessions([_session(i) for i in range(25)])
+            # A batch smaller than the table exercises the streaming cursor
+            assert transfer.export_sessions(source, path, batch_size=4) == 25
+        assert not os.path.exists(path + ".part")
+
+        with StorageManager(db_path=os.path.join(tmp, "target.db")) as target:
+            assert transfer.import_sessions(target, path, batch_size=7) == 25
+            assert target.count_sessions() == 25
+            assert target.get_totals()["total_sessions"] == 25
+            for i in (0, 24):
+                original = _session(i)
+                copied = target.fetch_session_by_id(original["id"])
+                for field in ("timestamp", "mode", "duration", "text_length", "wpm", "accuracy", "errors", "text"):
+                    assert copied[field] == original[field]
+                assert copied["keystrokes"].to_dicts() == original["keystrokes"].to_dicts()
+
+
+def test_import_skips_or_replaces_existing_ids():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.ndjson")
+        with StorageManager(db_path=os.path.join(tmp, "source.db")) as source:
+            source.save_sessions([_session(i, wpm=80.0) for i in range(10)])
+            transfer.export_sessions(source, path)
+
+        with StorageManager(db_path=os.path.join(tmp, "target.db")) as target:
+            target.save_sessions([_session(i) for i in range(5)])
+
+            assert transfer.import_sessions(target, path) == 5
+            assert target.fetch_session_by_id("s0")["wpm"] == 40.0
+            assert target.get_totals()["total_sessions"] == 10
+
+            assert transfer.import_sessions(target, path, replace=True) == 10
+            assert target.fetch_session_by_id("s0")["wpm"] == 80.0
+            totals = target.get_totals()
+            assert totals["total_sessions"] == 10
+            assert totals["avg_wpm"] == 80.0
+
+
+def test_import_binds_large_batches_and_keeps_committed_rows_on_error():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "target.db")) as target:
+            target.save_sessions([_session(i) for i in range(0, 3000, 2)])
+            # More ids per batch than SQLite's oldest 999-parameter limit
+            assert target.import_sessions([_session(i) for i in range(3000)], batch_size=2500) == 1500
+            assert target.get_totals()["total_sessions"] == 3000
+
+            def failing():
+                yield from (_session(i) for i in range(3000, 3010))
+                raise ValueError("bad line 11")
+
+            with pytest.raises(ValueError, match="bad line 11"):
+                target.import_sessions(failing(), batch_size=5)
+            assert target.get_totals()["total_sessions"] == 3010
+
+
+def test_export_includes_archived_keystrokes():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.ndjson")
+        with StorageManager(db_path=os.path.join(tmp, "source.db")) as source:
+            source.save_sessions([_session(i) for i in range(6)])
+            assert RetentionManager(source, batch_size=4).expire(30) == 6
+            transfer.export_sessions(source, path, batch_size=4)
+
+        with StorageManager(db_path=os.path.join(tmp, "target.db")) as target:
+            assert transfer.import_sessions(target, path) == 6
+            for i in (0, 5):
+                copied = target.fetch_session_by_id(f"s{i}")
+                assert copied["keystrokes"].to_dicts() == _session(i)["keystrokes"].to_dicts()
+
+
+def test_csv_import_reads_large_fields_without_changing_the_global_limit():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sessions.csv")
+        long_session = _session(0)
+        for j in range(30000):
+            long_session["keystrokes"].append(2.0 + j * 0.1, "x")
+        with StorageManager(db_path=os.path.join(tmp, "source.db")) as source:
+            source.save_sessions([long_session, _session(1)])
+            transfer.export_sessions(source, path)
+        assert os.path.getsize(path) > 128 * 1024
+
+        limit = csv.field_size_limit()
+        records = transfer.read_sessions(path)
+        first = next(records)
+        assert csv.field_size_limit() == limit
+        assert len(first["keystrokes"]) == len(long_session["keystrokes"])
+        assert [r["id"] for r in records] == ["s1"]
+        assert csv.field_size_limit() == limit
@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import tempfile
+
+from src.data import transfer
+from src.data.models import SessionFilter
+from src.data.storage import StorageManager
+from src.data.write_behind import WriteBehindQueue
+
+
+def _session(user, i, wpm):
+    return {
+        "id": f"{user}-{i}", "timestamp": f"2024-01-01T00:00:{i:02d}Z", "mode": "expert" if i % 2 else "beginner",
+        "duration": 30.0, "wpm": wpm, "accuracy": 90.0, "errors": 1, "text": "shared passage",
+    }
+
+
+def test_queries_and_aggregates_are_scoped_per_user():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        with StorageManager(db_path=db_path, user_name="alice") as alice, StorageManager(db_path=db_path, user_name="bob") as bob:
+            alice.save_sessions([_session("alice", i, 40.0) for i in range(6)])
+            bob.save_sessions([_session("bob", i, 80.0) for i in range(3)])
+
+            assert alice.count_sessions() == 6 and bob.count_sessions() == 3
+            assert alice.get_totals()["best_wpm"] == 40.0
+            assert bob.get_totals()["avg_wpm"] == 80.0
+            assert alice.get_mode_totals()["expert"]["count"] == 3
+            assert bob.get_mode_totals()["expert"]["count"] == 1
+            assert {r["id"][:3] for r in bob.fetch_recent_sessions(limit=50)} == {"bob"}
+            assert [r["id"] for r in alice.fetch_sessions_page(limit=2, filters=SessionFilter(mode="expert")).rows] == ["alice-5", "alice-3"]
+
+            passage = alice.fetch_session_by_id("alice-0")["text_hash"]
+            assert alice.get_passage_totals(passage)["count"] == 6
+            assert bob.get_passage_totals(passage)["best_wpm"] == 80.0
+            assert bob.fetch_session_by_id("alice-0") is None
+            assert bob.fetch_latest_session_with_keystrokes()["id"] == "bob-2"
+
+            assert {u["name"]: u["sessions"] for u in alice.list_users()} == {"alice": 6, "bob": 3}
+
+            bob.set_user("alice")
+            assert bob.count_sessions() == 6
+
+
+def test_export_and_import_move_one_users_sessions():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "alice.ndjson")
+        db_path = os.path.join(tmp, "lab.db")
+        with StorageManager(db_path=db_path, user_name="alice") as storage:
+            storage.save_sessions([_session("alice", i, 40.0) for i in range(4)])
+            storage.set_user("bob")
+            storage.save_sessions([_session("bob", i, 80.0) for i in range(2)])
+
+            storage.set_user("alice")
+            assert transfer.export_sessions(storage, path) == 4
+
+            # Replacing must not take over sessions that belong to another user
+            storage.set_user("bob")
+            assert transfer.import_sessions(storage, path, replace=True) == 0
+            assert storage.count_sessions() == 2
+            storage.set_user("alice")
+            assert storage.count_sessions() == 4
+
+        with StorageManager(db_path=os.path.join(tmp, "home.db"), user_name="alice") as home:
+            assert transfer.import_sessions(home, path) == 4
+            assert home.get_totals()["avg_wpm"] == 40.0
+
+
+def test_legacy_sessions_belong_to_the_configured_user():
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "typewriter.db")
+        conn = sqlite3.connect(db_path)
+        conn.execute("CREATE TABLE sessions (id TEXT PRIMARY KEY, timestamp TEXT, mode TEXT, duration REAL, text_length INTEGER, wpm REAL, accuracy REAL, errors INTEGER, keystrokes_data TEXT)")
+        conn.executemany("INSERT INTO sessions (id, timestamp, wpm) VALUES (?, '2024-01-01T00:00:00Z', 50)", [(f"s{i}",) for i in range(5)])
+        conn.commit()
+        conn.close()
+
+        with StorageManager(db_path=db_path, user_name="alice") as storage:
+            assert storage.count_sessions() == 5
+            storage.set_user("Guest")
+            assert storage.count_sessions() == 0
+
+
+def test_queued_sessions_keep_the_user_they_were_submitted_for():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db"), user_name="alice") as storage:
+            writer = WriteBehindQueue(storage)
+            writer.submit(_session("alice", 0, 40.0))
+            storage.set_user("bob")
+            writer.close()
+
+            assert storage.count_sessions() == 0
+            storage.set_user("alice")
+            assert storage.count_sessions() == 1
@@ -0,0 +1,64 @@
+import os
+import tempfile
+
+import pytest
+
+from src.data.storage import StorageManager
+from src.data.write_behind import WriteBehindQueue
+from src.utils.exceptions import StorageException
+
+
+class BatchRecordingStorage(StorageManager):
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.batches = []
+
+    def save_sessions(self, sessions):
+        self.batches.append(len(sessions))
+        super().save_sessions(sessions)
+
+
+def _session(i):
+    return {"id": f"s{i}", "timestamp": f"2024-01-01T00:{i // 60:02d}:{i % 60:02d}Z", "mode": "beginner", "duration": 30.0, "wpm": 40.0, "accuracy": 95.0, "errors": 0}
+
+
+def test_writes_are_batched_and_visible_after_await_durable():
+    with tempfile.TemporaryDirectory() as tmp:
+        with BatchRecordingStorage(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            writer = WriteBehindQueue(storage, max_pending=500, batch_size=50)
+            for i in range(200):
+                writer.submit(_session(i))
+            writer.await_durable(timeout=10)
+
+            assert storage.count_sessions() == 200
+            assert storage.get_totals()["total_sessions"] == 200
+            assert sum(storage.batches) == 200
+            assert max(storage.batches) <= 50
+            writer.close()
+
+
+def test_close_flushes_pending_sessions():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            writer = WriteBehindQueue(storage)
+            for i in range(20):
+                writer.submit(_session(i))
+            writer.close()
+
+            assert storage.count_sessions() == 20
+            with pytest.raises(StorageException):
+                writer.submit(_session(99))
+
+
+def test_failed_session_is_reported_without_losing_the_batch():
+    with tempfile.TemporaryDirectory() as tmp:
+        with StorageManager(db_path=os.path.join(tmp, "typewriter.db")) as storage:
+            writer = WriteBehindQueue(storage)
+            for session in [_session(1), _session(2), _session(1), _session(3)]:
+                writer.submit(session)
+
+            with pytest.raises(StorageException, match="s1"):
+                writer.await_durable(timeout=10)
+            assert storage.count_sessions() == 3
+            writer.await_durable(timeout=10)  # errors are reported once
+            writer.close()